@@ -0,0 +1,61 @@
+"""
+Бенчмарк начисления дохода и закрытия раунда
+Сравнивает хранение состояния в объектах Player и в массивах NumPy (PlayerStore)
+"""
+import time
+from game_engine import Game
+from game_config import BUILDING_COSTS
+
+PLAYER_COUNTS = [1000, 10000, 100000]
+BUILDINGS_PER_PLAYER = 3
+ROUNDS = 5
+
+
+def create_game(num_players: int, array_state: bool) -> Game:
+    """Игра, в которой у каждого игрока несколько активных объектов"""
+    game = Game(num_players=num_players, array_state=array_state)
+    names = list(BUILDING_COSTS)
+    for i in range(num_players):
+        player_id = f"p{i}"
+        game.add_player(player_id, f"Игрок {i}")
+        player = game.get_player(player_id)
+        for j in range(BUILDINGS_PER_PLAYER):
+            name = names[(i + j) % len(names)]
+            for resource, amount in BUILDING_COSTS[name].items():
+                player.add_resource(resource, amount)
+            game.start_building(player_id, name)
+    # Объекты завершаются во втором раунде и становятся активными в третьем
+    for _ in range(3):
+        game.process_round()
+    return game
+
+
+def measure(game: Game) -> tuple:
+    """Среднее время фазы доходов и всего раунда в миллисекундах"""
+    income = 0.0
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        game.phase_income({})
+        income += time.perf_counter() - start
+
+    total = 0.0
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        game.process_round()
+        total += time.perf_counter() - start
+    return income / ROUNDS * 1000, total / ROUNDS * 1000
+
+
+def run_benchmark():
+    print(f"{'Игроков':>8} | {'Доход (Player), мс':>19} | {'Доход (массивы), мс':>20} | "
+          f"{'Раунд (Player), мс':>19} | {'Раунд (массивы), мс':>20}")
+    print("-" * 98)
+    for num_players in PLAYER_COUNTS:
+        objects_income, objects_round = measure(create_game(num_players, array_state=False))
+        arrays_income, arrays_round = measure(create_game(num_players, array_state=True))
+        print(f"{num_players:>8} | {objects_income:>19.3f} | {arrays_income:>20.3f} | "
+              f"{objects_round:>19.3f} | {arrays_round:>20.3f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,59 @@
+"""
+Бенчмарк турнирной таблицы
+Сравнивает оценку игроков в объектах Player (текущая реализация)
+и векторную оценку в массивах NumPy: полная таблица и первые 10 строк,
+а также действие игрока + полная таблица (кэш оценки игроков)
+и действие игрока + первые 20 строк из рейтинга (PlayerRanking)
+"""
+import time
+from bench_income import create_game
+
+PLAYER_COUNTS = [30, 1000, 10000, 100000]
+TOP = 10
+PAGE = 20
+
+
+def measure(action, repeats: int) -> float:
+    """Среднее время вызова в миллисекундах"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        action()
+    return (time.perf_counter() - start) / repeats * 1000
+
+
+def action_and(game, query):
+    """Действие одного игрока и запрос к турнирной таблице"""
+    counter = [0]
+
+    def run():
+        counter[0] += 1
+        game.buy_resource(f"p{counter[0] % len(game.players)}", "дерево", 1)
+        query()
+    return run
+
+
+def run_benchmark():
+    print(f"{'Игроков':>8} | {'Player, мс':>11} | {'Массивы, мс':>12} | {f'Массивы, топ-{TOP}, мс':>19} | "
+          f"{'Действие + таблица, мс':>22} | {f'Действие + топ-{PAGE}, мс':>21} | "
+          f"{'Раунд (Player), мс':>19} | {'Раунд (массивы), мс':>20}")
+    print("-" * 173)
+    for num_players in PLAYER_COUNTS:
+        repeats = max(3, 30000 // num_players)
+        objects_game = create_game(num_players, array_state=False)
+        arrays_game = create_game(num_players, array_state=True)
+
+        # Первый запрос - оценка всех игроков с нуля
+        objects = measure(objects_game.get_leaderboard, 1)
+        arrays = measure(arrays_game.get_leaderboard, repeats)
+        top = measure(lambda: arrays_game.get_leaderboard(limit=TOP), repeats)
+        refresh = measure(action_and(objects_game, objects_game.get_leaderboard), repeats)
+        objects_game.get_ranking()
+        ranking = measure(action_and(objects_game, lambda: objects_game.get_leaderboard_page(PAGE)), repeats)
+        objects_round = measure(objects_game.process_round, 3)
+        arrays_round = measure(arrays_game.process_round, 3)
+        print(f"{num_players:>8} | {objects:>11.3f} | {arrays:>12.3f} | {top:>19.3f} | "
+              f"{refresh:>22.3f} | {ranking:>21.3f} | {objects_round:>19.3f} | {arrays_round:>20.3f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
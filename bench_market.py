@@ -0,0 +1,86 @@
+"""
+Бенчмарк динамики рынка
+Шаг цен и доходы объектов для многих независимых игр (сценариев):
+по словарям для каждой игры, как в движке (с установленным NumPy и без него -
+время должно совпадать, одна игра считается без массивов), и одним вызовом
+векторного ядра на весь пакет (насыщение в пакете - по формуле и выборкой
+из таблицы MarketDynamics)
+"""
+import random
+import time
+import numpy as np
+import market_dynamics
+from market_dynamics import MarketDynamics, step_prices, building_incomes, resource_vector, building_vector
+from cost_table import RESOURCE_NAMES, BUILDING_NAMES
+
+GAME_COUNTS = [1, 100, 10000]
+NUM_PLAYERS = 30
+ROUNDS = 5
+
+
+def create_games(num_games: int) -> list:
+    """Случайные спрос, предложение, события и количества объектов для каждой игры"""
+    random.seed(1)
+    games = []
+    for _ in range(num_games):
+        games.append({
+            "prices": {r: random.randint(500, 20000) for r in RESOURCE_NAMES},
+            "bought": {r: random.randint(0, NUM_PLAYERS) for r in RESOURCE_NAMES},
+            "sold": {r: random.randint(0, NUM_PLAYERS) for r in RESOURCE_NAMES},
+            "events": {random.choice(RESOURCE_NAMES): 1.5},
+            "counts": {name: random.randint(0, NUM_PLAYERS) for name in BUILDING_NAMES},
+        })
+    return games
+
+
+def step_dicts(market: MarketDynamics, games: list):
+    for game in games:
+        market.calculate_resource_prices_cents(game["prices"], game["bought"], game["sold"], game["events"])
+        market.calculate_building_incomes(game["counts"], {}, {})
+
+
+def step_batch(arrays: dict, market: MarketDynamics = None):
+    step_prices(arrays["prices"], arrays["bought"], arrays["sold"], arrays["events"], NUM_PLAYERS)
+    saturation = market.lookup_saturation(arrays["counts"]) if market is not None else None
+    building_incomes(arrays["counts"], 1.0, NUM_PLAYERS, saturation)
+
+
+def measure(action, repeats: int) -> float:
+    """Среднее время вызова в миллисекундах (лучший из ROUNDS замеров)"""
+    best = float("inf")
+    for _ in range(ROUNDS):
+        start = time.perf_counter()
+        for _ in range(repeats):
+            action()
+        best = min(best, time.perf_counter() - start)
+    return best / repeats * 1000
+
+
+def run_benchmark():
+    market = MarketDynamics(NUM_PLAYERS)
+    print(f"{'Игр':>6} | {'Словари (NumPy), мс':>20} | {'Словари (без NumPy), мс':>24} | "
+          f"{'Мс на игру':>10} | {'Пакет, мс':>10} | {'Пакет + таблица, мс':>20}")
+    print("-" * 106)
+    for num_games in GAME_COUNTS:
+        games = create_games(num_games)
+        arrays = {
+            key: np.array([resource_vector(game[key], 1.0 if key == "events" else 0.0) for game in games])
+            for key in ("prices", "bought", "sold", "events")
+        }
+        arrays["counts"] = np.array([building_vector(game["counts"]) for game in games])
+        repeats = max(1, 1000 // num_games)
+
+        dicts = measure(lambda: step_dicts(market, games), repeats)
+        numpy_module, market_dynamics.np = market_dynamics.np, None
+        try:
+            scalar = measure(lambda: step_dicts(market, games), repeats)
+        finally:
+            market_dynamics.np = numpy_module
+        batch = measure(lambda: step_batch(arrays), repeats * 10)
+        table = measure(lambda: step_batch(arrays, market), repeats * 10)
+        print(f"{num_games:>6} | {dicts:>20.3f} | {scalar:>24.3f} | {dicts / num_games:>10.4f} | "
+              f"{batch:>10.3f} | {table:>20.3f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,178 @@
+"""
+Бенчмарк памяти (tracemalloc)
+Байт на игрока (с ресурсами) и на объект: прежние dataclass-представления
+(строковый тип, Enum-статус, словарь ресурсов) и компактные классы со __slots__,
+в прежнем хранилище игры (список и индекс игроков, индексы реестра ID -> объект,
+ID -> владелец и псевдоним -> ID) и в игре целиком (вместе с агрегатами
+и расписанием реестра), без массивов NumPy
+"""
+import tracemalloc
+from dataclasses import dataclass, field
+from typing import Dict, Optional
+from game_engine import Game, Player, Building, BuildingStatus, PlayerBuildings
+from game_config import BUILDING_COSTS, STARTING_MONEY
+
+NUM_PLAYERS = 10000
+NUM_BUILDINGS = 100000
+RESOURCES = ["дерево", "камень", "железо", "золото"]
+
+
+@dataclass
+class LegacyBuilding:
+    """Прежнее представление объекта"""
+    id: int
+    name: str
+    started_round: int
+    completed_round: int
+    status: BuildingStatus = BuildingStatus.BUILDING
+    sale_round: Optional[int] = None
+    sale_price: Optional[float] = None
+    alias: Optional[str] = None
+
+
+@dataclass
+class LegacyPlayer:
+    """Прежнее представление игрока"""
+    id: str
+    name: str
+    money: float = STARTING_MONEY
+    resources: Dict[str, int] = field(default_factory=dict)
+    buildings: PlayerBuildings = field(default_factory=PlayerBuildings)
+    nickname: Optional[str] = None
+    photo_url: Optional[str] = None
+    version: int = 0
+
+
+def create_players(player_class):
+    """Игроки с несколькими ресурсами (только сами объекты)"""
+    def action(_):
+        players = []
+        for i in range(NUM_PLAYERS):
+            player = player_class(id=f"player{i}", name=f"Игрок {i}")
+            for resource in RESOURCES:
+                player.resources[resource] = 5
+            players.append(player)
+        action.result = players
+    return action
+
+
+def create_buildings(legacy: bool):
+    """Объекты (только сами объекты)"""
+    names = list(BUILDING_COSTS)
+
+    def action(_):
+        buildings = []
+        for i in range(NUM_BUILDINGS):
+            name = names[i % len(names)]
+            building_id = 1000 + i
+            if legacy:
+                building = LegacyBuilding(building_id, name, 3, 4, alias=f"player1_{name}_3_{building_id}")
+            else:
+                building = Building(building_id, name, 3, 4, owner_id="player1")
+            buildings.append(building)
+        action.result = buildings
+    return action
+
+
+class LegacyStorage:
+    """Прежнее хранение игроков и объектов в игре (без агрегатов и расписания реестра)"""
+
+    def __init__(self):
+        self.players = []
+        self.players_by_id = {}
+        self.buildings = {}
+        self.owners = {}
+        self.aliases = {}
+
+
+def add_legacy_players(storage: LegacyStorage):
+    """Игроки-dataclass с несколькими ресурсами в прежнем хранилище"""
+    for i in range(NUM_PLAYERS):
+        player = LegacyPlayer(id=f"player{i}", name=f"Игрок {i}")
+        for resource in RESOURCES:
+            player.resources[resource] = 5
+        storage.players.append(player)
+        storage.players_by_id[player.id] = player
+
+
+def create_legacy_storage_with_player() -> LegacyStorage:
+    storage = LegacyStorage()
+    player = LegacyPlayer(id="builder", name="Строитель")
+    storage.players.append(player)
+    storage.players_by_id[player.id] = player
+    return storage
+
+
+def add_legacy_buildings(storage: LegacyStorage):
+    """Объекты-dataclass одного игрока с прежними индексами реестра (включая псевдонимы)"""
+    player = storage.players_by_id["builder"]
+    names = list(BUILDING_COSTS)
+    for i in range(NUM_BUILDINGS):
+        name = names[i % len(names)]
+        building_id = 1000 + i
+        building = LegacyBuilding(building_id, name, 3, 4, alias=f"builder_{name}_3_{building_id}")
+        storage.buildings[building_id] = building
+        storage.owners[building_id] = player
+        storage.aliases[building.alias] = building_id
+        player.buildings.append(building)
+
+
+def measure(setup, action) -> int:
+    """Прирост выделенной памяти (байт) после action"""
+    state = setup()
+    tracemalloc.start()
+    before = tracemalloc.get_traced_memory()[0]
+    action(state)
+    after = tracemalloc.get_traced_memory()[0]
+    tracemalloc.stop()
+    return after - before
+
+
+def create_game() -> Game:
+    return Game(num_players=NUM_PLAYERS, array_state=False)
+
+
+def add_players(game: Game):
+    """Игроки с несколькими ресурсами"""
+    for i in range(NUM_PLAYERS):
+        player_id = f"player{i}"
+        game.add_player(player_id, f"Игрок {i}")
+        player = game.get_player(player_id)
+        for resource in RESOURCES:
+            player.add_resource(resource, 5)
+
+
+def create_game_with_player() -> Game:
+    game = create_game()
+    game.add_player("builder", "Строитель")
+    return game
+
+
+def add_buildings(game: Game):
+    """Объекты одного игрока (вместе с индексами реестра)"""
+    player = game.get_player("builder")
+    names = list(BUILDING_COSTS)
+    for i in range(NUM_BUILDINGS):
+        name = names[i % len(names)]
+        for resource, amount in BUILDING_COSTS[name].items():
+            player.add_resource(resource, amount)
+        game.start_building("builder", name)
+
+
+def run_benchmark():
+    rows = [
+        ("Игрок, dataclass", measure(lambda: None, create_players(LegacyPlayer)) / NUM_PLAYERS),
+        ("Игрок, __slots__", measure(lambda: None, create_players(Player)) / NUM_PLAYERS),
+        ("Объект, dataclass", measure(lambda: None, create_buildings(legacy=True)) / NUM_BUILDINGS),
+        ("Объект, __slots__", measure(lambda: None, create_buildings(legacy=False)) / NUM_BUILDINGS),
+        ("Игрок в игре, прежде", measure(LegacyStorage, add_legacy_players) / NUM_PLAYERS),
+        ("Игрок в игре", measure(create_game, add_players) / NUM_PLAYERS),
+        ("Объект в игре, прежде", measure(create_legacy_storage_with_player, add_legacy_buildings) / NUM_BUILDINGS),
+        ("Объект в игре", measure(create_game_with_player, add_buildings) / NUM_BUILDINGS),
+    ]
+    for title, size in rows:
+        print(f"{title:<21} | {size:>8.0f} байт")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,47 @@
+"""
+Бенчмарк поиска игрока по ID
+Сравнивает линейный поиск по списку и индекс Game.players_by_id
+"""
+import random
+import time
+from game_engine import Game
+
+PLAYER_COUNTS = [10, 100, 1000, 10000, 100000]
+LOOKUPS = 20000
+
+
+def linear_get_player(game: Game, player_id: str):
+    """Старая реализация get_player: линейный поиск"""
+    for player in game.players:
+        if player.id == player_id:
+            return player
+    return None
+
+
+def measure(lookup, game: Game, player_ids) -> float:
+    """Среднее время одного поиска в микросекундах"""
+    start = time.perf_counter()
+    for player_id in player_ids:
+        lookup(game, player_id)
+    return (time.perf_counter() - start) / len(player_ids) * 1e6
+
+
+def run_benchmark():
+    print(f"{'Игроков':>8} | {'Линейный, мкс':>14} | {'Индекс, мкс':>12}")
+    print("-" * 42)
+    for num_players in PLAYER_COUNTS:
+        game = Game(num_players=num_players)
+        for i in range(num_players):
+            game.add_player(f"tg_{i}", f"Игрок {i}")
+
+        player_ids = [f"tg_{random.randrange(num_players)}" for _ in range(LOOKUPS)]
+        # Линейный поиск на больших лобби слишком медленный - меньше выборка
+        linear_ids = player_ids[:max(10, LOOKUPS * 100 // num_players)]
+
+        linear = measure(linear_get_player, game, linear_ids)
+        indexed = measure(Game.get_player, game, player_ids)
+        print(f"{num_players:>8} | {linear:>14.3f} | {indexed:>12.3f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
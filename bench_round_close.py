@@ -0,0 +1,54 @@
+"""
+Бенчмарк закрытия раунда
+Время process_round при разном числе уже построенных объектов
+и одинаковом числе изменений за раунд
+"""
+import time
+from game_engine import Game
+from game_config import BUILDING_COSTS
+
+NUM_PLAYERS = 100
+BUILDING_COUNTS = [1000, 10000, 100000]
+CHANGES_PER_ROUND = 10
+ROUNDS = 20
+BUILDING_NAME = "Лесоповал"
+
+
+def build(game: Game, player_id: str):
+    """Выдать ресурсы и начать строительство"""
+    player = game.get_player(player_id)
+    for resource, amount in BUILDING_COSTS[BUILDING_NAME].items():
+        player.add_resource(resource, amount)
+    game.start_building(player_id, BUILDING_NAME)
+
+
+def create_game(num_buildings: int) -> Game:
+    """Игра с заданным числом активных объектов"""
+    game = Game(num_players=NUM_PLAYERS)
+    for i in range(NUM_PLAYERS):
+        game.add_player(f"p{i}", f"Игрок {i}")
+    for i in range(num_buildings):
+        build(game, f"p{i % NUM_PLAYERS}")
+    # Объекты завершаются во втором раунде и становятся активными в третьем
+    for _ in range(3):
+        game.process_round()
+    return game
+
+
+def run_benchmark():
+    print(f"{'Объектов':>9} | {'Закрытие раунда, мс':>20}")
+    print("-" * 33)
+    for num_buildings in BUILDING_COUNTS:
+        game = create_game(num_buildings)
+        elapsed = 0.0
+        for round_index in range(ROUNDS):
+            for i in range(CHANGES_PER_ROUND):
+                build(game, f"p{(round_index + i) % NUM_PLAYERS}")
+            start = time.perf_counter()
+            game.process_round()
+            elapsed += time.perf_counter() - start
+        print(f"{num_buildings:>9} | {elapsed / ROUNDS * 1000:>20.3f}")
+
+
+if __name__ == "__main__":
+    run_benchmark()
@@ -0,0 +1,46 @@
+"""
+Бенчмарк кривых насыщения
+Модификаторы для всех количеств объектов 0..num_players каждой зарегистрированной
+кривой: скалярная версия (MarketDynamics.evaluate_saturation_modifier в цикле)
+и векторная (saturation_modifiers одним вызовом), в миллионах количеств в секунду
+"""
+import time
+import numpy as np
+from market_dynamics import MarketDynamics, saturation_modifiers
+from market_config import MarketConfig
+from saturation_curves import SATURATION_CURVES
+
+PLAYER_COUNTS = [10, 100, 1000, 10000, 100000]
+
+
+def measure(action, repeats: int) -> float:
+    """Среднее время вызова в секундах"""
+    start = time.perf_counter()
+    for _ in range(repeats):
+        action()
+    return (time.perf_counter() - start) / repeats
+
+
+def evaluate_scalar(market: MarketDynamics):
+    for count in range(market.num_players + 1):
+        market.evaluate_saturation_modifier(count)
+
+
+def run_benchmark():
+    print(f"{'Кривая':>12} | {'Игроков':>7} | {'Скалярно, млн/с':>16} | {'Векторно, млн/с':>16} | {'Ускорение':>9}")
+    print("-" * 72)
+    for name in SATURATION_CURVES:
+        config = MarketConfig.from_dict({"saturation_curve": name})
+        for num_players in PLAYER_COUNTS:
+            market = MarketDynamics(num_players, config)
+            counts = np.arange(num_players + 1)
+            repeats = max(1, 100000 // num_players)
+            scalar = measure(lambda: evaluate_scalar(market), repeats)
+            vector = measure(lambda: saturation_modifiers(counts, num_players, config), repeats * 10)
+            size = (num_players + 1) / 1e6
+            print(f"{name:>12} | {num_players:>7} | {size / scalar:>16.2f} | {size / vector:>16.2f} | "
+                  f"{scalar / vector:>8.1f}x")
+
+
+if __name__ == "__main__":
+    run_benchmark()
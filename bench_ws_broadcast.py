@@ -0,0 +1,145 @@
+"""
+Бенчмарк рассылки состояния по WebSocket
+Сравнивает старую схему (цикл на каждый сокет) и общий цикл рассылки.
+Для общего цикла отдельно измеряются построение и сериализация сообщения
+(одно на тик) и раздача готовых байт сокетам: очереди сокетов с постоянными
+писателями и прежний asyncio.gather по всем сокетам. Также выводится
+размер полного состояния и delta-сообщения
+"""
+import asyncio
+import json
+import time
+import web_server
+from web_server import (
+    advance_feed, build_leaderboard, build_prices, build_buildings, build_game_state,
+    response_cache, set_game, serialize_message, diff_game_state, send_payload, client_writer
+)
+from game_engine import Game
+from test_web_interface import create_test_game
+
+SOCKET_COUNTS = [1, 10, 100, 1000]
+TICKS = 20
+
+
+class FakeWebSocket:
+    """Сокет-заглушка: принимает данные, ничего не отправляя"""
+
+    def __init__(self):
+        self.sent_bytes = 0
+
+    async def send_bytes(self, data: bytes):
+        self.sent_bytes += len(data)
+
+    async def send_json(self, data):
+        self.sent_bytes += len(json.dumps(data).encode("utf-8"))
+
+
+async def build_state_uncached() -> dict:
+    """Полное состояние без кэша (как в старой схеме)"""
+    return {
+        "current_round": web_server.game_instance.current_round,
+        "num_players": len(web_server.game_instance.players),
+        "leaderboard": await build_leaderboard(),
+        "prices": await build_prices(),
+        "buildings": await build_buildings()
+    }
+
+
+async def tick_per_socket(sockets):
+    """Старая схема: каждый сокет сам строит и кодирует состояние"""
+    for socket in sockets:
+        state = await build_state_uncached()
+        await socket.send_json(state)
+
+
+async def fan_out_queues(sockets, payload: bytes):
+    """Новая схема: байты кладутся в очереди, писатели сокетов отправляют их"""
+    send_payload(payload)
+    queues = list(web_server.active_connections.values())
+    while any(queue.qsize() for queue in queues):
+        await asyncio.sleep(0)
+
+
+async def fan_out_gather(sockets, payload: bytes):
+    """Прежняя раздача: корутина на каждый сокет в asyncio.gather"""
+    await asyncio.gather(*(socket.send_bytes(payload) for socket in sockets), return_exceptions=True)
+
+
+async def measure_per_socket(num_sockets: int) -> float:
+    """CPU-время одного тика старой схемы в миллисекундах"""
+    sockets = [FakeWebSocket() for _ in range(num_sockets)]
+    start = time.process_time()
+    for _ in range(TICKS):
+        await tick_per_socket(sockets)
+    return (time.process_time() - start) / TICKS * 1000
+
+
+async def measure_shared(num_sockets: int) -> tuple:
+    """
+    CPU-время одного тика общего цикла в миллисекундах:
+    (построение и сериализация, раздача через очереди, раздача через gather)
+    """
+    sockets = [FakeWebSocket() for _ in range(num_sockets)]
+    writers = []
+    for socket in sockets:
+        queue = asyncio.Queue(maxsize=web_server.CLIENT_QUEUE_SIZE)
+        web_server.active_connections[socket] = queue
+        writers.append(asyncio.create_task(client_writer(socket, queue)))
+    await asyncio.sleep(0)
+
+    build = queues = gather = 0.0
+    for _ in range(TICKS):
+        # Считаем, что на каждом тике состояние меняется
+        web_server.game_instance.bump_version()
+        start = time.process_time()
+        payload = await advance_feed()
+        built = time.process_time()
+        await fan_out_queues(sockets, payload)
+        queued = time.process_time()
+        await fan_out_gather(sockets, payload)
+        gathered = time.process_time()
+        build += built - start
+        queues += queued - built
+        gather += gathered - queued
+
+    for writer in writers:
+        writer.cancel()
+    web_server.active_connections.clear()
+    return build / TICKS * 1000, queues / TICKS * 1000, gather / TICKS * 1000
+
+
+async def run_benchmark():
+    set_game(create_test_game())
+
+    print(f"{'Сокетов':>8} | {'Цикл на сокет, мс':>18} | {'Построение, мс':>15} | "
+          f"{'Очереди, мс':>12} | {'gather, мс':>11}")
+    print("-" * 78)
+    for num_sockets in SOCKET_COUNTS:
+        per_socket = await measure_per_socket(num_sockets) if num_sockets <= 100 else float("nan")
+        build, queues, gather = await measure_shared(num_sockets)
+        print(f"{num_sockets:>8} | {per_socket:>18.3f} | {build:>15.3f} | {queues:>12.3f} | {gather:>11.3f}")
+
+
+async def run_payload_benchmark():
+    """Размер сообщения при изменении денег одного игрока"""
+    print(f"\n{'Игроков':>8} | {'Snapshot, байт':>15} | {'Delta, байт':>12}")
+    print("-" * 42)
+    for num_players in [30, 100, 1000]:
+        game = Game(num_players=num_players)
+        for i in range(num_players):
+            game.add_player(f"player{i}", f"Игрок {i}")
+            game.buy_resource(f"player{i}", "дерево", i % 7 + 1)
+        set_game(game)
+
+        before = await response_cache.get_data("game_state", build_game_state)
+        game.buy_resource("player0", "камень", 1)
+        after = await response_cache.get_data("game_state", build_game_state)
+
+        snapshot = serialize_message({"type": "snapshot", "seq": 1, "state": after})
+        delta = serialize_message({"type": "delta", "seq": 2, **diff_game_state(before, after)})
+        print(f"{num_players:>8} | {len(snapshot):>15} | {len(delta):>12}")
+
+
+if __name__ == "__main__":
+    asyncio.run(run_benchmark())
+    asyncio.run(run_payload_benchmark())
@@ -0,0 +1,85 @@
+"""
+Таблица стоимости объектов
+BUILDING_COSTS один раз компилируется в матрицу объекты x ресурсы,
+стоимость объектов пересчитывается только при смене версии цен.
+Используется движком, API, сценарным анализом и генераторами PDF
+"""
+from typing import Dict, List, Optional
+from game_config import RESOURCE_PRICES, BUILDING_COSTS
+from money import to_coins
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Порядок строк и столбцов матриц
+RESOURCE_NAMES: List[str] = list(RESOURCE_PRICES)
+RESOURCE_INDEX: Dict[str, int] = {name: i for i, name in enumerate(RESOURCE_NAMES)}
+BUILDING_NAMES: List[str] = list(BUILDING_COSTS)
+BUILDING_INDEX: Dict[str, int] = {name: i for i, name in enumerate(BUILDING_NAMES)}
+
+# Стоимость объектов в ресурсах: строка на объект, столбец на ресурс
+BUILDING_COST_ROWS: List[List[int]] = [
+    [BUILDING_COSTS[name].get(resource, 0) for resource in RESOURCE_NAMES]
+    for name in BUILDING_NAMES
+]
+BUILDING_COST_MATRIX = np.array(BUILDING_COST_ROWS, dtype=np.float64) if np is not None else None
+
+
+def price_vector(prices: Dict[str, float]) -> List[float]:
+    """Цены ресурсов в порядке RESOURCE_NAMES"""
+    return [prices.get(resource, 0) for resource in RESOURCE_NAMES]
+
+
+def calculate_building_costs(prices: Dict[str, float]) -> Dict[str, float]:
+    """Стоимость всех объектов в монетах при заданных ценах ресурсов"""
+    vector = price_vector(prices)
+    return {
+        name: sum(amount * price for amount, price in zip(row, vector) if amount)
+        for name, row in zip(BUILDING_NAMES, BUILDING_COST_ROWS)
+    }
+
+
+# Стоимость объектов по начальным ценам (для сценарного анализа и PDF)
+BASE_BUILDING_COSTS: Dict[str, float] = calculate_building_costs(RESOURCE_PRICES)
+
+
+class CostTable:
+    """
+    Стоимость объектов при текущих ценах игры
+    Цены и стоимость - целые сотые монеты (см. money), пересчитываются,
+    только когда меняется версия цен
+    """
+
+    def __init__(self):
+        self.price_version: Optional[int] = None
+        self.costs_cents: Dict[str, int] = {}
+        self.costs: Dict[str, float] = {}  # То же в монетах (для API)
+        # Векторы NumPy в сотых для оценки в режиме массивов (None без numpy).
+        # Хранятся в float64 ради BLAS: произведения целых до 2**53 точные
+        self.price_array = None
+        self.cost_array = None
+
+    def update(self, prices_cents: Dict[str, int], price_version: int):
+        """Пересчитать стоимость по ценам в сотых, если версия цен изменилась"""
+        if price_version == self.price_version:
+            return
+        vector = price_vector(prices_cents)
+        self.costs_cents = {
+            name: sum(amount * price for amount, price in zip(row, vector) if amount)
+            for name, row in zip(BUILDING_NAMES, BUILDING_COST_ROWS)
+        }
+        self.costs = {name: to_coins(cost) for name, cost in self.costs_cents.items()}
+        if np is not None:
+            self.price_array = np.array(vector, dtype=np.float64)
+            self.cost_array = BUILDING_COST_MATRIX @ self.price_array
+        self.price_version = price_version
+
+    def cost(self, building_name: str) -> float:
+        """Стоимость объекта в монетах (0 для неизвестного объекта)"""
+        return self.costs.get(building_name, 0)
+
+    def cost_cents(self, building_name: str) -> int:
+        """Стоимость объекта в сотых (0 для неизвестного объекта)"""
+        return self.costs_cents.get(building_name, 0)
@@ -2,8 +2,10 @@
 Игровой движок для "Королевская биржа"
 Управляет игровым процессом, раундами, действиями игроков
 """
-from typing import Dict, List, Optional
-from dataclasses import dataclass, field
+from array import array
+from collections.abc import MutableMapping
+from types import MappingProxyType
+from typing import Dict, List, Mapping, Optional
 from enum import Enum
 from game_config import (
     RESOURCE_PRICES, BUILDING_COSTS, BUILDING_INCOME, 
@@ -11,6 +13,20 @@ from game_config import (
 )
 from game_events import EventSystem
 from market_dynamics import MarketDynamics
+from market_config import MarketConfig
+from player_store import PlayerStore, PlayerValues, HAS_NUMPY, rank_order
+from cost_table import CostTable, RESOURCE_NAMES, RESOURCE_INDEX, BUILDING_NAMES, BUILDING_INDEX
+from player_ranking import PlayerRanking
+from player_bitset import PlayerBitset
+from money import CENTS, to_cents, to_coins, prices_to_cents, prices_to_coins, format_money
+if HAS_NUMPY:
+    import numpy as np
+
+# С этого размера лобби состояние игроков по умолчанию хранится в массивах NumPy
+ARRAY_STATE_MIN_PLAYERS = 1000
+
+# Стартовые деньги игрока в сотых
+STARTING_MONEY_CENTS = to_cents(STARTING_MONEY)
 
 
 class BuildingStatus(Enum):
@@ -21,47 +37,261 @@ class BuildingStatus(Enum):
     FOR_SALE = "for_sale"  # Выставлен на продажу
 
 
-@dataclass
+# Статусы хранятся в объектах как небольшие целые числа (порядковый номер)
+BUILDING_STATUSES: List[BuildingStatus] = list(BuildingStatus)
+STATUS_CODES: Dict[BuildingStatus, int] = {status: code for code, status in enumerate(BUILDING_STATUSES)}
+
+
 class Building:
-    """Объект игрока"""
-    id: str
-    name: str
-    started_round: int  # Раунд начала строительства
-    completed_round: int  # Раунд завершения (started_round + 1)
-    status: BuildingStatus = BuildingStatus.BUILDING
-    sale_round: Optional[int] = None  # Раунд выставления на продажу
-    sale_price: Optional[float] = None  # Цена продажи (фиксируется при выставлении)
+    """
+    Объект игрока
+    Компактное представление: тип и статус хранятся порядковыми номерами,
+    строковый псевдоним вычисляется из ID владельца, типа, раунда и ID объекта
+    """
+    __slots__ = (
+        "id", "type_code", "owner_id", "started_round", "completed_round",
+        "status_code", "sale_round", "sale_price_cents"
+    )
+    
+    def __init__(self, id: int, name: str, started_round: int, completed_round: int,
+                 status: BuildingStatus = BuildingStatus.BUILDING,
+                 sale_round: Optional[int] = None, sale_price: Optional[float] = None,
+                 owner_id: Optional[str] = None):
+        self.id = id  # Уникальный ID в рамках игры (выдается BuildingRegistry)
+        self.type_code = BUILDING_INDEX[name]
+        self.owner_id = owner_id  # ID игрока-владельца (для псевдонима)
+        self.started_round = started_round  # Раунд начала строительства
+        self.completed_round = completed_round  # Раунд завершения (started_round + 1)
+        self.status_code = STATUS_CODES[status]
+        self.sale_round = sale_round  # Раунд выставления на продажу
+        # Цена продажи в сотых монеты (фиксируется при выставлении)
+        self.sale_price_cents = None if sale_price is None else to_cents(sale_price)
+    
+    @property
+    def sale_price(self) -> Optional[float]:
+        """Цена продажи в монетах"""
+        return None if self.sale_price_cents is None else to_coins(self.sale_price_cents)
+    
+    @property
+    def name(self) -> str:
+        return BUILDING_NAMES[self.type_code]
+    
+    @property
+    def status(self) -> BuildingStatus:
+        return BUILDING_STATUSES[self.status_code]
+    
+    @status.setter
+    def status(self, status: BuildingStatus):
+        self.status_code = STATUS_CODES[status]
+    
+    @property
+    def alias(self) -> Optional[str]:
+        """Строковый ID для отображения в API"""
+        if self.owner_id is None:
+            return None
+        return f"{self.owner_id}_{self.name}_{self.started_round}_{self.id}"
+    
+    def __eq__(self, other) -> bool:
+        if not isinstance(other, Building):
+            return NotImplemented
+        return all(getattr(self, name) == getattr(other, name) for name in self.__slots__)
+    
+    __hash__ = None
+    
+    def __repr__(self) -> str:
+        return (f"Building(id={self.id!r}, name={self.name!r}, started_round={self.started_round!r}, "
+                f"completed_round={self.completed_round!r}, status={self.status!r}, "
+                f"sale_round={self.sale_round!r}, sale_price={self.sale_price!r}, alias={self.alias!r})")
+
+
+class PlayerBuildings:
+    """
+    Объекты игрока: порядок постройки + доступ по ID за O(1)
+    Поддерживает привычный интерфейс списка (итерация, len, append, индекс)
+    """
+    __slots__ = ("by_id",)
+    
+    def __init__(self):
+        self.by_id: Dict[int, Building] = {}
+    
+    def append(self, building: Building):
+        """Добавить объект"""
+        self.by_id[building.id] = building
+    
+    def get(self, building_id: int) -> Optional[Building]:
+        """Найти объект по ID"""
+        return self.by_id.get(building_id)
+    
+    def remove(self, building_id: int) -> bool:
+        """Удалить объект по ID"""
+        return self.by_id.pop(building_id, None) is not None
+    
+    def __iter__(self):
+        return iter(self.by_id.values())
+    
+    def __len__(self) -> int:
+        return len(self.by_id)
+    
+    def __getitem__(self, index: int) -> Building:
+        return list(self.by_id.values())[index]
+    
+    def __contains__(self, building_id: int) -> bool:
+        return building_id in self.by_id
+    
+    def __repr__(self) -> str:
+        return f"PlayerBuildings({list(self.by_id.values())!r})"
+
+
+class ResourceArray(MutableMapping):
+    """
+    Ресурсы игрока как словарь {ресурс: количество} поверх массива фиксированного
+    размера (индекс - порядковый номер ресурса в RESOURCE_NAMES)
+    Как и в обычном словаре ресурсов, нулевые количества считаются отсутствующими
+    """
+    __slots__ = ("amounts",)
+    
+    def __init__(self, amounts: array):
+        self.amounts = amounts
+    
+    def __getitem__(self, resource: str) -> int:
+        index = RESOURCE_INDEX.get(resource)
+        amount = 0 if index is None else self.amounts[index]
+        if amount == 0:
+            raise KeyError(resource)
+        return amount
+    
+    def __setitem__(self, resource: str, amount: int):
+        self.amounts[RESOURCE_INDEX[resource]] = amount
+    
+    def __delitem__(self, resource: str):
+        self[resource]
+        self.amounts[RESOURCE_INDEX[resource]] = 0
+    
+    def __iter__(self):
+        return (RESOURCE_NAMES[index] for index, amount in enumerate(self.amounts) if amount)
+    
+    def __len__(self) -> int:
+        return sum(1 for amount in self.amounts if amount)
+    
+    def copy(self) -> Dict[str, int]:
+        return dict(self.items())
+    
+    def __repr__(self) -> str:
+        return repr(self.copy())
 
 
-@dataclass
 class Player:
-    """Игрок"""
-    id: str
-    name: str
-    money: float = STARTING_MONEY
-    resources: Dict[str, int] = field(default_factory=dict)
-    buildings: List[Building] = field(default_factory=list)
-    nickname: Optional[str] = None  # Никнейм для игры
-    photo_url: Optional[str] = None  # URL фото профиля
+    """
+    Игрок
+    Деньги и ресурсы хранятся в самом объекте (деньги - целыми сотыми монеты,
+    ресурсы - массивом по порядковому номеру ресурса), а в режиме массивов -
+    в строке общего PlayerStore (объект становится ее представлением)
+    """
+    __slots__ = (
+        "id", "name", "buildings", "nickname", "photo_url", "version", "store", "slot",
+        "_money", "_amounts", "value_stamp", "cached_value", "row_cache"
+    )
+    
+    def __init__(self, id: str, name: str, money: float = STARTING_MONEY,
+                 resources: Optional[Dict[str, int]] = None,
+                 nickname: Optional[str] = None, photo_url: Optional[str] = None):
+        self.id = id
+        self.name = name
+        self._amounts = array("q", [0]) * len(RESOURCE_NAMES)
+        self.buildings = PlayerBuildings()
+        self.nickname = nickname  # Никнейм для игры
+        self.photo_url = photo_url  # URL фото профиля
+        self.version = 0  # Версия состояния игрока (растет при его действиях)
+        self.store: Optional[PlayerStore] = None
+        self.slot = -1  # Порядковый номер игрока в игре (он же строка в PlayerStore)
+        # В сотых; стартовая сумма - общий объект int (не создается на каждого игрока)
+        self._money = STARTING_MONEY_CENTS if money == STARTING_MONEY else to_cents(money)
+        
+        # Кэш капитализации (Game.calculate_player_value): действует, пока value_stamp
+        # равен Game.valuation_version; изменение денег, ресурсов и объектов игрока
+        # сбрасывает его (value_stamp = -1)
+        self.value_stamp = -1
+        self.cached_value: Optional[Dict[str, float]] = None
+        # Строка турнирной таблицы: (оценка, снимок прироста, строка) или None
+        self.row_cache: Optional[tuple] = None
+        
+        if resources:
+            self.resources = resources
+    
+    @property
+    def resources(self) -> MutableMapping:
+        """Ресурсы игрока как словарь {ресурс: количество}"""
+        if self.store is None:
+            return ResourceArray(self._amounts)
+        return self.store.resource_view(self.slot)
+    
+    @resources.setter
+    def resources(self, resources: Dict[str, int]):
+        view = self.resources
+        view.clear()
+        view.update(resources)
+        self.value_stamp = -1
+    
+    @property
+    def money_cents(self) -> int:
+        """Деньги в сотых монеты (движок считает в них)"""
+        if self.store is None:
+            return self._money
+        return self.store.get_money(self.slot)
+    
+    @money_cents.setter
+    def money_cents(self, value: int):
+        self.value_stamp = -1
+        if self.store is None:
+            self._money = value
+        else:
+            self.store.set_money(self.slot, value)
+    
+    @property
+    def money(self) -> float:
+        """Деньги в монетах"""
+        return to_coins(self.money_cents)
+    
+    @money.setter
+    def money(self, value: float):
+        self.money_cents = to_cents(value)
+    
+    def attach(self, store: PlayerStore):
+        """Перенести деньги и ресурсы в PlayerStore"""
+        self.slot = store.add_player(self._money, self.resources)
+        self.store = store
+        self._amounts = None
+        self.value_stamp = -1
+    
+    def __repr__(self) -> str:
+        return f"Player(id={self.id!r}, name={self.name!r}, money={self.money!r}, resources={self.resources!r})"
     
     def get_resource(self, resource: str) -> int:
         """Получить количество ресурса"""
+        if self.store is None:
+            index = RESOURCE_INDEX.get(resource)
+            return 0 if index is None else self._amounts[index]
         return self.resources.get(resource, 0)
     
     def add_resource(self, resource: str, amount: int):
         """Добавить ресурс"""
-        if resource not in self.resources:
-            self.resources[resource] = 0
-        self.resources[resource] += amount
+        if self.store is None:
+            self._amounts[RESOURCE_INDEX[resource]] += amount
+        else:
+            self.resources[resource] = self.get_resource(resource) + amount
+        self.value_stamp = -1
     
     def remove_resource(self, resource: str, amount: int) -> bool:
         """Удалить ресурс (если достаточно)"""
-        if self.get_resource(resource) >= amount:
-            self.resources[resource] -= amount
-            if self.resources[resource] == 0:
-                del self.resources[resource]
-            return True
-        return False
+        remaining = self.get_resource(resource) - amount
+        if remaining < 0:
+            return False
+        self.value_stamp = -1
+        if remaining:
+            self.resources[resource] = remaining
+        else:
+            self.resources.pop(resource, None)
+        return True
     
     def has_resources(self, costs: Dict[str, int]) -> bool:
         """Проверить, достаточно ли ресурсов"""
@@ -78,83 +308,387 @@ class Player:
             self.remove_resource(resource, amount)
         return True
     
-    def get_building(self, building_id: str) -> Optional[Building]:
+    def get_building(self, building_id: int) -> Optional[Building]:
         """Найти объект по ID"""
-        for building in self.buildings:
-            if building.id == building_id:
-                return building
-        return None
+        return self.buildings.get(building_id)
     
-    def remove_building(self, building_id: str) -> bool:
+    def remove_building(self, building_id: int) -> bool:
         """Удалить объект"""
-        for i, building in enumerate(self.buildings):
-            if building.id == building_id:
-                self.buildings.pop(i)
-                return True
-        return False
+        return self.buildings.remove(building_id)
+
+
+# Действия в расписании переходов
+TRANSITION_COMPLETE = "complete"  # BUILDING -> COMPLETED (фаза обновления состояния)
+TRANSITION_ACTIVATE = "activate"  # COMPLETED -> ACTIVE (перед начислением дохода)
+TRANSITION_SELL = "sell"  # продажа объекта FOR_SALE (фаза доходов)
+
+
+def add_count(counts: Dict, key, delta: int):
+    """Изменить счетчик в словаре, удаляя нулевые значения"""
+    value = counts.get(key, 0) + delta
+    if value:
+        counts[key] = value
+    else:
+        counts.pop(key, None)
+
+
+class BuildingRegistry:
+    """
+    Реестр всех объектов игры
+    Выдает компактные уникальные целые ID и хранит индексы
+    ID -> объект и ID -> владелец (псевдоним разбирается по ID в его конце),
+    а также агрегаты, обновляемые при каждом изменении статуса.
+    Статус зарегистрированного объекта меняется только через set_status.
+    Будущие переходы статусов хранятся в расписании по раундам,
+    чтобы обработка раунда затрагивала только меняющиеся объекты
+    """
+    
+    def __init__(self):
+        self.next_id = 1
+        self.buildings: Dict[int, Building] = {}
+        self.owners: Dict[int, Player] = {}
+        
+        # Агрегаты
+        self.status_counts: Dict[BuildingStatus, int] = {status: 0 for status in BuildingStatus}
+        self.type_status_counts: Dict[str, Dict[BuildingStatus, int]] = {}  # {тип: {статус: кол-во}}
+        # Владение считается без объектов, выставленных на продажу
+        self.owners_by_type: Dict[str, Dict[str, int]] = {}  # {тип: {player_id: кол-во}}
+        self.owned_by_player: Dict[str, Dict[str, int]] = {}  # {player_id: {тип: кол-во}}
+        self.active_by_player: Dict[str, Dict[str, int]] = {}  # {player_id: {тип: кол-во активных}}
+        
+        # Расписание переходов: {раунд: {действие: [building_id]}}
+        self.schedule: Dict[int, Dict[str, List[int]]] = {}
+    
+    def allocate_id(self) -> int:
+        """Выдать новый уникальный ID (ID не переиспользуются)"""
+        building_id = self.next_id
+        self.next_id += 1
+        return building_id
+    
+    def register(self, player: Player, building: Building):
+        """Зарегистрировать объект и добавить его игроку"""
+        self.buildings[building.id] = building
+        self.owners[building.id] = player
+        player.buildings.append(building)
+        self.count_building(building, player, 1)
+    
+    def resolve_id(self, building_id) -> Optional[int]:
+        """Привести ID из API (число, строка с числом или псевдоним) к целому ID"""
+        if isinstance(building_id, int):
+            return building_id
+        if isinstance(building_id, str):
+            if building_id.isdigit():
+                return int(building_id)
+            # Псевдоним заканчивается на ID объекта, проверяем его целиком
+            _, _, tail = building_id.rpartition("_")
+            if tail.isdigit():
+                building = self.buildings.get(int(tail))
+                if building is not None and building.alias == building_id:
+                    return building.id
+        return None
+    
+    def get(self, building_id) -> Optional[Building]:
+        """Найти объект по ID или псевдониму"""
+        return self.buildings.get(self.resolve_id(building_id))
+    
+    def get_owner(self, building_id) -> Optional[Player]:
+        """Найти владельца объекта"""
+        return self.owners.get(self.resolve_id(building_id))
+    
+    def remove(self, building_id: int) -> bool:
+        """Удалить объект из реестра и у владельца"""
+        building = self.buildings.pop(building_id, None)
+        if building is None:
+            return False
+        owner = self.owners.pop(building_id)
+        owner.remove_building(building_id)
+        self.count_building(building, owner, -1)
+        return True
+    
+    def set_status(self, building: Building, status: BuildingStatus):
+        """Изменить статус объекта с обновлением агрегатов"""
+        owner = self.owners[building.id]
+        self.count_building(building, owner, -1)
+        building.status = status
+        self.count_building(building, owner, 1)
+    
+    def count_building(self, building: Building, owner: Player, delta: int):
+        """Учесть объект в агрегатах (delta = 1) или убрать из них (delta = -1)"""
+        owner.value_stamp = -1
+        self.status_counts[building.status] += delta
+        by_status = self.type_status_counts.get(building.name)
+        if by_status is None:
+            by_status = {status: 0 for status in BuildingStatus}
+            self.type_status_counts[building.name] = by_status
+        by_status[building.status] += delta
+        
+        if building.status != BuildingStatus.FOR_SALE:
+            add_count(self.owners_by_type.setdefault(building.name, {}), owner.id, delta)
+            add_count(self.owned_by_player.setdefault(owner.id, {}), building.name, delta)
+            if owner.store is not None:
+                owner.store.add_owned(owner.slot, building.name, delta)
+        if building.status == BuildingStatus.ACTIVE:
+            add_count(self.active_by_player.setdefault(owner.id, {}), building.name, delta)
+            if owner.store is not None:
+                owner.store.add_buildings(owner.slot, building.name, delta)
+    
+    def schedule_transition(self, round_number: int, action: str, building_id: int):
+        """
+        Запланировать переход объекта на раунд
+        
+        Args:
+            round_number: Раунд, при обработке которого выполнится переход
+            action: TRANSITION_COMPLETE, TRANSITION_ACTIVATE или TRANSITION_SELL
+            building_id: ID объекта
+        """
+        self.schedule.setdefault(round_number, {}).setdefault(action, []).append(building_id)
+    
+    def pop_transitions(self, round_number: int, action: str) -> List[Building]:
+        """
+        Забрать из расписания объекты, запланированные на раунд
+        Уже удаленные (проданные) объекты пропускаются,
+        текущий статус проверяет вызывающий код
+        """
+        actions = self.schedule.get(round_number)
+        if actions is None:
+            return []
+        building_ids = actions.pop(action, [])
+        if not actions:
+            del self.schedule[round_number]
+        return [self.buildings[building_id] for building_id in building_ids if building_id in self.buildings]
+    
+    def active_counts(self) -> Dict[str, int]:
+        """Количество активных объектов каждого типа"""
+        return {
+            name: by_status[BuildingStatus.ACTIVE]
+            for name, by_status in self.type_status_counts.items()
+            if by_status[BuildingStatus.ACTIVE] > 0
+        }
+    
+    def owned_counts(self) -> Dict[str, int]:
+        """Количество объектов каждого типа (без выставленных на продажу)"""
+        result = {}
+        for name, by_status in self.type_status_counts.items():
+            count = sum(by_status.values()) - by_status[BuildingStatus.FOR_SALE]
+            if count > 0:
+                result[name] = count
+        return result
+    
+    def type_owners(self, building_name: str) -> Dict[str, int]:
+        """Владельцы объектов типа: {player_id: кол-во} (без выставленных на продажу)"""
+        return self.owners_by_type.get(building_name, {})
+    
+    def player_owned_counts(self, player_id: str) -> Dict[str, int]:
+        """Объекты игрока по типам: {тип: кол-во} (без выставленных на продажу)"""
+        return self.owned_by_player.get(player_id, {})
+    
+    def player_active_counts(self, player_id: str) -> Dict[str, int]:
+        """Активные объекты игрока по типам: {тип: кол-во}"""
+        return self.active_by_player.get(player_id, {})
+    
+    def __len__(self) -> int:
+        return len(self.buildings)
 
 
 class Game:
     """Игровой движок"""
     
-    def __init__(self, num_players: int = 10):
+    def __init__(self, num_players: int = 10, array_state: Optional[bool] = None,
+                 market_config: Optional[MarketConfig] = None):
         """
         Args:
             num_players: Количество игроков
+            array_state: Хранить состояние игроков в массивах NumPy
+                (по умолчанию - для лобби от ARRAY_STATE_MIN_PLAYERS игроков, если есть numpy)
+            market_config: Параметры рынка этой игры (по умолчанию - MARKET_CONFIG)
         """
         self.num_players = num_players
         self.current_round = 1
-        self.players: List[Player] = []
+        self.players: List[Player] = []  # Порядок добавления (для турнирной таблицы)
+        self.players_by_id: Dict[str, Player] = {}  # Индекс для поиска за O(1)
         
         # Состояние рынка
+        # Рейтинг игроков по капитализации (первые строки таблицы и место игрока)
+        self.ranking = PlayerRanking()
+        
+        # Версия оценки игроков: растет при смене цен и начислении дохода,
+        # кэш капитализации игрока с другой версией считается устаревшим
+        self.valuation_version = 0
+        
+        # Цены хранятся в сотых монеты и меняются только присваиванием
+        # prices_cents или current_prices (растет price_version)
+        self.price_version = 0
+        self.cost_table = CostTable()
         self.current_prices = RESOURCE_PRICES.copy()
         self.previous_round_players_bought: Dict[str, int] = {}
         self.previous_round_players_sold: Dict[str, int] = {}
         
         # Системы
-        self.market = MarketDynamics(num_players)
+        self.market = MarketDynamics(num_players, market_config)
+        # Новые параметры рынка, ждущие границы раунда (см. set_market_config)
+        self.pending_market_config: Optional[MarketConfig] = None
         self.event_system = EventSystem()
         
         # История раундов
         self.round_history: List[Dict] = []
         
         # Отслеживание действий текущего раунда (для расчета спроса/предложения)
-        self.current_round_players_bought: Dict[str, set] = {}  # {ресурс: set(player_ids)}
-        self.current_round_players_sold: Dict[str, set] = {}    # {ресурс: set(player_ids)}
+        # {ресурс: битовая маска порядковых номеров игроков}
+        self.current_round_players_bought: Dict[str, PlayerBitset] = {}
+        self.current_round_players_sold: Dict[str, PlayerBitset] = {}
+        # Маски закрытых раундов (для аналитики): {"bought": {...}, "sold": {...}} на раунд
+        self.activity_history: List[Dict[str, Dict[str, PlayerBitset]]] = []
+        
+        # Капитализация игроков на момент закрытия предыдущего раунда
+        # {player_id: total_value} - для расчета прироста в турнирной таблице
+        self.previous_net_worth: Dict[str, float] = {}
+        
+        # Реестр всех объектов игры
+        self.building_registry = BuildingRegistry()
+        
+        # Состояние игроков в массивах (None - хранится в объектах Player)
+        if array_state is None:
+            array_state = HAS_NUMPY and num_players >= ARRAY_STATE_MIN_PLAYERS
+        self.player_store: Optional[PlayerStore] = PlayerStore() if array_state else None
+        
+        # Версия состояния игры (растет при каждом изменении)
+        self.state_version = 0
+    
+    def bump_version(self, player: Optional[Player] = None):
+        """
+        Отметить изменение состояния игры (и игрока, если он указан)
+        Изменение одного игрока обновляет его место в рейтинге,
+        изменение без игрока (обработка раунда) делает рейтинг устаревшим
+        """
+        self.state_version += 1
+        if player is not None:
+            player.version += 1
+            if self.ranking.valid:
+                self.ranking.update(player.id, self.calculate_player_value(player)["total_value_cents"])
+        else:
+            self.ranking.invalidate()
     
     def add_player(self, player_id: str, player_name: str) -> bool:
         """Добавить игрока"""
         if len(self.players) >= self.num_players:
             return False
-        if any(p.id == player_id for p in self.players):
+        if player_id in self.players_by_id:
             return False  # Игрок уже существует
         
         player = Player(id=player_id, name=player_name)
+        player.slot = len(self.players)
+        if self.player_store is not None:
+            player.attach(self.player_store)
         self.players.append(player)
+        self.players_by_id[player_id] = player
+        self.bump_version(player)
         return True
     
     def get_player(self, player_id: str) -> Optional[Player]:
         """Получить игрока по ID"""
-        for player in self.players:
-            if player.id == player_id:
-                return player
-        return None
+        return self.players_by_id.get(player_id)
+    
+    @property
+    def prices_cents(self) -> Mapping[str, int]:
+        """Текущие цены ресурсов в сотых монеты (только чтение, см. current_prices)"""
+        return MappingProxyType(self._prices_cents)
+    
+    @prices_cents.setter
+    def prices_cents(self, prices: Mapping[str, int]):
+        self._prices_cents = dict(prices)
+        self._current_prices = prices_to_coins(prices)
+        self.price_version += 1
+        self.valuation_version += 1
+        self.ranking.invalidate()
+    
+    @property
+    def current_prices(self) -> Mapping[str, float]:
+        """
+        Текущие цены ресурсов в монетах (только чтение: изменить цены можно
+        только присваиванием, чтобы выросли price_version и valuation_version)
+        """
+        return MappingProxyType(self._current_prices)
+    
+    @current_prices.setter
+    def current_prices(self, prices: Dict[str, float]):
+        self.prices_cents = prices_to_cents(prices)
+    
+    def get_cost_table(self) -> CostTable:
+        """Таблица стоимости объектов для текущей версии цен"""
+        self.cost_table.update(self._prices_cents, self.price_version)
+        return self.cost_table
     
     def calculate_building_cost(self, building_name: str) -> float:
         """Рассчитать стоимость объекта в монетах по текущим ценам"""
-        costs = BUILDING_COSTS.get(building_name, {})
-        total = 0
-        for resource, amount in costs.items():
-            total += amount * self.current_prices.get(resource, 0)
-        return total
+        return self.get_cost_table().cost(building_name)
     
     def calculate_building_sale_price(self, building: Building) -> float:
         """Рассчитать цену продажи объекта (по текущим ценам ресурсов)"""
-        costs = BUILDING_COSTS.get(building.name, {})
-        total = 0
-        for resource, amount in costs.items():
-            total += amount * self.current_prices.get(resource, 0)
-        return total
+        return self.calculate_building_cost(building.name)
+    
+    def calculate_building_sale_price_cents(self, building: Building) -> int:
+        """Цена продажи объекта в сотых монеты"""
+        return self.get_cost_table().cost_cents(building.name)
+    
+    def get_building(self, building_id) -> Optional[Building]:
+        """Получить объект по ID или строковому псевдониму"""
+        return self.building_registry.get(building_id)
+    
+    def calculate_player_value(self, player: Player) -> Dict[str, float]:
+        """
+        Рассчитать капитализацию игрока по текущим ценам
+        Считается в сотых монеты, в монеты переводится один раз в конце.
+        Результат кэшируется в игроке и пересчитывается, только если игрок
+        изменился или сменилась версия оценки (цены, доход раунда)
+        
+        Returns:
+            {"resources_value": float, "buildings_value": float, "total_value": float,
+             "total_value_cents": int} (общий для вызовов словарь - не изменять)
+        """
+        if player.value_stamp == self.valuation_version:
+            return player.cached_value
+        
+        # Считаем стоимость всех ресурсов
+        prices = self._prices_cents
+        resources_value = sum(
+            amount * prices.get(resource, 0)
+            for resource, amount in player.resources.items()
+        )
+        
+        # Считаем стоимость всех объектов (кроме выставленных на продажу)
+        costs = self.get_cost_table().costs_cents
+        buildings_value = sum(
+            count * costs.get(building_name, 0)
+            for building_name, count in self.building_registry.player_owned_counts(player.id).items()
+        )
+        
+        total_value_cents = player.money_cents + resources_value + buildings_value
+        player.cached_value = {
+            "resources_value": resources_value / CENTS,
+            "buildings_value": buildings_value / CENTS,
+            "total_value": total_value_cents / CENTS,
+            "total_value_cents": total_value_cents
+        }
+        player.value_stamp = self.valuation_version
+        return player.cached_value
+    
+    def calculate_player_values(self) -> Dict:
+        """
+        Капитализация всех игроков в режиме массивов (в порядке self.players)
+        
+        Returns:
+            {"money", "resources_value", "buildings_value", "total_value"} - массивы NumPy
+            (int64, в сотых монеты)
+        """
+        cost_table = self.get_cost_table()
+        return self.player_store.valuation(cost_table.price_array, cost_table.cost_array)
+    
+    def calculate_growth_percent(self, player_id: str, total_value: float) -> float:
+        """Прирост капитализации игрока с закрытия предыдущего раунда (в процентах)"""
+        previous_value = self.previous_net_worth.get(player_id)
+        if not previous_value or previous_value <= 0:
+            return 0
+        return ((total_value - previous_value) / previous_value) * 100
     
     # ========== ДЕЙСТВИЯ ИГРОКОВ ==========
     
@@ -169,27 +703,32 @@ class Game:
         if not player:
             return {"success": False, "message": "Игрок не найден"}
         
-        if resource not in RESOURCE_PRICES:
+        if not isinstance(resource, str) or resource not in RESOURCE_PRICES:
             return {"success": False, "message": "Неизвестный ресурс"}
         
+        # Деньги хранятся целыми сотыми: дробное количество не должно до них дойти
+        if not isinstance(amount, int) or isinstance(amount, bool):
+            return {"success": False, "message": "Количество должно быть целым числом"}
+        
         if amount <= 0:
             return {"success": False, "message": "Количество должно быть положительным"}
         
-        cost = amount * self.current_prices[resource]
+        cost = amount * self._prices_cents[resource]
         
-        if player.money < cost:
-            return {"success": False, "message": f"Недостаточно денег. Нужно {cost:.2f}, есть {player.money:.2f}"}
+        if player.money_cents < cost:
+            return {"success": False, "message": f"Недостаточно денег. Нужно {format_money(cost)}, есть {format_money(player.money_cents)}"}
         
         # Покупаем
-        player.money -= cost
+        player.money_cents -= cost
         player.add_resource(resource, amount)
         
         # Отслеживаем для расчета спроса
         if resource not in self.current_round_players_bought:
-            self.current_round_players_bought[resource] = set()
-        self.current_round_players_bought[resource].add(player_id)
+            self.current_round_players_bought[resource] = PlayerBitset(capacity=self.num_players)
+        self.current_round_players_bought[resource].add(player.slot)
+        self.bump_version(player)
         
-        return {"success": True, "message": f"Куплено {amount} {resource} за {cost:.2f} монет", "cost": cost}
+        return {"success": True, "message": f"Куплено {amount} {resource} за {format_money(cost)} монет", "cost": to_coins(cost)}
     
     def sell_resource(self, player_id: str, resource: str, amount: int) -> Dict:
         """
@@ -202,31 +741,36 @@ class Game:
         if not player:
             return {"success": False, "message": "Игрок не найден"}
         
-        if resource not in RESOURCE_PRICES:
+        if not isinstance(resource, str) or resource not in RESOURCE_PRICES:
             return {"success": False, "message": "Неизвестный ресурс"}
         
+        # Деньги хранятся целыми сотыми: дробное количество не должно до них дойти
+        if not isinstance(amount, int) or isinstance(amount, bool):
+            return {"success": False, "message": "Количество должно быть целым числом"}
+        
         if amount <= 0:
             return {"success": False, "message": "Количество должно быть положительным"}
         
         if not player.remove_resource(resource, amount):
             return {"success": False, "message": f"Недостаточно {resource}"}
         
-        income = amount * self.current_prices[resource]
-        player.money += income
+        income = amount * self._prices_cents[resource]
+        player.money_cents += income
         
         # Отслеживаем для расчета предложения
         if resource not in self.current_round_players_sold:
-            self.current_round_players_sold[resource] = set()
-        self.current_round_players_sold[resource].add(player_id)
+            self.current_round_players_sold[resource] = PlayerBitset(capacity=self.num_players)
+        self.current_round_players_sold[resource].add(player.slot)
+        self.bump_version(player)
         
-        return {"success": True, "message": f"Продано {amount} {resource} за {income:.2f} монет", "income": income}
+        return {"success": True, "message": f"Продано {amount} {resource} за {format_money(income)} монет", "income": to_coins(income)}
     
     def start_building(self, player_id: str, building_name: str) -> Dict:
         """
         Начать строительство объекта
         
         Returns:
-            {"success": bool, "message": str, "building_id": str}
+            {"success": bool, "message": str, "building_id": int}
         """
         player = self.get_player(player_id)
         if not player:
@@ -244,19 +788,24 @@ class Game:
         player.remove_resources(costs)
         
         # Создаем объект
-        building_id = f"{player_id}_{building_name}_{self.current_round}_{len(player.buildings)}"
+        building_id = self.building_registry.allocate_id()
         building = Building(
             id=building_id,
             name=building_name,
             started_round=self.current_round,
             completed_round=self.current_round + 1,  # Завершится в следующем раунде
-            status=BuildingStatus.BUILDING
+            status=BuildingStatus.BUILDING,
+            owner_id=player.id
         )
-        player.buildings.append(building)
+        self.building_registry.register(player, building)
+        # Завершится при обработке раунда completed_round, станет активным в следующем
+        self.building_registry.schedule_transition(building.completed_round, TRANSITION_COMPLETE, building_id)
+        self.building_registry.schedule_transition(building.completed_round + 1, TRANSITION_ACTIVATE, building_id)
+        self.bump_version(player)
         
         return {"success": True, "message": f"Начато строительство {building_name}", "building_id": building_id}
     
-    def put_building_for_sale(self, player_id: str, building_id: str) -> Dict:
+    def put_building_for_sale(self, player_id: str, building_id) -> Dict:
         """
         Выставить объект на продажу
         
@@ -267,7 +816,8 @@ class Game:
         if not player:
             return {"success": False, "message": "Игрок не найден"}
         
-        building = player.get_building(building_id)
+        # ID может прийти числом, строкой или строковым псевдонимом
+        building = player.get_building(self.building_registry.resolve_id(building_id))
         if not building:
             return {"success": False, "message": "Объект не найден"}
         
@@ -278,12 +828,186 @@ class Game:
             return {"success": False, "message": "Нельзя продать объект, который еще строится"}
         
         # Фиксируем цену продажи (по текущим ценам ресурсов)
-        sale_price = self.calculate_building_sale_price(building)
-        building.status = BuildingStatus.FOR_SALE
+        sale_price = self.calculate_building_sale_price_cents(building)
+        self.building_registry.set_status(building, BuildingStatus.FOR_SALE)
         building.sale_round = self.current_round
-        building.sale_price = sale_price
+        building.sale_price_cents = sale_price
+        # Продается при обработке следующего раунда
+        self.building_registry.schedule_transition(self.current_round + 1, TRANSITION_SELL, building.id)
+        self.bump_version(player)
         
-        return {"success": True, "message": f"Объект выставлен на продажу за {sale_price:.2f} монет", "sale_price": sale_price}
+        return {"success": True, "message": f"Объект выставлен на продажу за {format_money(sale_price)} монет", "sale_price": to_coins(sale_price)}
+    
+    def apply_actions(self, player_id: str, actions: List[Dict]) -> Dict:
+        """
+        Выполнить несколько действий игрока по принципу "все или ничего"
+        Сначала все действия проверяются на копии денег, ресурсов и объектов игрока
+        (с учетом предыдущих действий пакета), и только если проходят все, выполняются
+        
+        Args:
+            actions: Список действий по порядку:
+                {"type": "buy", "resource": str, "amount": int}
+                {"type": "sell", "resource": str, "amount": int}
+                {"type": "build", "building_name": str}
+                {"type": "sell_building", "building_id": int | str}
+        
+        Returns:
+            {"success": bool, "message": str, "results": [результат каждого действия],
+             "failed_index": номер непрошедшего действия или None}
+        """
+        player = self.get_player(player_id)
+        if not player:
+            return {"success": False, "message": "Игрок не найден", "results": [], "failed_index": None}
+        
+        for index, error in enumerate(self.check_actions(player, actions)):
+            if error is not None:
+                return {
+                    "success": False,
+                    "message": f"Действие {index + 1}: {error}",
+                    "results": [],
+                    "failed_index": index
+                }
+        
+        results = []
+        for action in actions:
+            action_type = action["type"]
+            if action_type == "buy":
+                result = self.buy_resource(player_id, action["resource"], action.get("amount", 1))
+            elif action_type == "sell":
+                result = self.sell_resource(player_id, action["resource"], action.get("amount", 1))
+            elif action_type == "build":
+                result = self.start_building(player_id, action["building_name"])
+            else:
+                result = self.put_building_for_sale(player_id, action["building_id"])
+            results.append(result)
+        
+        return {
+            "success": True,
+            "message": f"Выполнено действий: {len(results)}",
+            "results": results,
+            "failed_index": None
+        }
+    
+    def plan_building(self, player: Player, building_name: str) -> Dict:
+        """
+        Недостающие для объекта ресурсы и их стоимость по текущим ценам
+        
+        Returns:
+            {"shortfall": {ресурс: количество}, "cost_cents": int (сотые), "can_afford": bool}
+        """
+        shortfall = {}
+        cost = 0
+        for resource, amount in BUILDING_COSTS[building_name].items():
+            missing = amount - player.get_resource(resource)
+            if missing > 0:
+                shortfall[resource] = missing
+                cost += missing * self._prices_cents[resource]
+        return {"shortfall": shortfall, "cost_cents": cost, "can_afford": player.money_cents >= cost}
+    
+    def buy_and_build(self, player_id: str, building_name: str) -> Dict:
+        """
+        Докупить недостающие ресурсы и начать строительство (все или ничего)
+        Покупки выполняются обычными действиями покупки, поэтому учитываются в спросе раунда
+        
+        Returns:
+            Результат apply_actions, дополненный {"shortfall": {...}, "cost": float, "building_id": int}
+        """
+        player = self.get_player(player_id)
+        if not player:
+            return {"success": False, "message": "Игрок не найден"}
+        
+        if not isinstance(building_name, str) or building_name not in BUILDING_COSTS:
+            return {"success": False, "message": "Неизвестный объект"}
+        
+        plan = self.plan_building(player, building_name)
+        if not plan["can_afford"]:
+            return {
+                "success": False,
+                "message": f"Недостаточно денег. Нужно {format_money(plan['cost_cents'])}, есть {format_money(player.money_cents)}",
+                "shortfall": plan["shortfall"],
+                "cost": 0
+            }
+        actions = [
+            {"type": "buy", "resource": resource, "amount": amount}
+            for resource, amount in plan["shortfall"].items()
+        ]
+        actions.append({"type": "build", "building_name": building_name})
+        
+        result = self.apply_actions(player_id, actions)
+        result["shortfall"] = plan["shortfall"]
+        result["cost"] = to_coins(plan["cost_cents"]) if result["success"] else 0
+        if result["success"]:
+            build_result = result["results"][-1]
+            result["building_id"] = build_result["building_id"]
+            result["message"] = build_result["message"]
+            if plan["shortfall"]:
+                result["message"] += f" (докуплено ресурсов на {format_money(plan['cost_cents'])} монет)"
+        return result
+    
+    def check_actions(self, player: Player, actions: List[Dict]):
+        """
+        Проверить пакет действий, не меняя состояние игры
+        Выдает по порядку None для допустимого действия или текст ошибки
+        (после первой ошибки проверка останавливается)
+        """
+        money = player.money_cents
+        resources = dict(player.resources)
+        selling = set()  # Объекты, выставляемые на продажу этим пакетом
+        
+        for action in actions:
+            action_type = action.get("type") if isinstance(action, dict) else None
+            error = None
+            
+            if action_type in ("buy", "sell"):
+                resource = action.get("resource")
+                amount = action.get("amount", 1)
+                if not isinstance(resource, str) or resource not in RESOURCE_PRICES:
+                    error = "Неизвестный ресурс"
+                elif not isinstance(amount, int) or isinstance(amount, bool):
+                    error = "Количество должно быть целым числом"
+                elif amount <= 0:
+                    error = "Количество должно быть положительным"
+                elif action_type == "buy":
+                    cost = amount * self._prices_cents[resource]
+                    if money < cost:
+                        error = f"Недостаточно денег. Нужно {format_money(cost)}, есть {format_money(money)}"
+                    else:
+                        money -= cost
+                        resources[resource] = resources.get(resource, 0) + amount
+                elif resources.get(resource, 0) < amount:
+                    error = f"Недостаточно {resource}"
+                else:
+                    resources[resource] -= amount
+                    money += amount * self._prices_cents[resource]
+            
+            elif action_type == "build":
+                building_name = action.get("building_name")
+                costs = BUILDING_COSTS.get(building_name) if isinstance(building_name, str) else None
+                if costs is None:
+                    error = "Неизвестный объект"
+                elif any(resources.get(resource, 0) < amount for resource, amount in costs.items()):
+                    error = "Недостаточно ресурсов"
+                else:
+                    for resource, amount in costs.items():
+                        resources[resource] -= amount
+            
+            elif action_type == "sell_building":
+                building = player.get_building(self.building_registry.resolve_id(action.get("building_id")))
+                if not building:
+                    error = "Объект не найден"
+                elif building.status == BuildingStatus.FOR_SALE or building.id in selling:
+                    error = "Объект уже выставлен на продажу"
+                elif building.status == BuildingStatus.BUILDING:
+                    error = "Нельзя продать объект, который еще строится"
+                else:
+                    selling.add(building.id)
+            
+            else:
+                error = "Неизвестное действие"
+            
+            yield error
+            if error is not None:
+                return
     
     # ========== ФАЗЫ РАУНДА ==========
     
@@ -309,15 +1033,15 @@ class Game:
         # Рассчитываем новые цены
         # Используем спрос/предложение из ПРЕДЫДУЩЕГО раунда
         # и события из ТЕКУЩЕГО раунда
-        new_prices = self.market.calculate_resource_prices(
-            previous_prices=self.current_prices,
+        new_prices = self.market.calculate_resource_prices_cents(
+            previous_prices=self._prices_cents,
             players_bought=self.previous_round_players_bought,
             players_sold=self.previous_round_players_sold,
             event_modifiers=resource_mods
         )
         
         # Обновляем цены
-        self.current_prices = new_prices
+        self.prices_cents = new_prices
         
         return {
             "events": {
@@ -329,7 +1053,7 @@ class Game:
             "resource_modifiers": resource_mods,
             "building_modifiers": building_mods,
             "prices_changed": True,
-            "new_prices": new_prices.copy()
+            "new_prices": self.current_prices.copy()
         }
     
     def phase_income(self, building_modifiers: Dict[str, float]) -> Dict:
@@ -344,33 +1068,33 @@ class Game:
         
         # 1. Продажа объектов из предыдущего раунда
         # Объекты, выставленные на продажу в предыдущем раунде, продаются сейчас
-        for player in self.players:
-            buildings_to_remove = []
-            for building in player.buildings:
-                if (building.status == BuildingStatus.FOR_SALE and 
-                    building.sale_round is not None and
-                    building.sale_round < self.current_round):
-                    # Продаем объект (выставлен в предыдущем раунде)
-                    player.money += building.sale_price
-                    buildings_to_remove.append(building.id)
-                    income_results["buildings_sold"].append({
-                        "player_id": player.id,
-                        "building_name": building.name,
-                        "sale_price": building.sale_price
-                    })
-            
-            # Удаляем проданные объекты
-            for building_id in buildings_to_remove:
-                player.remove_building(building_id)
+        # (берем только запланированные на этот раунд)
+        for building in self.building_registry.pop_transitions(self.current_round, TRANSITION_SELL):
+            if building.status != BuildingStatus.FOR_SALE:
+                continue
+            player = self.building_registry.get_owner(building.id)
+            player.money_cents += building.sale_price_cents
+            income_results["buildings_sold"].append({
+                "player_id": player.id,
+                "building_name": building.name,
+                "sale_price": building.sale_price
+            })
+            self.building_registry.remove(building.id)
         
         # 2. Начисление дохода от активных объектов
         # Объекты, которые были COMPLETED в предыдущем раунде, теперь ACTIVE и приносят доход
-        # Считаем количество каждого типа объектов
-        building_counts = {}
-        for player in self.players:
-            for building in player.buildings:
-                if building.status == BuildingStatus.ACTIVE:
-                    building_counts[building.name] = building_counts.get(building.name, 0) + 1
+        # Количество каждого типа объектов берем из агрегатов реестра
+        building_counts = self.building_registry.active_counts()
+        
+        # В режиме массивов - доходы объектов векторами и одно матричное произведение на всех игроков
+        if self.player_store is not None:
+            coins, amounts = self.market.calculate_building_income_arrays(building_counts, building_modifiers)
+            income_results["income_distributed"] = self.player_store.distribute_income(
+                coins, amounts, self.players, self.players_by_id
+            )
+            # Доход записан в массивы в обход объектов Player - кэши оценки устарели у всех
+            self.valuation_version += 1
+            return income_results
         
         # Рассчитываем доходы с учетом насыщения и событий
         new_incomes = self.market.calculate_building_incomes(
@@ -379,26 +1103,27 @@ class Game:
             building_modifiers
         )
         
-        # Начисляем доходы игрокам
+        # Начисляем доходы игрокам (по количеству активных объектов каждого типа)
+        coins_cents = {name: to_cents(income.get("монеты", 0)) for name, income in new_incomes.items()}
         for player in self.players:
             player_income = {"монеты": 0, "ресурсы": {}}
             
-            for building in player.buildings:
-                if building.status == BuildingStatus.ACTIVE:
-                    income = new_incomes.get(building.name, {"монеты": 0, "ресурсы": {}})
-                    
-                    # Монеты
-                    coins = income.get("монеты", 0)
-                    player.money += coins
-                    player_income["монеты"] += coins
-                    
-                    # Ресурсы
-                    for resource, amount in income.get("ресурсы", {}).items():
-                        player.add_resource(resource, int(amount))
-                        if resource not in player_income["ресурсы"]:
-                            player_income["ресурсы"][resource] = 0
-                        player_income["ресурсы"][resource] += amount
+            for building_name, count in self.building_registry.player_active_counts(player.id).items():
+                income = new_incomes.get(building_name, {"монеты": 0, "ресурсы": {}})
+                
+                # Монеты (в сотых)
+                coins = coins_cents.get(building_name, 0) * count
+                player.money_cents += coins
+                player_income["монеты"] += coins
+                
+                # Ресурсы
+                for resource, amount in income.get("ресурсы", {}).items():
+                    player.add_resource(resource, int(amount) * count)
+                    if resource not in player_income["ресурсы"]:
+                        player_income["ресурсы"][resource] = 0
+                    player_income["ресурсы"][resource] += amount * count
             
+            player_income["монеты"] /= CENTS
             income_results["income_distributed"][player.id] = player_income
         
         return income_results
@@ -409,14 +1134,14 @@ class Game:
         Игроки совершают действия (покупка, продажа, строительство)
         Эта фаза собирает данные о спросе и предложении для следующего раунда
         """
-        # Преобразуем sets в количество игроков
+        # Количество игроков - число единичных бит маски
         players_bought = {
-            resource: len(player_ids) 
-            for resource, player_ids in self.current_round_players_bought.items()
+            resource: len(player_slots)
+            for resource, player_slots in self.current_round_players_bought.items()
         }
         players_sold = {
-            resource: len(player_ids) 
-            for resource, player_ids in self.current_round_players_sold.items()
+            resource: len(player_slots)
+            for resource, player_slots in self.current_round_players_sold.items()
         }
         
         return {
@@ -432,24 +1157,31 @@ class Game:
         self.previous_round_players_bought = players_bought.copy()
         self.previous_round_players_sold = players_sold.copy()
         
-        # Обновляем статусы объектов
-        for player in self.players:
-            for building in player.buildings:
-                if building.status == BuildingStatus.BUILDING:
-                    if self.current_round >= building.completed_round:
-                        # Объект завершен в этом раунде
-                        # Становится COMPLETED, в следующем раунде станет ACTIVE и начнет приносить доход
-                        building.status = BuildingStatus.COMPLETED
-                elif building.status == BuildingStatus.COMPLETED:
-                    # Объект был завершен в предыдущем раунде, теперь становится активным
-                    # В следующем раунде начнет приносить доход
-                    building.status = BuildingStatus.ACTIVE
+        # Обновляем статусы объектов, завершаемых в этом раунде
+        # Становятся COMPLETED, в следующем раунде станут ACTIVE и начнут приносить доход
+        for building in self.building_registry.pop_transitions(self.current_round, TRANSITION_COMPLETE):
+            if building.status == BuildingStatus.BUILDING:
+                self.building_registry.set_status(building, BuildingStatus.COMPLETED)
     
     def start_round(self):
-        """Начать новый раунд (сбросить отслеживание действий)"""
+        """Начать новый раунд (сбросить отслеживание действий, маски раунда - в историю)"""
+        self.activity_history.append({
+            "bought": self.current_round_players_bought,
+            "sold": self.current_round_players_sold
+        })
         self.current_round_players_bought = {}
         self.current_round_players_sold = {}
     
+    def get_round_activity(self, round_number: int, action: str, resource: str) -> List[str]:
+        """
+        ID игроков, которые купили ("bought") или продали ("sold") ресурс
+        в закрытом раунде round_number (пустой список, если раунд не закрыт)
+        """
+        if not 1 <= round_number <= len(self.activity_history):
+            return []
+        player_slots = self.activity_history[round_number - 1][action].get(resource, ())
+        return [self.players[slot].id for slot in player_slots]
+    
     def process_round(self) -> Dict:
         """
         Обработать полный раунд
@@ -458,6 +1190,9 @@ class Game:
         Returns:
             Результаты раунда
         """
+        # Параметры рынка меняются только между раундами
+        self.apply_pending_market_config()
+        
         round_result = {
             "round": self.current_round,
             "events": None,
@@ -465,6 +1200,17 @@ class Game:
             "prices": self.current_prices.copy()
         }
         
+        # Фиксируем капитализацию на момент закрытия раунда (для прироста)
+        if self.player_store is not None:
+            self.previous_net_worth = PlayerValues(
+                self.calculate_player_values()["total_value"] / CENTS, self.players, self.players_by_id
+            )
+        else:
+            self.previous_net_worth = {
+                player.id: self.calculate_player_value(player)["total_value"]
+                for player in self.players
+            }
+        
         # Фаза 1: События
         events_result = self.phase_events()
         round_result["events"] = events_result["events"]
@@ -473,11 +1219,10 @@ class Game:
         # Фаза 2: Начисление доходов
         # Сначала обновляем статусы объектов (COMPLETED -> ACTIVE)
         # чтобы они могли приносить доход в этом раунде
-        for player in self.players:
-            for building in player.buildings:
-                if building.status == BuildingStatus.COMPLETED:
-                    # Объект был завершен в предыдущем раунде, теперь активен
-                    building.status = BuildingStatus.ACTIVE
+        # (объекты, завершенные в предыдущем раунде и не выставленные на продажу)
+        for building in self.building_registry.pop_transitions(self.current_round, TRANSITION_ACTIVATE):
+            if building.status == BuildingStatus.COMPLETED:
+                self.building_registry.set_status(building, BuildingStatus.ACTIVE)
         
         building_modifiers = events_result.get("building_modifiers", {})
         income_result = self.phase_income(building_modifiers)
@@ -499,41 +1244,129 @@ class Game:
         
         # Сбрасываем отслеживание для следующего раунда
         self.start_round()
+        self.bump_version()
         
         return round_result
     
-    def get_leaderboard(self) -> List[Dict]:
-        """Получить турнирную таблицу"""
-        players_data = []
-        for player in self.players:
-            # Считаем стоимость всех ресурсов
-            resources_value = sum(
-                amount * self.current_prices.get(resource, 0)
-                for resource, amount in player.resources.items()
-            )
-            
-            # Считаем стоимость всех объектов
-            buildings_value = sum(
-                self.calculate_building_sale_price(building)
-                for building in player.buildings
-                if building.status != BuildingStatus.FOR_SALE
-            )
-            
-            total_value = player.money + resources_value + buildings_value
-            
-            players_data.append({
-                "player_id": player.id,
-                "name": player.name,
-                "money": round(player.money, 2),
-                "resources_value": round(resources_value, 2),
-                "buildings_value": round(buildings_value, 2),
-                "total_value": round(total_value, 2)
-            })
+    @property
+    def market_config(self) -> MarketConfig:
+        """Действующие параметры рынка"""
+        return self.market.config
+    
+    def set_market_config(self, config: MarketConfig):
+        """
+        Заменить параметры рынка
+        Новые параметры начинают действовать при обработке текущего раунда
+        (до этого раунд доигрывается с прежними)
+        """
+        self.pending_market_config = config
+    
+    def apply_pending_market_config(self):
+        if self.pending_market_config is not None:
+            self.market.config = self.pending_market_config
+            self.pending_market_config = None
+    
+    def get_leaderboard(self, limit: Optional[int] = None) -> List[Dict]:
+        """
+        Получить турнирную таблицу
+        
+        Args:
+            limit: Вернуть только первые limit строк
+        """
+        if self.player_store is not None:
+            return self.get_leaderboard_arrays(limit)
+        
+        players_data = [self.get_leaderboard_row(player) for player in self.players]
         
         # Сортируем по общей стоимости
         players_data.sort(key=lambda x: x["total_value"], reverse=True)
         
-        return players_data
+        return players_data[:limit]
+    
+    def get_leaderboard_row(self, player: Player) -> Dict:
+        """
+        Строка турнирной таблицы для игрока (копия)
+        Пересчитывается, только если изменилась оценка игрока или снимок прироста
+        """
+        value = self.calculate_player_value(player)
+        cache = player.row_cache
+        if cache is None or cache[0] is not value or cache[1] is not self.previous_net_worth:
+            cache = (value, self.previous_net_worth, self.build_leaderboard_row(player, value))
+            player.row_cache = cache
+        return dict(cache[2])
+    
+    def build_leaderboard_row(self, player: Player, value: Dict[str, float]) -> Dict:
+        """Построить строку турнирной таблицы по оценке игрока"""
+        total_value = value["total_value"]
+        return {
+            "player_id": player.id,
+            "name": player.name,
+            "money": player.money,
+            "resources_value": value["resources_value"],
+            "buildings_value": value["buildings_value"],
+            "total_value": total_value,
+            "growth_percent": round(self.calculate_growth_percent(player.id, total_value), 2)
+        }
+    
+    def get_ranking(self) -> PlayerRanking:
+        """Актуальный рейтинг игроков (перестраивается после смены цен или раунда)"""
+        if not self.ranking.valid:
+            if self.player_store is not None:
+                total_values = self.calculate_player_values()["total_value"].tolist()
+            else:
+                total_values = [self.calculate_player_value(player)["total_value_cents"] for player in self.players]
+            self.ranking.rebuild(zip((player.id for player in self.players), total_values))
+        return self.ranking
+    
+    def get_leaderboard_page(self, top: int, offset: int = 0) -> List[Dict]:
+        """
+        Строки турнирной таблицы на местах offset + 1 ... offset + top
+        Берутся из рейтинга без сортировки всех игроков
+        """
+        player_ids = self.get_ranking().page(offset, top)
+        return [self.get_leaderboard_row(self.players_by_id[player_id]) for player_id in player_ids]
+    
+    def get_player_rank(self, player_id: str) -> Optional[int]:
+        """Место игрока в турнирной таблице (с 1) или None, если игрока нет"""
+        return self.get_ranking().rank(player_id)
+    
+    def get_leaderboard_arrays(self, limit: Optional[int] = None) -> List[Dict]:
+        """Турнирная таблица в режиме массивов: оценка и сортировка векторами"""
+        values = self.calculate_player_values()
+        total_cents = values["total_value"]
+        total_value = total_cents / CENTS
+        
+        # Прирост от снимка предыдущего раунда (игроки, которых не было в снимке, - без прироста)
+        previous = np.zeros(len(total_value))
+        if isinstance(self.previous_net_worth, PlayerValues):
+            snapshot = self.previous_net_worth.values
+            previous[:len(snapshot)] = snapshot
+        safe_previous = np.where(previous > 0, previous, 1)
+        growth = np.where(previous > 0, (total_value - previous) / safe_previous * 100, 0)
+        
+        # Сортируем по общей стоимости в сотых (точное сравнение, как и без массивов)
+        order = rank_order(total_cents, limit)
+        
+        columns = zip(
+            order.tolist(),
+            (values["money"][order] / CENTS).tolist(),
+            (values["resources_value"][order] / CENTS).tolist(),
+            (values["buildings_value"][order] / CENTS).tolist(),
+            total_value[order].tolist(),
+            np.round(growth[order], 2).tolist()
+        )
+        return [
+            {
+                "player_id": self.players[slot].id,
+                "name": self.players[slot].name,
+                "money": money,
+                "resources_value": resources_value,
+                "buildings_value": buildings_value,
+                "total_value": total,
+                "growth_percent": growth_percent
+            }
+            for slot, money, resources_value, buildings_value, total, growth_percent in columns
+        ]
     
     def get_player_state(self, player_id: str) -> Optional[Dict]:
         """Получить полное состояние игрока"""
@@ -545,6 +1378,7 @@ class Game:
         for building in player.buildings:
             buildings_data.append({
                 "id": building.id,
+                "alias": building.alias,
                 "name": building.name,
                 "status": building.status.value,
                 "started_round": building.started_round,
@@ -556,7 +1390,7 @@ class Game:
         return {
             "player_id": player.id,
             "name": player.name,
-            "money": round(player.money, 2),
+            "money": player.money,
             "resources": player.resources.copy(),
             "buildings": buildings_data,
             "current_prices": self.current_prices.copy(),
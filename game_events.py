@@ -5,6 +5,12 @@
 
 from typing import Dict, List
 import random
+from cost_table import RESOURCE_NAMES, RESOURCE_INDEX, BUILDING_NAMES, BUILDING_INDEX
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
 # Структура события
 # {
@@ -500,6 +506,77 @@ EVENT_PAIRS = [
     {"positive": "Торговый караван из дальних стран", "negative": "Рейд королевской стражи"},
 ]
 
+POSITIVE_EVENTS_BY_NAME = {e["name"]: e for e in POSITIVE_EVENTS}
+NEGATIVE_EVENTS_BY_NAME = {e["name"]: e for e in NEGATIVE_EVENTS}
+
+
+def merge_event_modifiers(positive_event: dict, negative_event: dict) -> tuple:
+    """
+    Объединяет модификаторы от двух событий
+    Если оба события влияют на один ресурс/объект, модификаторы перемножаются
+    
+    Returns:
+        (resource_modifiers, building_modifiers)
+    """
+    resource_modifiers = dict(positive_event["resource_modifiers"])
+    building_modifiers = dict(positive_event["building_modifiers"])
+    
+    # Если ресурс/объект уже есть - перемножаем, иначе просто добавляем
+    for resource, modifier in negative_event["resource_modifiers"].items():
+        resource_modifiers[resource] = resource_modifiers.get(resource, 1.0) * modifier
+    for building, modifier in negative_event["building_modifiers"].items():
+        building_modifiers[building] = building_modifiers.get(building, 1.0) * modifier
+    
+    return resource_modifiers, building_modifiers
+
+
+# Пары событий, собранные один раз при импорте
+# Номер пары - позиция в EVENT_PAIRS: {(позитивное, негативное): номер}
+EVENT_PAIR_INDEX = {(pair["positive"], pair["negative"]): k for k, pair in enumerate(EVENT_PAIRS)}
+
+# Объединенные модификаторы пары: [(resource_modifiers, building_modifiers)] по номеру пары
+EVENT_PAIR_MODIFIERS = [
+    merge_event_modifiers(POSITIVE_EVENTS_BY_NAME[pair["positive"]], NEGATIVE_EVENTS_BY_NAME[pair["negative"]])
+    for pair in EVENT_PAIRS
+]
+
+# То же плотными матрицами (пары x ресурсы, пары x объекты; 1.0 - без изменений):
+# применить пару k - взять строку k, последовательность пар сценария - выборка по массиву номеров
+if np is not None:
+    EVENT_RESOURCE_MODIFIERS = np.ones((len(EVENT_PAIRS), len(RESOURCE_NAMES)))
+    EVENT_BUILDING_MODIFIERS = np.ones((len(EVENT_PAIRS), len(BUILDING_NAMES)))
+    for k, (resource_modifiers, building_modifiers) in enumerate(EVENT_PAIR_MODIFIERS):
+        for resource, modifier in resource_modifiers.items():
+            EVENT_RESOURCE_MODIFIERS[k, RESOURCE_INDEX[resource]] = modifier
+        for building, modifier in building_modifiers.items():
+            EVENT_BUILDING_MODIFIERS[k, BUILDING_INDEX[building]] = modifier
+    EVENT_RESOURCE_MODIFIERS.flags.writeable = False
+    EVENT_BUILDING_MODIFIERS.flags.writeable = False
+else:
+    EVENT_RESOURCE_MODIFIERS = EVENT_BUILDING_MODIFIERS = None
+
+
+def event_pair_index(positive_event: dict, negative_event: dict) -> int:
+    """Номер пары событий в EVENT_PAIRS (KeyError, если такой пары нет)"""
+    return EVENT_PAIR_INDEX[(positive_event["name"], negative_event["name"])]
+
+
+def event_pair_modifiers(positive_event: dict, negative_event: dict) -> tuple:
+    """
+    (resource_modifiers, building_modifiers) пары событий: собранные заранее для пар
+    из EVENT_PAIRS (общие словари - не изменять), для остальных - объединенные сейчас
+    """
+    pair_index = EVENT_PAIR_INDEX.get((positive_event.get("name"), negative_event.get("name")))
+    if pair_index is None:
+        return merge_event_modifiers(positive_event, negative_event)
+    return EVENT_PAIR_MODIFIERS[pair_index]
+
+
+def event_pair_events(pair_index: int) -> tuple:
+    """(positive_event, negative_event) пары с номером pair_index"""
+    pair = EVENT_PAIRS[pair_index]
+    return POSITIVE_EVENTS_BY_NAME[pair["positive"]], NEGATIVE_EVENTS_BY_NAME[pair["negative"]]
+
 
 class EventSystem:
     """Система управления событиями"""
@@ -508,8 +585,8 @@ class EventSystem:
         self.used_pairs = []
         self.available_pairs = EVENT_PAIRS.copy()
         # Создаем словарь для быстрого поиска событий по имени
-        self.positive_events_dict = {e["name"]: e for e in POSITIVE_EVENTS}
-        self.negative_events_dict = {e["name"]: e for e in NEGATIVE_EVENTS}
+        self.positive_events_dict = POSITIVE_EVENTS_BY_NAME
+        self.negative_events_dict = NEGATIVE_EVENTS_BY_NAME
     
     def get_random_event_pair(self) -> tuple:
         """
@@ -543,37 +620,13 @@ class EventSystem:
         """
         Объединяет модификаторы от двух событий
         Если оба события влияют на один ресурс/объект, модификаторы перемножаются
+        Для пар из EVENT_PAIRS берутся собранные заранее модификаторы
         
         Returns:
             (resource_modifiers, building_modifiers)
         """
-        resource_modifiers = {}
-        building_modifiers = {}
-        
-        # Применяем модификаторы позитивного события
-        for resource, modifier in positive_event["resource_modifiers"].items():
-            resource_modifiers[resource] = modifier
-        
-        for building, modifier in positive_event["building_modifiers"].items():
-            building_modifiers[building] = modifier
-        
-        # Применяем модификаторы негативного события
-        # Если ресурс/объект уже есть - перемножаем, иначе просто добавляем
-        for resource, modifier in negative_event["resource_modifiers"].items():
-            if resource in resource_modifiers:
-                # Перемножаем модификаторы
-                resource_modifiers[resource] *= modifier
-            else:
-                resource_modifiers[resource] = modifier
-        
-        for building, modifier in negative_event["building_modifiers"].items():
-            if building in building_modifiers:
-                # Перемножаем модификаторы
-                building_modifiers[building] *= modifier
-            else:
-                building_modifiers[building] = modifier
-        
-        return resource_modifiers, building_modifiers
+        resource_modifiers, building_modifiers = event_pair_modifiers(positive_event, negative_event)
+        return dict(resource_modifiers), dict(building_modifiers)
     
     def reset(self):
         """Сбрасывает список использованных пар"""
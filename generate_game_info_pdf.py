@@ -10,13 +10,7 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 import os
 from game_config import RESOURCE_PRICES, BUILDING_COSTS, BUILDING_INCOME, BUILDING_CONSTRUCTION_TIME, STARTING_MONEY
-
-def calculate_building_cost(building_name, costs):
-    """Рассчитывает стоимость объекта в монетах"""
-    total = 0
-    for resource, amount in costs.items():
-        total += amount * RESOURCE_PRICES.get(resource, 0)
-    return total
+from cost_table import BASE_BUILDING_COSTS
 
 def format_income(income_data):
     """Форматирует доход в читаемый вид"""
@@ -150,7 +144,7 @@ def create_pdf(output_path="игра_информация.pdf"):
     buildings_with_costs = []
     for building in BUILDING_COSTS.keys():
         costs = BUILDING_COSTS[building]
-        cost_monets = calculate_building_cost(building, costs)
+        cost_monets = BASE_BUILDING_COSTS[building]
         buildings_with_costs.append((building, costs, cost_monets))
     
     buildings_with_costs.sort(key=lambda x: x[2])
@@ -11,13 +11,7 @@ from reportlab.pdfbase import pdfmetrics
 from reportlab.pdfbase.ttfonts import TTFont
 import os
 from game_config import RESOURCE_PRICES, BUILDING_COSTS, BUILDING_INCOME, BUILDING_CONSTRUCTION_TIME, STARTING_MONEY
-
-def calculate_building_cost(building_name, costs):
-    """Рассчитывает стоимость объекта в монетах"""
-    total = 0
-    for resource, amount in costs.items():
-        total += amount * RESOURCE_PRICES.get(resource, 0)
-    return total
+from cost_table import BASE_BUILDING_COSTS
 
 def calculate_total_income_value(income_data):
     """Рассчитывает общую стоимость дохода в монетах"""
@@ -165,7 +159,7 @@ def create_pdf(output_path="игра_информация_с_доходност
     buildings_with_data = []
     for building in BUILDING_COSTS.keys():
         costs = BUILDING_COSTS[building]
-        cost_monets = calculate_building_cost(building, costs)
+        cost_monets = BASE_BUILDING_COSTS[building]
         income_data = BUILDING_INCOME[building]
         income_value = calculate_total_income_value(income_data)
         roi = calculate_roi_percentage(cost_monets, income_value)
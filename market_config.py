@@ -0,0 +1,133 @@
+"""
+Параметры рынка
+MARKET_CONFIG - значения по умолчанию. Игра работает с неизменяемым объектом
+MarketConfig: параметры проверяются один раз при создании, производные константы
+(границы изменения цены за раунд, абсолютные границы цен ресурсов) вычисляются
+заранее. У каждой игры свой объект, заменить его можно между раундами
+"""
+import math
+from dataclasses import dataclass, field, fields
+from types import MappingProxyType
+from typing import Dict, Mapping, Optional
+from game_config import RESOURCE_PRICES
+from money import to_cents
+from cost_table import RESOURCE_NAMES
+from saturation_curves import SATURATION_CURVES
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Параметры системы (можно настраивать)
+MARKET_CONFIG = {
+    # Максимальное изменение цены за раунд (в процентах от базовой)
+    "max_price_change_percent": 50,  # Цена не может измениться больше чем на 50% за раунд
+
+    # Параметры насыщения рынка объектами
+    "saturation_base_percent": 20,  # Считаем насыщением, если объект есть у 20% игроков
+    "saturation_max_penalty": 0.5,  # Максимальное снижение дохода (до 50% от базового)
+    "saturation_curve": "logarithmic",  # Кривая из saturation_curves: "linear", "logarithmic", "square_root", "logistic"
+
+    # Минимальные и максимальные модификаторы
+    "min_price_modifier": 0.3,  # Цена не может упасть ниже 30% от базовой
+    "max_price_modifier": 3.0,  # Цена не может вырасти выше 300% от базовой
+    "min_income_modifier": 0.5,  # Доход не может упасть ниже 50% от базового (даже при полном насыщении)
+    "max_income_modifier": 2.0,  # Доход не может вырасти выше 200% от базового
+}
+
+@dataclass(frozen=True)
+class MarketConfig:
+    """
+    Проверенные параметры рынка одной игры (неизменяемые)
+    Создается через MarketConfig.from_dict; производные поля вычисляются при создании
+    """
+    max_price_change_percent: float
+    saturation_base_percent: float
+    saturation_max_penalty: float
+    saturation_curve: str
+    min_price_modifier: float
+    max_price_modifier: float
+    min_income_modifier: float
+    max_income_modifier: float
+
+    # Производные константы
+    min_change: float = field(init=False, repr=False, compare=False)  # Границы множителя цены за раунд
+    max_change: float = field(init=False, repr=False, compare=False)
+    saturation_scale: float = field(init=False, repr=False, compare=False)  # 1 - saturation_max_penalty
+    min_price_cents: Mapping[str, float] = field(init=False, repr=False, compare=False)  # Границы цен ресурсов
+    max_price_cents: Mapping[str, float] = field(init=False, repr=False, compare=False)
+    min_price_vector: Optional[object] = field(init=False, repr=False, compare=False)  # То же векторами NumPy
+    max_price_vector: Optional[object] = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        self.validate()
+        derived = {
+            "min_change": 1.0 - (self.max_price_change_percent / 100.0),
+            "max_change": 1.0 + (self.max_price_change_percent / 100.0),
+            "saturation_scale": 1.0 - self.saturation_max_penalty,
+            "min_price_cents": MappingProxyType({
+                resource: to_cents(price) * self.min_price_modifier for resource, price in RESOURCE_PRICES.items()
+            }),
+            "max_price_cents": MappingProxyType({
+                resource: to_cents(price) * self.max_price_modifier for resource, price in RESOURCE_PRICES.items()
+            }),
+            "min_price_vector": None,
+            "max_price_vector": None,
+        }
+        if np is not None:
+            derived["min_price_vector"] = np.array(
+                [derived["min_price_cents"][name] for name in RESOURCE_NAMES], dtype=np.float64
+            )
+            derived["max_price_vector"] = np.array(
+                [derived["max_price_cents"][name] for name in RESOURCE_NAMES], dtype=np.float64
+            )
+            derived["min_price_vector"].flags.writeable = False
+            derived["max_price_vector"].flags.writeable = False
+        for name, value in derived.items():
+            object.__setattr__(self, name, value)
+
+    def validate(self):
+        """Проверить параметры (ValueError с описанием первой ошибки)"""
+        for name in MARKET_CONFIG:
+            value = getattr(self, name)
+            if name == "saturation_curve":
+                if not isinstance(value, str) or value not in SATURATION_CURVES:
+                    raise ValueError(f"saturation_curve должен быть одним из: {', '.join(SATURATION_CURVES)}")
+            elif isinstance(value, bool) or not isinstance(value, (int, float)):
+                raise ValueError(f"{name} должен быть числом")
+            elif not math.isfinite(value):
+                raise ValueError(f"{name} должен быть конечным числом")
+
+        if not 0 <= self.max_price_change_percent < 100:
+            raise ValueError("max_price_change_percent должен быть от 0 до 100 (не включая 100)")
+        if not 0 < self.saturation_base_percent <= 100:
+            raise ValueError("saturation_base_percent должен быть больше 0 и не больше 100")
+        if not 0 <= self.saturation_max_penalty <= 1:
+            raise ValueError("saturation_max_penalty должен быть от 0 до 1")
+        if not 0 < self.min_price_modifier <= self.max_price_modifier:
+            raise ValueError("Нужно 0 < min_price_modifier <= max_price_modifier")
+        if not 0 <= self.min_income_modifier <= self.max_income_modifier:
+            raise ValueError("Нужно 0 <= min_income_modifier <= max_income_modifier")
+
+    @classmethod
+    def from_dict(cls, values: Optional[Dict] = None, base: Optional["MarketConfig"] = None) -> "MarketConfig":
+        """
+        Собрать конфигурацию из словаря параметров
+        Недостающие параметры берутся из base (по умолчанию - из MARKET_CONFIG)
+        """
+        values = values or {}
+        unknown = set(values) - set(MARKET_CONFIG)
+        if unknown:
+            raise ValueError(f"Неизвестные параметры рынка: {', '.join(sorted(unknown))}")
+        params = base.to_dict() if base is not None else dict(MARKET_CONFIG)
+        params.update(values)
+        return cls(**params)
+
+    def to_dict(self) -> Dict:
+        """Параметры (без производных полей)"""
+        return {item.name: getattr(self, item.name) for item in fields(self) if item.init}
+
+
+# Конфигурация по умолчанию
+DEFAULT_MARKET_CONFIG = MarketConfig.from_dict(MARKET_CONFIG)
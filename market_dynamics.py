@@ -3,40 +3,155 @@
 Учитывает события, спрос, предложение и масштабируется для разного количества игроков
 """
 
-from typing import Dict, List
-import math
+from typing import Dict, List, Optional
 from game_config import RESOURCE_PRICES, BUILDING_INCOME
+from money import to_cents, prices_to_cents, prices_to_coins
+from cost_table import RESOURCE_NAMES, BUILDING_NAMES
+from market_config import MARKET_CONFIG, MarketConfig, DEFAULT_MARKET_CONFIG
+from saturation_curves import get_saturation_curve
 
-# Параметры системы (можно настраивать)
-MARKET_CONFIG = {
-    # Максимальное изменение цены за раунд (в процентах от базовой)
-    "max_price_change_percent": 50,  # Цена не может измениться больше чем на 50% за раунд
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+
+# Уровни спроса и предложения: процент игроков, купивших/продавших ресурс
+HIGH_ACTIVITY_PERCENT = 75  # Выше - высокий спрос (предложение)
+LOW_ACTIVITY_PERCENT = 25  # Не выше - низкий спрос (предложение)
+
+
+# ========== ВЕКТОРНОЕ ЯДРО (NumPy) ==========
+# Векторы ресурсов - в порядке RESOURCE_NAMES, объектов - в порядке BUILDING_NAMES.
+# Все функции принимают дополнительные ведущие измерения (пакет игр или сценариев):
+# массивы формы (..., ресурсы) или (..., объекты); num_players - число или массив,
+# совместимый по форме (например (игры, 1)); config - MarketConfig (по умолчанию - MARKET_CONFIG)
+
+if np is not None:
+    # Базовый доход объектов: монеты в сотых и ресурсы (объекты x ресурсы)
+    BASE_INCOME_COINS = np.array(
+        [to_cents(BUILDING_INCOME[name].get("монеты", 0)) for name in BUILDING_NAMES], dtype=np.float64
+    )
+    BASE_INCOME_RESOURCES = np.array([
+        [BUILDING_INCOME[name].get("ресурсы", {}).get(resource, 0) for resource in RESOURCE_NAMES]
+        for name in BUILDING_NAMES
+    ], dtype=np.float64)
+
+
+def resource_vector(values: Dict[str, float], default: float = 0.0):
+    """Словарь {ресурс: значение} -> вектор в порядке RESOURCE_NAMES"""
+    return np.array([values.get(name, default) for name in RESOURCE_NAMES], dtype=np.float64)
+
+
+def building_vector(values: Dict[str, float], default: float = 0.0):
+    """Словарь {объект: значение} -> вектор в порядке BUILDING_NAMES"""
+    return np.array([values.get(name, default) for name in BUILDING_NAMES], dtype=np.float64)
+
+
+def activity_percent(counts, num_players):
+    """Процент игроков (0 при num_players = 0)"""
+    num_players = np.asarray(num_players, dtype=np.float64)
+    safe_players = np.where(num_players > 0, num_players, 1.0)
+    return np.where(num_players > 0, np.asarray(counts, dtype=np.float64) / safe_players * 100, 0.0)
+
+
+def demand_modifiers(players_bought, num_players):
+    """Модификаторы цены от спроса: 1.1 / 1.0 / 0.9 для высокого / среднего / низкого"""
+    percent = activity_percent(players_bought, num_players)
+    return np.select([percent > HIGH_ACTIVITY_PERCENT, percent > LOW_ACTIVITY_PERCENT], [1.1, 1.0], 0.9)
+
+
+def supply_modifiers(players_sold, num_players):
+    """Модификаторы цены от предложения: 0.9 / 1.0 / 1.1 для высокого / среднего / низкого"""
+    percent = activity_percent(players_sold, num_players)
+    return np.select([percent > HIGH_ACTIVITY_PERCENT, percent > LOW_ACTIVITY_PERCENT], [0.9, 1.0], 1.1)
+
+
+def step_prices(previous_prices, players_bought, players_sold, event_modifiers, num_players,
+                config: MarketConfig = DEFAULT_MARKET_CONFIG):
+    """
+    Цены следующего раунда (векторная версия MarketDynamics.calculate_resource_prices_cents)
+    
+    Args:
+        previous_prices: Цены предыдущего раунда в сотых (..., ресурсы)
+        players_bought, players_sold: Количество купивших/продавших игроков (..., ресурсы)
+        event_modifiers: Модификаторы событий (..., ресурсы), 1.0 - без события
+        num_players: Количество игроков
     
-    # Параметры насыщения рынка объектами
-    "saturation_base_percent": 20,  # Считаем насыщением, если объект есть у 20% игроков
-    "saturation_max_penalty": 0.5,  # Максимальное снижение дохода (до 50% от базового)
-    "saturation_curve": "logarithmic",  # Тип кривой: "linear", "logarithmic", "square_root"
+    Returns:
+        Новые цены в сотых, int64 (..., ресурсы)
+    """
+    combined = (
+        demand_modifiers(players_bought, num_players) *
+        supply_modifiers(players_sold, num_players) *
+        np.asarray(event_modifiers, dtype=np.float64)
+    )
+    combined = np.clip(combined, config.min_change, config.max_change)
+    new_prices = np.clip(
+        np.asarray(previous_prices, dtype=np.float64) * combined,
+        config.min_price_vector,
+        config.max_price_vector
+    )
+    return np.rint(new_prices).astype(np.int64)
+
+
+def saturation_modifiers(building_counts, num_players, config: MarketConfig = DEFAULT_MARKET_CONFIG):
+    """Модификаторы насыщения (векторная версия MarketDynamics.calculate_saturation_modifier)"""
+    building_counts = np.asarray(building_counts, dtype=np.float64)
+    saturation_ratio = activity_percent(building_counts, num_players) / config.saturation_base_percent
+    penalty = get_saturation_curve(config.saturation_curve).vector(saturation_ratio, config.saturation_scale)
     
-    # Минимальные и максимальные модификаторы
-    "min_price_modifier": 0.3,  # Цена не может упасть ниже 30% от базовой
-    "max_price_modifier": 3.0,  # Цена не может вырасти выше 300% от базовой
-    "min_income_modifier": 0.5,  # Доход не может упасть ниже 50% от базового (даже при полном насыщении)
-    "max_income_modifier": 2.0,  # Доход не может вырасти выше 200% от базового
-}
+    modifier = np.maximum(config.min_income_modifier, 1.0 - penalty)
+    return np.where(building_counts == 0, 1.0, modifier)
+
+
+def income_modifiers(building_counts, event_modifiers, num_players, saturation=None,
+                     config: MarketConfig = DEFAULT_MARKET_CONFIG):
+    """
+    Итоговые модификаторы дохода объектов: насыщение x события с ограничениями (..., объекты)
+    saturation - готовые модификаторы насыщения (например, из таблицы MarketDynamics)
+    """
+    if saturation is None:
+        saturation = saturation_modifiers(building_counts, num_players, config)
+    combined = saturation * np.asarray(event_modifiers, dtype=np.float64)
+    return np.clip(combined, config.min_income_modifier, config.max_income_modifier)
+
+
+def building_incomes(building_counts, event_modifiers, num_players, saturation=None,
+                     config: MarketConfig = DEFAULT_MARKET_CONFIG):
+    """
+    Доход объектов за раунд (векторная версия MarketDynamics.calculate_building_incomes)
+    
+    Returns:
+        (монеты в сотых, int64 (..., объекты); ресурсы с округлением до сотых (..., объекты, ресурсы))
+    """
+    modifiers = income_modifiers(building_counts, event_modifiers, num_players, saturation, config)
+    coins = np.rint(BASE_INCOME_COINS * modifiers).astype(np.int64)
+    amounts = np.round(BASE_INCOME_RESOURCES * modifiers[..., np.newaxis], 2)
+    return coins, amounts
 
 
 class MarketDynamics:
     """Класс для расчета динамики рынка"""
     
-    def __init__(self, num_players: int):
+    def __init__(self, num_players: int, config: Optional[MarketConfig] = None):
         """
         Args:
             num_players: Количество игроков в игре
+            config: Параметры рынка (по умолчанию - MARKET_CONFIG)
         """
         self.num_players = num_players
+        self.config = config or DEFAULT_MARKET_CONFIG
         self.base_prices = RESOURCE_PRICES.copy()
+        self.base_prices_cents = prices_to_cents(self.base_prices)
         self.base_incomes = BUILDING_INCOME.copy()
         
+        # Таблица модификаторов насыщения для количеств объектов 0..num_players
+        # (строится при первом обращении и при смене числа игроков или параметров насыщения)
+        self.saturation_table = None
+        self.saturation_values = None
+        self.saturation_table_key = None
+        
     def normalize_by_players(self, value: float) -> float:
         """
         Нормализует значение по количеству игроков
@@ -123,9 +238,65 @@ class MarketDynamics:
             modifiers[resource] = event_modifiers.get(resource, 1.0)
         return modifiers
     
+    def saturation_key(self) -> tuple:
+        """Все, от чего зависит таблица насыщения"""
+        return (
+            self.num_players,
+            self.config.saturation_base_percent,
+            self.config.saturation_max_penalty,
+            get_saturation_curve(self.config.saturation_curve),  # Кривую можно перерегистрировать
+            self.config.min_income_modifier,
+        )
+    
+    def get_saturation_table(self):
+        """
+        Модификаторы насыщения для количеств объектов 0..num_players
+        (массив NumPy или список без него), пересчитываются только при смене ключа
+        """
+        key = (self.saturation_key(), np is not None)
+        if key != self.saturation_table_key:
+            if np is not None:
+                self.saturation_table = saturation_modifiers(
+                    np.arange(self.num_players + 1), self.num_players, self.config
+                )
+            else:
+                self.saturation_table = [
+                    self.evaluate_saturation_modifier(count) for count in range(self.num_players + 1)
+                ]
+            self.saturation_values = [float(value) for value in self.saturation_table]
+            self.saturation_table_key = key
+        return self.saturation_table
+    
+    def get_saturation_values(self) -> List[float]:
+        """Таблица модификаторов насыщения списком чисел (для расчета по словарям)"""
+        self.get_saturation_table()
+        return self.saturation_values
+    
+    def lookup_saturation(self, building_counts):
+        """
+        Модификаторы насыщения для вектора (или пакета) количеств объектов выборкой из таблицы
+        Количества больше num_players (у игрока может быть несколько одинаковых объектов)
+        считаются по формуле
+        """
+        table = self.get_saturation_table()
+        counts = np.asarray(building_counts).astype(np.intp)
+        inside = counts <= self.num_players
+        if inside.all():
+            return table[counts]
+        modifiers = table[np.minimum(counts, self.num_players)]
+        modifiers[~inside] = saturation_modifiers(counts[~inside], self.num_players, self.config)
+        return modifiers
+    
     def calculate_saturation_modifier(self, building_count: int) -> float:
+        """Модификатор насыщения для объекта (из таблицы, см. evaluate_saturation_modifier)"""
+        values = self.get_saturation_values()
+        if 0 <= building_count < len(values):
+            return values[building_count]
+        return self.evaluate_saturation_modifier(building_count)
+    
+    def evaluate_saturation_modifier(self, building_count: int) -> float:
         """
-        Рассчитывает модификатор насыщения для объекта
+        Рассчитывает модификатор насыщения для объекта по кривой насыщения
         
         НОВАЯ ЛОГИКА: учитывает процент игроков, а не абсолютное количество
         
@@ -142,42 +313,17 @@ class MarketDynamics:
         percent_players = (building_count / self.num_players) * 100
         
         # Нормализуем к базовому проценту насыщения (20%)
-        saturation_ratio = percent_players / MARKET_CONFIG["saturation_base_percent"]
+        saturation_ratio = percent_players / self.config.saturation_base_percent
         
-        # Применяем кривую насыщения
-        curve_type = MARKET_CONFIG["saturation_curve"]
-        
-        if curve_type == "linear":
-            # Линейная: чем больше объектов, тем сильнее падает доход
-            penalty = min(saturation_ratio, 1.0) * (1.0 - MARKET_CONFIG["saturation_max_penalty"])
-            
-        elif curve_type == "logarithmic":
-            # Логарифмическая: быстрое падение в начале, затем замедление
-            # Используем log для более плавного снижения
-            if saturation_ratio <= 1.0:
-                penalty = (1.0 - MARKET_CONFIG["saturation_max_penalty"]) * saturation_ratio
-            else:
-                # После базового процента снижение замедляется
-                log_factor = 1.0 + math.log(saturation_ratio)
-                penalty = (1.0 - MARKET_CONFIG["saturation_max_penalty"]) * (1.0 - (1.0 - 1.0/log_factor))
-                
-        elif curve_type == "square_root":
-            # Квадратный корень: более плавное снижение
-            sqrt_factor = math.sqrt(saturation_ratio)
-            penalty = (1.0 - MARKET_CONFIG["saturation_max_penalty"]) * min(sqrt_factor, 1.0)
-            
-        else:  # По умолчанию - логарифмическая
-            if saturation_ratio <= 1.0:
-                penalty = (1.0 - MARKET_CONFIG["saturation_max_penalty"]) * saturation_ratio
-            else:
-                log_factor = 1.0 + math.log(saturation_ratio)
-                penalty = (1.0 - MARKET_CONFIG["saturation_max_penalty"]) * (1.0 - (1.0 - 1.0/log_factor))
+        # Применяем кривую насыщения (см. saturation_curves)
+        curve = get_saturation_curve(self.config.saturation_curve)
+        penalty = curve.scalar(saturation_ratio, self.config.saturation_scale)
         
         # Модификатор = 1.0 - штраф
         modifier = 1.0 - penalty
         
         # Применяем минимальный порог
-        modifier = max(MARKET_CONFIG["min_income_modifier"], modifier)
+        modifier = max(self.config.min_income_modifier, modifier)
         
         return modifier
     
@@ -188,30 +334,60 @@ class MarketDynamics:
         players_sold: Dict[str, int],
         event_modifiers: Dict[str, float] = None
     ) -> Dict[str, float]:
+        """
+        Рассчитывает новые цены на ресурсы с учетом всех факторов (в монетах)
+        Обертка над calculate_resource_prices_cents
+        
+        Args:
+            previous_prices: Цены предыдущего раунда (для первого раунда - базовые цены)
+            players_bought: Словарь {ресурс: количество_игроков_которые_купили} из ПРЕДЫДУЩЕГО раунда
+            players_sold: Словарь {ресурс: количество_игроков_которые_продали} из ПРЕДЫДУЩЕГО раунда
+            event_modifiers: Модификаторы от событий ТЕКУЩЕГО раунда (опционально)
+            
+        Returns:
+            Словарь {ресурс: новая_цена}
+        """
+        return prices_to_coins(self.calculate_resource_prices_cents(
+            prices_to_cents(previous_prices), players_bought, players_sold, event_modifiers
+        ))
+    
+    def calculate_resource_prices_cents(
+        self,
+        previous_prices: Dict[str, int],
+        players_bought: Dict[str, int],
+        players_sold: Dict[str, int],
+        event_modifiers: Dict[str, float] = None
+    ) -> Dict[str, int]:
         """
         Рассчитывает новые цены на ресурсы с учетом всех факторов
+        Цены - целые сотые монеты, новая цена округляется до сотых один раз
         
         Цены рассчитываются от предыдущего раунда (не от базовой цены).
         Спрос и предложение берутся из предыдущего раунда.
         События применяются из текущего раунда.
         
         Args:
-            previous_prices: Цены предыдущего раунда (для первого раунда - базовые цены)
+            previous_prices: Цены предыдущего раунда в сотых (для первого раунда - базовые цены)
             players_bought: Словарь {ресурс: количество_игроков_которые_купили} из ПРЕДЫДУЩЕГО раунда
             players_sold: Словарь {ресурс: количество_игроков_которые_продали} из ПРЕДЫДУЩЕГО раунда
             event_modifiers: Модификаторы от событий ТЕКУЩЕГО раунда (опционально)
             
         Returns:
-            Словарь {ресурс: новая_цена}
+            Словарь {ресурс: новая_цена_в_сотых}
         """
         if event_modifiers is None:
             event_modifiers = {}
         
+        # Одна игра - расчет по ресурсам: перевод словарей в массивы и обратно
+        # дороже самого шага, векторное ядро (step_prices) - для пакета игр
         # Рассчитываем модификаторы
         demand_mods = self.calculate_demand_modifier(players_bought)
         supply_mods = self.calculate_supply_modifier(players_sold)
         event_mods = self.calculate_event_modifier(event_modifiers)
         
+        # Не позволяем цене измениться больше чем на max_price_change_percent% за раунд
+        min_change, max_change = self.config.min_change, self.config.max_change
+        
         new_prices = {}
         
         for resource, previous_price in previous_prices.items():
@@ -223,22 +399,18 @@ class MarketDynamics:
             )
             
             # Ограничиваем изменение цены за раунд
-            # Не позволяем цене измениться больше чем на max_price_change_percent%
-            max_change = 1.0 + (MARKET_CONFIG["max_price_change_percent"] / 100.0)
-            min_change = 1.0 - (MARKET_CONFIG["max_price_change_percent"] / 100.0)
             combined_modifier = max(min_change, min(max_change, combined_modifier))
             
             # Рассчитываем новую цену от предыдущей (не от базовой!)
             new_price = previous_price * combined_modifier
             
             # Применяем абсолютные ограничения (от базовой цены)
-            base_price = self.base_prices[resource]
             new_price = max(
-                base_price * MARKET_CONFIG["min_price_modifier"],
-                min(base_price * MARKET_CONFIG["max_price_modifier"], new_price)
+                self.config.min_price_cents[resource],
+                min(self.config.max_price_cents[resource], new_price)
             )
             
-            new_prices[resource] = round(new_price, 2)
+            new_prices[resource] = int(round(new_price))
         
         return new_prices
     
@@ -261,13 +433,18 @@ class MarketDynamics:
         if event_modifiers is None:
             event_modifiers = {}
         
-        income_modifiers = {}
+        income_modifiers_by_building = {}
+        # Таблица насыщения берется один раз на все объекты
+        saturation_values = self.get_saturation_values()
         
         for building_name in self.base_incomes.keys():
             count = building_counts.get(building_name, 0)
             
             # НОВАЯ ФОРМУЛА: используем процент игроков вместо абсолютного количества
-            saturation_modifier = self.calculate_saturation_modifier(count)
+            if 0 <= count < len(saturation_values):
+                saturation_modifier = saturation_values[count]
+            else:
+                saturation_modifier = self.evaluate_saturation_modifier(count)
             
             # Модификатор от событий
             event_modifier = event_modifiers.get(building_name, 1.0)
@@ -277,16 +454,16 @@ class MarketDynamics:
             
             # Применяем ограничения
             combined_modifier = max(
-                MARKET_CONFIG["min_income_modifier"],
-                min(MARKET_CONFIG["max_income_modifier"], combined_modifier)
+                self.config.min_income_modifier,
+                min(self.config.max_income_modifier, combined_modifier)
             )
             
-            income_modifiers[building_name] = {
+            income_modifiers_by_building[building_name] = {
                 "монеты": combined_modifier,
                 "ресурсы": {res: combined_modifier for res in self.base_prices.keys()}
             }
         
-        return income_modifiers
+        return income_modifiers_by_building
     
     def calculate_building_incomes(
         self,
@@ -330,6 +507,24 @@ class MarketDynamics:
         
         return new_incomes
 
+    
+    def calculate_building_income_arrays(
+        self,
+        building_counts: Dict[str, int],
+        event_modifiers: Dict[str, float] = None
+    ):
+        """
+        Доходы объектов массивами (для PlayerStore, нужен NumPy)
+        
+        Returns:
+            (монеты в сотых по объектам, ресурсы объекты x ресурсы) - см. building_incomes
+        """
+        counts = building_vector(building_counts)
+        return building_incomes(
+            counts, building_vector(event_modifiers or {}, 1.0), self.num_players,
+            self.lookup_saturation(counts), self.config
+        )
+
 
 # Примеры для проверки
 if __name__ == "__main__":
@@ -0,0 +1,38 @@
+"""
+Денежные суммы в фиксированной точке
+Деньги, цены ресурсов и стоимость объектов хранятся целым числом сотых долей
+монеты: сложение и умножение на количество точные и дают одинаковый результат
+на любой машине (повтор игры совпадает до копейки). Округление выполняется
+один раз - при переводе из монет в сотые (to_cents) и обратно на границе API
+"""
+from typing import Dict
+
+# Сотых в одной монете
+CENTS = 100
+
+
+def to_cents(value: float) -> int:
+    """Сумма в монетах -> целое число сотых (с округлением)"""
+    if isinstance(value, int):
+        return value * CENTS
+    return int(round(value * CENTS))
+
+
+def to_coins(cents: int) -> float:
+    """Целое число сотых -> сумма в монетах"""
+    return cents / CENTS
+
+
+def prices_to_cents(prices: Dict[str, float]) -> Dict[str, int]:
+    """Цены {ресурс: монеты} -> {ресурс: сотые}"""
+    return {resource: to_cents(price) for resource, price in prices.items()}
+
+
+def prices_to_coins(prices: Dict[str, int]) -> Dict[str, float]:
+    """Цены {ресурс: сотые} -> {ресурс: монеты}"""
+    return {resource: price / CENTS for resource, price in prices.items()}
+
+
+def format_money(cents: int) -> str:
+    """Сумма для сообщений игроку (две цифры после точки)"""
+    return f"{cents / CENTS:.2f}"
@@ -0,0 +1,50 @@
+"""
+Множества игроков в виде битовых масок
+Игрок - бит с его порядковым номером в игре (Player.slot): отметка действия
+не создает строковых элементов множества, количество игроков считается
+подсчетом единичных бит, а маски раундов дешево хранить в истории
+"""
+from typing import Iterator
+
+
+class PlayerBitset:
+    """Множество порядковых номеров игроков (бит на игрока в bytearray, растет по мере надобности)"""
+    __slots__ = ("bits",)
+
+    def __init__(self, bits: bytes = b"", capacity: int = 0):
+        self.bits = bytearray(bits) if bits else bytearray((capacity + 7) >> 3)
+
+    def add(self, slot: int):
+        try:
+            self.bits[slot >> 3] |= 1 << (slot & 7)
+        except IndexError:
+            self.bits.extend(bytes((slot >> 3) + 1 - len(self.bits)))
+            self.bits[slot >> 3] |= 1 << (slot & 7)
+
+    def __contains__(self, slot: int) -> bool:
+        byte = slot >> 3
+        return byte < len(self.bits) and bool(self.bits[byte] >> (slot & 7) & 1)
+
+    def __len__(self) -> int:
+        """Количество игроков в множестве (подсчет единичных бит)"""
+        return bin(int.from_bytes(self.bits, "little")).count("1")
+
+    def __iter__(self) -> Iterator[int]:
+        for byte, value in enumerate(self.bits):
+            if value:
+                for bit in range(8):
+                    if value >> bit & 1:
+                        yield (byte << 3) | bit
+
+    def __or__(self, other: "PlayerBitset") -> "PlayerBitset":
+        size = max(len(self.bits), len(other.bits))
+        mask = int.from_bytes(self.bits, "little") | int.from_bytes(other.bits, "little")
+        return PlayerBitset(mask.to_bytes(size, "little"))
+
+    def __and__(self, other: "PlayerBitset") -> "PlayerBitset":
+        size = min(len(self.bits), len(other.bits))
+        mask = int.from_bytes(self.bits[:size], "little") & int.from_bytes(other.bits[:size], "little")
+        return PlayerBitset(mask.to_bytes(size, "little"))
+
+    def __repr__(self) -> str:
+        return f"PlayerBitset({list(self)!r})"
@@ -0,0 +1,64 @@
+"""
+Порядковая статистика капитализации игроков
+Первые строки турнирной таблицы и место игрока без полной сортировки
+"""
+from typing import Dict, Iterable, List, Optional, Tuple
+from sortedcontainers import SortedList
+
+
+class PlayerRanking:
+    """
+    Игроки, упорядоченные по капитализации (SortedList)
+    Ключ - (-капитализация, порядковый номер игрока, player_id); капитализация -
+    целые сотые монеты (см. money, total_value_cents у Game.calculate_player_value),
+    поэтому равные суммы сравниваются точно: тот же порядок, что у
+    Game.get_leaderboard (при равенстве - порядок добавления).
+    Изменение одного игрока - O(log n); после смены цен или раунда, когда меняются все,
+    рейтинг помечается устаревшим и перестраивается при следующем запросе
+    """
+
+    def __init__(self):
+        self.entries = SortedList()
+        self.keys: Dict[str, Tuple[int, int, str]] = {}
+        self.order: Dict[str, int] = {}  # Порядковый номер игрока (порядок добавления)
+        self.valid = False
+
+    def invalidate(self):
+        """Пометить рейтинг устаревшим (изменилась капитализация всех игроков)"""
+        self.valid = False
+
+    def rebuild(self, values: Iterable[Tuple[str, int]]):
+        """Перестроить рейтинг по капитализации всех игроков в сотых (в порядке добавления)"""
+        self.keys = {}
+        self.order = {}
+        for index, (player_id, total_value) in enumerate(values):
+            self.order[player_id] = index
+            self.keys[player_id] = (-total_value, index, player_id)
+        self.entries = SortedList(self.keys.values())
+        self.valid = True
+
+    def update(self, player_id: str, total_value: int):
+        """Обновить капитализацию одного игрока в сотых (новый игрок добавляется в конец порядка)"""
+        if not self.valid:
+            return
+        old_key = self.keys.get(player_id)
+        if old_key is not None:
+            self.entries.remove(old_key)
+        index = self.order.setdefault(player_id, len(self.order))
+        key = (-total_value, index, player_id)
+        self.keys[player_id] = key
+        self.entries.add(key)
+
+    def page(self, offset: int, count: int) -> List[str]:
+        """ID игроков на местах offset + 1 ... offset + count"""
+        return [key[2] for key in self.entries.islice(offset, offset + count)]
+
+    def rank(self, player_id: str) -> Optional[int]:
+        """Место игрока (с 1) или None, если игрока нет"""
+        key = self.keys.get(player_id)
+        if key is None:
+            return None
+        return self.entries.index(key) + 1
+
+    def __len__(self) -> int:
+        return len(self.entries)
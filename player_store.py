@@ -0,0 +1,241 @@
+"""
+Хранилище состояния игроков в массивах NumPy (struct-of-arrays)
+Для больших лобби: деньги, ресурсы и активные объекты всех игроков
+лежат в общих массивах, а объекты Player служат представлениями строк.
+Доход раунда начисляется одним матричным произведением.
+
+NumPy необязателен: без него игра хранит состояние в объектах Player
+"""
+from collections.abc import Mapping, MutableMapping
+from itertools import islice
+from typing import Dict, Iterator, List, Optional
+from cost_table import RESOURCE_NAMES, RESOURCE_INDEX, BUILDING_NAMES, BUILDING_INDEX
+from money import CENTS
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+HAS_NUMPY = np is not None
+
+# Начальная емкость массивов (растет удвоением)
+INITIAL_CAPACITY = 16
+
+
+def rank_order(values, limit: Optional[int] = None):
+    """
+    Индексы по убыванию values, при равных значениях - в исходном порядке
+    (как устойчивая сортировка списка). При limit возвращаются только первые
+    limit индексов: кандидаты отбираются argpartition, сортируются только они
+    """
+    if limit is None or limit >= len(values):
+        return np.argsort(-values, kind="stable")
+    if limit <= 0:
+        return np.array([], dtype=np.intp)
+    kth = -np.partition(-values, limit - 1)[limit - 1]
+    above = np.flatnonzero(values > kth)
+    equal = np.flatnonzero(values == kth)[:limit - len(above)]
+    candidates = np.concatenate([above, equal])
+    return candidates[np.argsort(-values[candidates], kind="stable")]
+
+
+class PlayerStore:
+    """
+    Состояние игроков в массивах:
+    money - вектор денег (int64, сотые монеты), inventory - матрица игроки x ресурсы,
+    building_counts - матрица игроки x типы объектов (только активные объекты),
+    owned_counts - то же для всех объектов, кроме выставленных на продажу (для оценки).
+    Количества (целые) хранятся в float64, чтобы произведения шли через BLAS
+    без приведения типов; наружу они отдаются как int.
+    Строка игрока (slot) выдается при добавлении и не меняется
+    """
+
+    def __init__(self, capacity: int = INITIAL_CAPACITY):
+        if not HAS_NUMPY:
+            raise ImportError("Для хранения состояния в массивах нужен numpy")
+        self.size = 0
+        self.money = np.zeros(capacity, dtype=np.int64)
+        self.inventory = np.zeros((capacity, len(RESOURCE_NAMES)), dtype=np.float64)
+        self.building_counts = np.zeros((capacity, len(BUILDING_NAMES)), dtype=np.float64)
+        self.owned_counts = np.zeros((capacity, len(BUILDING_NAMES)), dtype=np.float64)
+
+    def add_player(self, money: int, resources: Dict[str, int]) -> int:
+        """Добавить строку игрока (деньги в сотых), вернуть ее номер"""
+        if self.size == len(self.money):
+            self.grow(2 * len(self.money))
+        slot = self.size
+        self.size += 1
+        self.money[slot] = money
+        for resource, amount in resources.items():
+            self.inventory[slot, RESOURCE_INDEX[resource]] = amount
+        return slot
+
+    def grow(self, capacity: int):
+        """Увеличить емкость массивов"""
+        for name in ("money", "inventory", "building_counts", "owned_counts"):
+            old = getattr(self, name)
+            new = np.zeros((capacity,) + old.shape[1:], dtype=old.dtype)
+            new[:self.size] = old[:self.size]
+            setattr(self, name, new)
+
+    def get_money(self, slot: int) -> int:
+        return int(self.money[slot])
+
+    def set_money(self, slot: int, value: int):
+        self.money[slot] = value
+
+    def add_buildings(self, slot: int, building_name: str, delta: int):
+        """Изменить количество активных объектов типа у игрока"""
+        self.building_counts[slot, BUILDING_INDEX[building_name]] += delta
+
+    def add_owned(self, slot: int, building_name: str, delta: int):
+        """Изменить количество объектов типа у игрока (без выставленных на продажу)"""
+        self.owned_counts[slot, BUILDING_INDEX[building_name]] += delta
+
+    def valuation(self, prices, building_costs) -> Dict:
+        """
+        Капитализация всех игроков
+
+        Args:
+            prices: Вектор цен ресурсов в сотых (CostTable.price_array)
+            building_costs: Вектор стоимости объектов по типам в сотых (CostTable.cost_array)
+
+        Returns:
+            {"money", "resources_value", "buildings_value", "total_value"} - массивы int64
+            по строкам игроков в сотых монеты
+        """
+        money = self.money[:self.size]
+        # Произведения целых в float64 точные, результат переводится в int64 без округления
+        resources_value = (self.inventory[:self.size] @ prices).astype(np.int64)
+        buildings_value = (self.owned_counts[:self.size] @ building_costs).astype(np.int64)
+        return {
+            "money": money,
+            "resources_value": resources_value,
+            "buildings_value": buildings_value,
+            "total_value": money + resources_value + buildings_value
+        }
+
+    def distribute_income(self, coins, amounts, players: List, players_by_id: Dict) -> "IncomeReport":
+        """
+        Начислить доход от активных объектов всем игрокам
+
+        Args:
+            coins: Доход объектов в монетах по типам, в сотых
+            amounts: Доход объектов в ресурсах (типы объектов x ресурсы)
+                (результат MarketDynamics.calculate_building_income_arrays)
+            players, players_by_id: Игроки игры (для отчета по игрокам)
+
+        Returns:
+            Отчет о доходах {player_id: {"монеты": ..., "ресурсы": {...}}}
+        """
+        coins = np.asarray(coins, dtype=np.float64)
+        counts = self.building_counts[:self.size]
+        self.money[:self.size] += (counts @ coins).astype(np.int64)
+        # В инвентарь попадает целая часть дохода с каждого объекта (как int(amount))
+        self.inventory[:self.size] += counts @ np.floor(amounts)
+
+        return IncomeReport(counts, coins, amounts, players, players_by_id)
+
+    def resource_view(self, slot: int) -> "ResourceView":
+        return ResourceView(self, slot)
+
+
+class ResourceView(MutableMapping):
+    """
+    Ресурсы игрока как словарь {ресурс: количество} поверх строки inventory
+    Как и в обычном словаре ресурсов, нулевые количества считаются отсутствующими
+    """
+    __slots__ = ("store", "slot")
+
+    def __init__(self, store: PlayerStore, slot: int):
+        self.store = store
+        self.slot = slot
+
+    def __getitem__(self, resource: str) -> int:
+        index = RESOURCE_INDEX.get(resource)
+        amount = 0 if index is None else int(self.store.inventory[self.slot, index])
+        if amount == 0:
+            raise KeyError(resource)
+        return amount
+
+    def __setitem__(self, resource: str, amount: int):
+        self.store.inventory[self.slot, RESOURCE_INDEX[resource]] = amount
+
+    def __delitem__(self, resource: str):
+        self[resource]
+        self.store.inventory[self.slot, RESOURCE_INDEX[resource]] = 0
+
+    def __iter__(self) -> Iterator[str]:
+        row = self.store.inventory[self.slot]
+        return (RESOURCE_NAMES[index] for index in np.flatnonzero(row))
+
+    def __len__(self) -> int:
+        return int(np.count_nonzero(self.store.inventory[self.slot]))
+
+    def copy(self) -> Dict[str, int]:
+        return dict(self.items())
+
+    def __repr__(self) -> str:
+        return repr(self.copy())
+
+
+class IncomeReport(Mapping):
+    """
+    Доходы игроков за раунд {player_id: {"монеты": ..., "ресурсы": {...}}}
+    Хранит компактную копию количеств объектов на момент начисления,
+    словарь игрока строится при обращении
+    """
+
+    def __init__(self, counts, coins, amounts, players: List, players_by_id: Dict):
+        self.counts = counts.astype(np.int32)
+        self.coins = coins
+        self.amounts = amounts
+        self.players = players
+        self.players_by_id = players_by_id
+
+    def __getitem__(self, player_id: str) -> Dict:
+        player = self.players_by_id.get(player_id)
+        if player is None or player.slot >= len(self.counts):
+            raise KeyError(player_id)
+        row = self.counts[player.slot]
+
+        player_income = {"монеты": 0, "ресурсы": {}}
+        coins = 0
+        for column in np.flatnonzero(row):
+            count = int(row[column])
+            coins += int(self.coins[column]) * count
+            for index in np.flatnonzero(self.amounts[column]):
+                resource = RESOURCE_NAMES[index]
+                if resource not in player_income["ресурсы"]:
+                    player_income["ресурсы"][resource] = 0
+                player_income["ресурсы"][resource] += float(self.amounts[column, index]) * count
+        player_income["монеты"] = coins / CENTS
+        return player_income
+
+    def __iter__(self) -> Iterator[str]:
+        return (player.id for player in islice(self.players, len(self.counts)))
+
+    def __len__(self) -> int:
+        return len(self.counts)
+
+
+class PlayerValues(Mapping):
+    """Значения по игрокам {player_id: значение} поверх массива по строкам игроков"""
+
+    def __init__(self, values, players: List, players_by_id: Dict):
+        self.values = values
+        self.players = players
+        self.players_by_id = players_by_id
+
+    def __getitem__(self, player_id: str) -> float:
+        player = self.players_by_id.get(player_id)
+        if player is None or player.slot >= len(self.values):
+            raise KeyError(player_id)
+        return float(self.values[player.slot])
+
+    def __iter__(self) -> Iterator[str]:
+        return (player.id for player in islice(self.players, len(self.values)))
+
+    def __len__(self) -> int:
+        return len(self.values)
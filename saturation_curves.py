@@ -0,0 +1,115 @@
+"""
+Кривые насыщения рынка объектами
+Кривая переводит степень насыщения (доля владельцев объекта относительно
+saturation_base_percent) в штраф к доходу от 0 до scale = 1 - saturation_max_penalty.
+У каждой кривой скалярная функция и векторная (массивы NumPy); кривая игры
+выбирается параметром saturation_curve, новые кривые добавляются через
+register_saturation_curve без изменений движка
+"""
+import math
+from typing import Callable, Dict, NamedTuple, Optional
+
+try:
+    import numpy as np
+except ImportError:
+    np = None
+
+# Крутизна логистической кривой (насколько резко растет штраф около базового насыщения)
+LOGISTIC_STEEPNESS = 4.0
+
+
+class SaturationCurve(NamedTuple):
+    """Кривая насыщения: штраф(степень насыщения, scale) для числа и для массива"""
+    name: str
+    scalar: Callable[[float, float], float]
+    vector: Callable
+
+
+# Зарегистрированные кривые {название: SaturationCurve}
+SATURATION_CURVES: Dict[str, SaturationCurve] = {}
+
+
+def register_saturation_curve(name: str, scalar: Callable[[float, float], float],
+                              vector: Optional[Callable] = None) -> SaturationCurve:
+    """
+    Зарегистрировать кривую насыщения (существующая с тем же названием заменяется)
+
+    Args:
+        name: Название (значение параметра saturation_curve)
+        scalar: penalty(saturation_ratio, scale) для числа
+        vector: То же для массива NumPy (по умолчанию - scalar поэлементно)
+    """
+    if vector is None:
+        def vector(saturation_ratio, scale):
+            return np.array([scalar(float(ratio), scale) for ratio in np.ravel(saturation_ratio)]).reshape(
+                np.shape(saturation_ratio)
+            )
+    curve = SaturationCurve(name, scalar, vector)
+    SATURATION_CURVES[name] = curve
+    return curve
+
+
+def get_saturation_curve(name: str) -> SaturationCurve:
+    try:
+        return SATURATION_CURVES[name]
+    except KeyError:
+        raise ValueError(f"Неизвестная кривая насыщения: {name}") from None
+
+
+# ========== ВСТРОЕННЫЕ КРИВЫЕ ==========
+
+def linear_penalty(saturation_ratio: float, scale: float) -> float:
+    """Линейная: чем больше объектов, тем сильнее падает доход"""
+    return min(saturation_ratio, 1.0) * scale
+
+
+def linear_penalty_vector(saturation_ratio, scale):
+    return np.minimum(saturation_ratio, 1.0) * scale
+
+
+def logarithmic_penalty(saturation_ratio: float, scale: float) -> float:
+    """Логарифмическая: линейный рост до базового насыщения, затем снижение замедляется"""
+    if saturation_ratio <= 1.0:
+        return scale * saturation_ratio
+    log_factor = 1.0 + math.log(saturation_ratio)
+    return scale * (1.0 - (1.0 - 1.0 / log_factor))
+
+
+def logarithmic_penalty_vector(saturation_ratio, scale):
+    log_factor = 1.0 + np.log(np.maximum(saturation_ratio, 1.0))
+    return np.where(
+        saturation_ratio <= 1.0,
+        scale * saturation_ratio,
+        scale * (1.0 - (1.0 - 1.0 / log_factor))
+    )
+
+
+def square_root_penalty(saturation_ratio: float, scale: float) -> float:
+    """Квадратный корень: более плавное снижение"""
+    return scale * min(math.sqrt(saturation_ratio), 1.0)
+
+
+def square_root_penalty_vector(saturation_ratio, scale):
+    return scale * np.minimum(np.sqrt(saturation_ratio), 1.0)
+
+
+def logistic_penalty(saturation_ratio: float, scale: float) -> float:
+    """
+    Логистическая: почти без штрафа при малом насыщении, резкий рост около
+    базового насыщения и выход на scale (нормирована так, что штраф(0) = 0)
+    """
+    start = 1.0 / (1.0 + math.exp(LOGISTIC_STEEPNESS))
+    value = 1.0 / (1.0 + math.exp(-LOGISTIC_STEEPNESS * (saturation_ratio - 1.0)))
+    return scale * (value - start) / (1.0 - start)
+
+
+def logistic_penalty_vector(saturation_ratio, scale):
+    start = 1.0 / (1.0 + math.exp(LOGISTIC_STEEPNESS))
+    value = 1.0 / (1.0 + np.exp(-LOGISTIC_STEEPNESS * (np.asarray(saturation_ratio) - 1.0)))
+    return scale * (value - start) / (1.0 - start)
+
+
+register_saturation_curve("linear", linear_penalty, linear_penalty_vector)
+register_saturation_curve("logarithmic", logarithmic_penalty, logarithmic_penalty_vector)
+register_saturation_curve("square_root", square_root_penalty, square_root_penalty_vector)
+register_saturation_curve("logistic", logistic_penalty, logistic_penalty_vector)
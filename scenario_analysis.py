@@ -4,20 +4,81 @@
 """
 import random
 from typing import Dict, List
-from game_config import RESOURCE_PRICES, BUILDING_INCOME, BUILDING_COSTS
-from game_events import EVENT_PAIRS, EventSystem, POSITIVE_EVENTS, NEGATIVE_EVENTS
-from market_dynamics import MarketDynamics
+from game_config import RESOURCE_PRICES, BUILDING_INCOME
+from game_events import (
+    EVENT_PAIRS, EVENT_PAIR_INDEX, EVENT_RESOURCE_MODIFIERS, EVENT_BUILDING_MODIFIERS,
+    event_pair_modifiers, event_pair_events
+)
+from cost_table import BASE_BUILDING_COSTS, RESOURCE_NAMES, BUILDING_NAMES
+from market_config import MarketConfig, DEFAULT_MARKET_CONFIG
 
-# Создаем словари для быстрого поиска событий
-positive_events_dict = {e["name"]: e for e in POSITIVE_EVENTS}
-negative_events_dict = {e["name"]: e for e in NEGATIVE_EVENTS}
+try:
+    import numpy as np
+except ImportError:
+    np = None
 
-def calculate_building_cost(costs: Dict[str, int]) -> float:
-    """Рассчитывает стоимость объекта в монетах"""
-    total = 0
-    for resource, amount in costs.items():
-        total += amount * RESOURCE_PRICES.get(resource, 0)
-    return total
+
+def event_sequence_matrices(event_pairs: List[tuple]) -> tuple:
+    """
+    Модификаторы последовательности пар событий матрицами (раунды x ресурсы, раунды x объекты)
+    Для пар из EVENT_PAIRS - выборка строк собранных матриц по номерам пар
+    """
+    pair_indices = [EVENT_PAIR_INDEX.get((positive.get("name"), negative.get("name")))
+                    for positive, negative in event_pairs]
+    if None not in pair_indices:
+        return EVENT_RESOURCE_MODIFIERS[pair_indices], EVENT_BUILDING_MODIFIERS[pair_indices]
+    
+    # Есть пары не из EVENT_PAIRS - строки собираются по объединенным словарям
+    resource_rounds = np.ones((len(event_pairs), len(RESOURCE_NAMES)))
+    building_rounds = np.ones((len(event_pairs), len(BUILDING_NAMES)))
+    for k, (positive, negative) in enumerate(event_pairs):
+        resource_mods, building_mods = event_pair_modifiers(positive, negative)
+        resource_rounds[k] = [resource_mods.get(name, 1.0) for name in RESOURCE_NAMES]
+        building_rounds[k] = [building_mods.get(name, 1.0) for name in BUILDING_NAMES]
+    return resource_rounds, building_rounds
+
+
+def simulate_event_sequence(event_pairs: List[tuple], base_prices: Dict[str, float],
+                            config: MarketConfig = DEFAULT_MARKET_CONFIG) -> tuple:
+    """
+    Цены и суммарные модификаторы доходов для последовательности пар событий
+    (спрос/предложение нейтральны - влияют только события)
+    
+    Args:
+        event_pairs: Пары событий (positive_event, negative_event) по раундам
+        base_prices: Начальные цены
+        config: Параметры рынка (ограничения цен относительно базовых)
+        
+    Returns:
+        (итоговые цены {ресурс: цена}, сумма модификаторов дохода по раундам {объект: сумма})
+    """
+    if np is not None:
+        resource_rounds, building_rounds = event_sequence_matrices(event_pairs)
+        base = np.array([base_prices[name] for name in RESOURCE_NAMES], dtype=np.float64)
+        prices = base.copy()
+        for modifiers in resource_rounds:
+            prices = np.clip(prices * modifiers, base * config.min_change, base * config.max_change)
+            prices = np.clip(prices, base * config.min_price_modifier, base * config.max_price_modifier)
+        income_modifiers = building_rounds.sum(axis=0)
+        return (
+            dict(zip(RESOURCE_NAMES, prices.tolist())),
+            dict(zip(BUILDING_NAMES, income_modifiers.tolist()))
+        )
+    
+    prices = dict(base_prices)
+    income_modifiers = {name: 0.0 for name in BUILDING_NAMES}
+    for positive, negative in event_pairs:
+        resource_mods, building_mods = event_pair_modifiers(positive, negative)
+        for resource, base_price in base_prices.items():
+            price = prices[resource] * resource_mods.get(resource, 1.0)
+            price = max(base_price * config.min_change, min(base_price * config.max_change, price))
+            prices[resource] = max(
+                base_price * config.min_price_modifier,
+                min(base_price * config.max_price_modifier, price)
+            )
+        for building_name in BUILDING_NAMES:
+            income_modifiers[building_name] += building_mods.get(building_name, 1.0)
+    return prices, income_modifiers
 
 def simulate_game_scenario(event_pairs: List[tuple], num_rounds: int = 10) -> Dict:
     """
@@ -30,58 +91,19 @@ def simulate_game_scenario(event_pairs: List[tuple], num_rounds: int = 10) -> Di
     Returns:
         Словарь с результатами симуляции
     """
-    # Инициализация
-    current_prices = RESOURCE_PRICES.copy()
     base_prices = RESOURCE_PRICES.copy()
+    current_prices, income_modifiers = simulate_event_sequence(event_pairs[:num_rounds], base_prices)
     
-    # Для упрощения: считаем что спрос/предложение нейтральны (только события влияют)
-    total_bought = {res: 0 for res in RESOURCE_PRICES.keys()}
-    total_sold = {res: 0 for res in RESOURCE_PRICES.keys()}
-    
-    # Словарь для накопления доходов объектов
-    building_total_income = {name: {"монеты": 0, "ресурсы": {}} for name in BUILDING_INCOME.keys()}
-    
-    # Симулируем каждый раунд
-    for round_num, (positive_event, negative_event) in enumerate(event_pairs[:num_rounds], 1):
-        # Получаем модификаторы от событий
-        resource_mods, building_mods = EventSystem().combine_event_modifiers(
-            positive_event, negative_event
-        )
-        
-        # Применяем модификаторы к ценам (упрощенно - только события)
-        for resource in current_prices.keys():
-            if resource in resource_mods:
-                # Применяем модификатор события
-                current_prices[resource] *= resource_mods[resource]
-            # Ограничиваем изменения (как в market_dynamics)
-            max_change = 1.0 + 0.50  # 50% за раунд
-            min_change = 1.0 - 0.50
-            price_change = current_prices[resource] / base_prices[resource]
-            if price_change > max_change:
-                current_prices[resource] = base_prices[resource] * max_change
-            elif price_change < min_change:
-                current_prices[resource] = base_prices[resource] * min_change
-            
-            # Абсолютные ограничения
-            current_prices[resource] = max(
-                base_prices[resource] * 0.3,
-                min(base_prices[resource] * 3.0, current_prices[resource])
-            )
-        
-        # Рассчитываем доходы объектов с учетом модификаторов
-        for building_name, base_income in BUILDING_INCOME.items():
-            modifier = building_mods.get(building_name, 1.0)
-            
-            # Монеты
-            coins = base_income.get("монеты", 0) * modifier
-            building_total_income[building_name]["монеты"] += coins
-            
-            # Ресурсы
-            for resource, amount in base_income.get("ресурсы", {}).items():
-                actual_amount = amount * modifier
-                if resource not in building_total_income[building_name]["ресурсы"]:
-                    building_total_income[building_name]["ресурсы"][resource] = 0
-                building_total_income[building_name]["ресурсы"][resource] += actual_amount
+    # Доходы объектов: базовый доход, умноженный на сумму модификаторов по раундам
+    building_total_income = {}
+    for building_name, base_income in BUILDING_INCOME.items():
+        modifier = income_modifiers[building_name]
+        building_total_income[building_name] = {
+            "монеты": base_income.get("монеты", 0) * modifier,
+            "ресурсы": {
+                resource: amount * modifier for resource, amount in base_income.get("ресурсы", {}).items()
+            }
+        }
     
     # Рассчитываем итоговые изменения цен
     price_changes = {}
@@ -102,8 +124,8 @@ def simulate_game_scenario(event_pairs: List[tuple], num_rounds: int = 10) -> Di
         for resource, amount in income_data["ресурсы"].items():
             total_value += amount * current_prices[resource]
         
-        # Стоимость объекта
-        building_cost = calculate_building_cost(BUILDING_COSTS[building_name])
+        # Стоимость объекта (по начальным ценам)
+        building_cost = BASE_BUILDING_COSTS[building_name]
         
         building_results[building_name] = {
             "cost": building_cost,
@@ -131,26 +153,20 @@ def generate_scenario_analysis(num_scenarios: int = 10, rounds_per_scenario: int
         Список результатов симуляций
     """
     results = []
-    event_system = EventSystem()
     
     for scenario_num in range(num_scenarios):
         # Генерируем набор пар событий
         # Используем все доступные пары, перемешивая их
-        available_pairs = EVENT_PAIRS.copy()
+        available_pairs = list(range(len(EVENT_PAIRS)))
         random.shuffle(available_pairs)
         
         # Берем нужное количество пар (с повторениями если нужно)
         event_pairs = []
         for i in range(rounds_per_scenario):
             if not available_pairs:
-                available_pairs = EVENT_PAIRS.copy()
+                available_pairs = list(range(len(EVENT_PAIRS)))
                 random.shuffle(available_pairs)
-            pair_dict = available_pairs.pop(0)
-            
-            # Получаем полные объекты событий
-            positive_event = positive_events_dict[pair_dict["positive"]]
-            negative_event = negative_events_dict[pair_dict["negative"]]
-            event_pairs.append((positive_event, negative_event))
+            event_pairs.append(event_pair_events(available_pairs.pop(0)))
         
         # Симулируем сценарий
         result = simulate_game_scenario(event_pairs, rounds_per_scenario)
@@ -13,6 +13,36 @@ let isAuthorized = false;
 let telegramUser = null;
 let updateInterval = null; // Интервал для обновления данных
 
+// Последние ответы GET-запросов по ETag: {url: {etag, data}}
+const etagCache = {};
+
+// GET-запрос с If-None-Match: при 304 сервер не присылает тело,
+// используем сохраненные данные. Возвращает {data, changed}
+async function fetchJsonWithEtag(url, headers = {}) {
+    const cached = etagCache[url];
+    const requestHeaders = { ...headers };
+    if (cached) {
+        requestHeaders['If-None-Match'] = cached.etag;
+    }
+
+    const response = await fetch(url, { headers: requestHeaders, cache: 'no-store' });
+    if (response.status === 304 && cached) {
+        return { data: cached.data, changed: false };
+    }
+    if (!response.ok) {
+        throw new Error(`Ошибка запроса ${url}: ${response.status}`);
+    }
+
+    const data = await response.json();
+    const etag = response.headers.get('ETag');
+    if (etag) {
+        etagCache[url] = { etag, data };
+    } else {
+        delete etagCache[url];
+    }
+    return { data, changed: true };
+}
+
 // Инициализация
 document.addEventListener('DOMContentLoaded', async () => {
     try {
@@ -177,17 +207,11 @@ async function saveAuthData() {
 // Загрузка состояния игрока
 async function loadPlayerState() {
     try {
-        const response = await fetch('/api/miniapp/player/state', {
-            headers: {
-                'X-Telegram-Init-Data': tg.initData
-            }
+        const { data, changed } = await fetchJsonWithEtag('/api/miniapp/player/state', {
+            'X-Telegram-Init-Data': tg.initData
         });
+        if (!changed) return;
 
-        if (!response.ok) {
-            throw new Error('Ошибка загрузки состояния');
-        }
-
-        const data = await response.json();
         playerState = data;
 
         // Обновляем UI
@@ -202,10 +226,9 @@ async function loadPlayerState() {
 // Загрузка цен
 async function loadPrices() {
     try {
-        const response = await fetch('/api/miniapp/prices');
-        if (!response.ok) return;
+        const { data, changed } = await fetchJsonWithEtag('/api/miniapp/prices');
+        if (!changed) return;
 
-        const data = await response.json();
         prices = data.prices || [];
 
         updatePrices();
@@ -217,10 +240,9 @@ async function loadPrices() {
 // Загрузка информации о раунде
 async function loadRoundInfo() {
     try {
-        const response = await fetch('/api/miniapp/round-info');
-        if (!response.ok) return;
+        const { data, changed } = await fetchJsonWithEtag('/api/miniapp/round-info');
+        if (!changed) return;
 
-        const data = await response.json();
         currentRound = data.current_round || 1;
 
         document.getElementById('current-round').textContent = currentRound;
@@ -406,9 +428,10 @@ function showSellResourceModal() {
 
 function showBuildModal() {
     // Загрузим список доступных объектов через API
-    fetch('/api/miniapp/buildings')
-        .then(res => res.json())
-        .then(data => {
+    fetchJsonWithEtag('/api/miniapp/buildings', {
+        'X-Telegram-Init-Data': tg.initData
+    })
+        .then(({ data }) => {
             const modal = document.getElementById('build-modal');
             const options = document.getElementById('build-options');
             options.innerHTML = '';
@@ -418,17 +441,25 @@ function showBuildModal() {
                 option.className = 'modal-option';
                 
                 const canBuild = building.can_build;
-                if (!canBuild) {
+                const canBuyAndBuild = !canBuild && building.can_buy_and_build;
+                if (!canBuild && !canBuyAndBuild) {
                     option.classList.add('disabled');
                 }
 
+                let action = '<div style="color: #dc3545; margin-top: 10px;">Недостаточно ресурсов и денег</div>';
+                if (canBuild) {
+                    action = `<button class="confirm-btn" onclick="buildBuilding('${building.name}')">Построить</button>`;
+                } else if (canBuyAndBuild) {
+                    action = `<button class="confirm-btn" onclick="buyAndBuild('${building.name}')">Докупить и построить (${building.shortfall_cost} монет)</button>`;
+                }
+
                 option.innerHTML = `
                     <div class="modal-option-header">
                         <span class="modal-option-name">${building.name}</span>
                         <span class="modal-option-price">${building.cost} монет</span>
                     </div>
                     <div class="modal-option-details">${building.cost_details}</div>
-                    ${canBuild ? `<button class="confirm-btn" onclick="buildBuilding('${building.name}')">Построить</button>` : '<div style="color: #dc3545; margin-top: 10px;">Недостаточно ресурсов</div>'}
+                    ${action}
                 `;
                 options.appendChild(option);
             });
@@ -588,6 +619,36 @@ async function buildBuilding(buildingName) {
     }
 }
 
+async function buyAndBuild(buildingName) {
+    showLoading(true);
+
+    try {
+        const response = await fetch('/api/miniapp/player/buy-and-build', {
+            method: 'POST',
+            headers: {
+                'Content-Type': 'application/json',
+                'X-Telegram-Init-Data': tg.initData
+            },
+            body: JSON.stringify({ building_name: buildingName })
+        });
+
+        const data = await response.json();
+
+        if (data.success) {
+            showToast(data.message || 'Объект начат', 'success');
+            closeModal('build-modal');
+            await loadPlayerState();
+        } else {
+            showToast(data.message || 'Ошибка строительства', 'error');
+        }
+    } catch (error) {
+        console.error('Ошибка строительства:', error);
+        showToast('Ошибка строительства', 'error');
+    } finally {
+        showLoading(false);
+    }
+}
+
 async function sellBuilding(buildingId) {
     showLoading(true);
 
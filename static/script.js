@@ -1,11 +1,23 @@
 let ws = null;
 let reconnectInterval = null;
+const wsDecoder = new TextDecoder('utf-8');
+
+// Лента обновлений: полное состояние + номер последнего примененного сообщения
+let feedEpoch = null;
+let feedSeq = 0;
+let feedState = null;
 
 function connectWebSocket() {
     const protocol = window.location.protocol === 'https:' ? 'wss:' : 'ws:';
-    const wsUrl = `${protocol}//${window.location.host}/ws`;
+    let wsUrl = `${protocol}//${window.location.host}/ws`;
+    if (feedEpoch) {
+        // При переподключении получаем только пропущенные изменения
+        wsUrl += `?epoch=${encodeURIComponent(feedEpoch)}&since=${feedSeq}`;
+    }
     
     ws = new WebSocket(wsUrl);
+    // Сервер рассылает заранее сериализованные байты (бинарные кадры)
+    ws.binaryType = 'arraybuffer';
     
     ws.onopen = () => {
         console.log('WebSocket connected');
@@ -16,8 +28,32 @@ function connectWebSocket() {
     };
     
     ws.onmessage = (event) => {
-        const data = JSON.parse(event.data);
-        updateUI(data);
+        const text = typeof event.data === 'string' ? event.data : wsDecoder.decode(event.data);
+        const data = JSON.parse(text);
+        // Heartbeat только поддерживает соединение, состояние не изменилось
+        if (data.type === 'heartbeat') {
+            return;
+        }
+        
+        if (data.type === 'snapshot') {
+            feedEpoch = data.epoch;
+            feedSeq = data.seq;
+            feedState = data.state;
+        } else if (data.type === 'delta') {
+            if (data.epoch === feedEpoch && data.seq <= feedSeq) {
+                return;  // Уже применено
+            }
+            if (!feedState || data.epoch !== feedEpoch || data.seq !== feedSeq + 1) {
+                // Пропущены сообщения - переподключаемся и догоняем
+                ws.close();
+                return;
+            }
+            applyDelta(feedState, data);
+            feedSeq = data.seq;
+        } else {
+            return;
+        }
+        updateUI(feedState);
     };
     
     ws.onerror = (error) => {
@@ -32,6 +68,62 @@ function connectWebSocket() {
     };
 }
 
+// Последние ответы GET-запросов по ETag: {url: {etag, data}}
+const etagCache = {};
+
+// GET-запрос с If-None-Match: при 304 используем сохраненные данные
+async function fetchJsonWithEtag(url) {
+    const cached = etagCache[url];
+    const headers = cached ? { 'If-None-Match': cached.etag } : {};
+
+    const response = await fetch(url, { headers, cache: 'no-store' });
+    if (response.status === 304 && cached) {
+        return cached.data;
+    }
+    if (!response.ok) {
+        throw new Error(`Ошибка API ${url}: ${response.status} ${response.statusText}`);
+    }
+
+    const data = await response.json();
+    const etag = response.headers.get('ETag');
+    if (etag) {
+        etagCache[url] = { etag, data };
+    }
+    return data;
+}
+
+function mergeRows(rows, patch, key) {
+    // Применяем изменения к строкам таблицы: changed / removed / order
+    const byKey = new Map(rows.map(row => [row[key], row]));
+    (patch.removed || []).forEach(rowKey => byKey.delete(rowKey));
+    const newKeys = [];
+    (patch.changed || []).forEach(row => {
+        if (!byKey.has(row[key])) {
+            newKeys.push(row[key]);
+        }
+        byKey.set(row[key], row);
+    });
+    const order = patch.order ||
+        rows.map(row => row[key]).filter(rowKey => byKey.has(rowKey)).concat(newKeys);
+    return order.map(rowKey => byKey.get(rowKey));
+}
+
+function applyDelta(state, delta) {
+    state.state_version = delta.state_version;
+    state.current_round = delta.current_round;
+    state.num_players = delta.num_players;
+    
+    if (delta.leaderboard) {
+        state.leaderboard.leaderboard = mergeRows(state.leaderboard.leaderboard, delta.leaderboard, 'player_id');
+    }
+    if (delta.prices) {
+        state.prices.prices = mergeRows(state.prices.prices, delta.prices, 'resource');
+    }
+    if (delta.buildings) {
+        state.buildings.buildings = mergeRows(state.buildings.buildings, delta.buildings, 'name');
+    }
+}
+
 function updateUI(data) {
     // Обновляем информацию о раунде
     if (data.current_round !== undefined) {
@@ -327,8 +419,7 @@ async function loadBuildingModalData(buildingName, cardCount, cardPercentage) {
         document.getElementById('modal-building-percentage').textContent = `${percentage}%`;
         
         // Затем загружаем детальную информацию (владельцев)
-        const response = await fetch(`/api/building/${encodeURIComponent(buildingName)}`);
-        const data = await response.json();
+        const data = await fetchJsonWithEtag(`/api/building/${encodeURIComponent(buildingName)}`);
         
         if (data.error) {
             console.error('Ошибка загрузки данных:', data.error);
@@ -420,14 +511,7 @@ async function openResourceModal(resourceName) {
 // Функция для загрузки данных ресурса в модальное окно
 async function loadResourceModalData(resourceName) {
     try {
-        const response = await fetch(`/api/resource/${encodeURIComponent(resourceName)}`);
-        
-        if (!response.ok) {
-            console.error('Ошибка API:', response.status, response.statusText);
-            return;
-        }
-        
-        const data = await response.json();
+        const data = await fetchJsonWithEtag(`/api/resource/${encodeURIComponent(resourceName)}`);
         
         if (data.error) {
             console.error('Ошибка загрузки данных:', data.error);
@@ -1,7 +1,15 @@
 """
 Полный тест игрового движка с проверкой всех функций
 """
+import random
+from math import isclose
 from game_engine import Game, BuildingStatus
+from game_config import BUILDING_COSTS
+from cost_table import BASE_BUILDING_COSTS, RESOURCE_NAMES, RESOURCE_INDEX, BUILDING_NAMES
+import market_dynamics
+from money import CENTS
+from market_config import MarketConfig
+from player_bitset import PlayerBitset
 
 def test_full_game():
     """Полный тест игры"""
@@ -138,6 +146,737 @@ def test_full_game():
     
     print("\n✓ Все тесты пройдены успешно!")
 
+def test_state_version():
+    """Версия состояния растет только при изменениях"""
+    game = Game(num_players=2)
+    assert game.state_version == 0
+    
+    game.add_player("p1", "Игрок 1")
+    version = game.state_version
+    assert version > 0
+    
+    # Неудачные действия не меняют версию
+    game.add_player("p1", "Игрок 1")
+    game.buy_resource("p1", "золото", 1000)
+    game.sell_resource("p1", "дерево", 1)
+    game.start_building("p1", "Лесоповал")
+    assert game.state_version == version
+    
+    game.buy_resource("p1", "дерево", 2)
+    game.sell_resource("p1", "дерево", 1)
+    assert game.state_version == version + 2
+    
+    game.process_round()
+    assert game.state_version == version + 3
+    print("✓ Версия состояния обновляется корректно")
+
+def test_building_registry():
+    """Объекты получают уникальные целые ID, поиск и удаление по индексу"""
+    game = Game(num_players=1)
+    game.add_player("p1", "Игрок 1")
+    player = game.get_player("p1")
+    player.add_resource("железо", 10)
+    player.add_resource("рабы", 6)
+    
+    first_id = game.start_building("p1", "Лесоповал")["building_id"]
+    second_id = game.start_building("p1", "Лесоповал")["building_id"]
+    assert isinstance(first_id, int) and first_id != second_id
+    assert game.get_building(first_id) is player.get_building(first_id)
+    
+    # Удаление не приводит к повторной выдаче ID в том же раунде
+    game.building_registry.remove(first_id)
+    player.add_resource("железо", 5)
+    player.add_resource("рабы", 3)
+    third_id = game.start_building("p1", "Лесоповал")["building_id"]
+    assert third_id not in (first_id, second_id)
+    assert [b.id for b in player.buildings] == [second_id, third_id]
+    
+    # Строковый псевдоним и строка с числом тоже принимаются
+    game.process_round()
+    game.process_round()
+    alias = game.get_building(second_id).alias
+    assert game.put_building_for_sale("p1", alias)["success"]
+    assert game.put_building_for_sale("p1", str(third_id))["success"]
+    assert not game.put_building_for_sale("p1", first_id)["success"]
+    
+    # Проданные объекты удаляются из реестра
+    game.process_round()
+    game.process_round()
+    assert len(game.building_registry) == 0 and len(player.buildings) == 0
+    print("✓ Реестр объектов работает корректно")
+
+def check_building_aggregates(game: Game):
+    """Сравнить агрегаты реестра с полным обходом объектов"""
+    registry = game.building_registry
+    active, owned, status_counts, owners, player_active = {}, {}, {}, {}, {}
+    for player in game.players:
+        for building in player.buildings:
+            status_counts[building.status] = status_counts.get(building.status, 0) + 1
+            if building.status == BuildingStatus.ACTIVE:
+                active[building.name] = active.get(building.name, 0) + 1
+                counts = player_active.setdefault(player.id, {})
+                counts[building.name] = counts.get(building.name, 0) + 1
+            if building.status != BuildingStatus.FOR_SALE:
+                owned[building.name] = owned.get(building.name, 0) + 1
+                type_owners = owners.setdefault(building.name, {})
+                type_owners[player.id] = type_owners.get(player.id, 0) + 1
+    
+    assert registry.active_counts() == active
+    assert registry.owned_counts() == owned
+    assert {s: c for s, c in registry.status_counts.items() if c} == status_counts
+    assert {name: o for name, o in registry.owners_by_type.items() if o} == owners
+    assert {pid: c for pid, c in registry.active_by_player.items() if c} == player_active
+
+def test_building_aggregates():
+    """Агрегаты объектов совпадают с полным пересчетом на протяжении игры"""
+    random.seed(7)
+    game = Game(num_players=6)
+    for i in range(6):
+        game.add_player(f"p{i}", f"Игрок {i}")
+    
+    for _ in range(8):
+        for player in game.players:
+            building_name = random.choice(list(BUILDING_COSTS))
+            for resource, amount in BUILDING_COSTS[building_name].items():
+                player.add_resource(resource, amount)
+            game.start_building(player.id, building_name)
+            
+            sellable = [b for b in player.buildings
+                        if b.status in (BuildingStatus.COMPLETED, BuildingStatus.ACTIVE)]
+            if sellable and random.random() < 0.3:
+                game.put_building_for_sale(player.id, random.choice(sellable).id)
+        check_building_aggregates(game)
+        game.process_round()
+        check_building_aggregates(game)
+    print("✓ Агрегаты объектов совпадают с полным пересчетом")
+
+def test_leaderboard_growth():
+    """Прирост считается от снимка предыдущего раунда, чтение ничего не меняет"""
+    game = Game(num_players=2)
+    game.add_player("p1", "Игрок 1")
+    game.add_player("p2", "Игрок 2")
+    game.buy_resource("p1", "дерево", 20)
+    
+    # До первого раунда снимка нет - прирост нулевой
+    assert all(row["growth_percent"] == 0 for row in game.get_leaderboard())
+    
+    game.process_round()
+    assert set(game.previous_net_worth) == {"p1", "p2"}
+    
+    # Цены меняются только присваиванием (версии цен растут)
+    try:
+        game.current_prices["дерево"] *= 2
+    except TypeError:
+        pass
+    else:
+        assert False, "current_prices должен быть только для чтения"
+    
+    # Дерево подорожало вдвое - прирост только у Игрока 1
+    game.current_prices = {**game.current_prices, "дерево": game.current_prices["дерево"] * 2}
+    
+    first = {row["player_id"]: row["growth_percent"] for row in game.get_leaderboard()}
+    second = {row["player_id"]: row["growth_percent"] for row in game.get_leaderboard()}
+    assert first == second
+    assert first["p1"] > 0
+    assert first["p2"] == 0
+    print(f"✓ Прирост: {first}")
+
+def test_transition_schedule():
+    """Статусы меняются по расписанию раундов, расписание не копится"""
+    game = Game(num_players=1)
+    game.add_player("p1", "Игрок 1")
+    player = game.get_player("p1")
+    registry = game.building_registry
+    
+    statuses = []
+    for _ in range(2):
+        player.add_resource("железо", 5)
+        player.add_resource("рабы", 3)
+    first_id = game.start_building("p1", "Лесоповал")["building_id"]
+    second_id = game.start_building("p1", "Лесоповал")["building_id"]
+    for _ in range(3):
+        game.process_round()
+        statuses.append(registry.get(first_id).status)
+    assert statuses == [BuildingStatus.BUILDING, BuildingStatus.COMPLETED, BuildingStatus.ACTIVE]
+    print(f"✓ Статусы по раундам: {[s.value for s in statuses]}")
+    
+    # Второй объект выставлен на продажу - в текущем раунде он уже не приносит
+    # дохода, а продается при обработке следующего раунда
+    assert game.put_building_for_sale("p1", second_id)["success"]
+    result = game.process_round()
+    assert result["income"]["buildings_sold"] == []
+    assert result["income"]["income_distributed"]["p1"]["ресурсы"]
+    result = game.process_round()
+    assert [sale["building_name"] for sale in result["income"]["buildings_sold"]] == ["Лесоповал"]
+    assert registry.get(second_id) is None
+    assert registry.player_active_counts("p1") == {"Лесоповал": 1}
+    
+    # Все запланированные переходы выполнены
+    assert registry.schedule == {}
+    print("✓ Продажа по расписанию, расписание пусто")
+
+def test_array_state():
+    """Состояние в массивах NumPy дает те же результаты, что и в объектах Player"""
+    games = [Game(num_players=6, array_state=False), Game(num_players=6, array_state=True)]
+    assert games[0].player_store is None and games[1].player_store is not None
+    
+    for game in games:
+        random.seed(11)
+        for i in range(6):
+            game.add_player(f"p{i}", f"Игрок {i}")
+        game.buy_resource("p0", "дерево", 4)
+        
+        incomes = []
+        for _ in range(6):
+            for player in game.players:
+                building_name = random.choice(list(BUILDING_COSTS))
+                for resource, amount in BUILDING_COSTS[building_name].items():
+                    player.add_resource(resource, amount)
+                game.start_building(player.id, building_name)
+                if player.resources and random.random() < 0.3:
+                    game.sell_resource(player.id, random.choice(sorted(player.resources)), 1)
+            result = game.process_round()
+            incomes.append(dict(result["income"]["income_distributed"]))
+        game.incomes = incomes
+    
+    dict_game, array_game = games
+    for dict_player, array_player in zip(dict_game.players, array_game.players):
+        assert array_player.money_cents == dict_player.money_cents
+        assert array_player.resources.copy() == dict_player.resources
+        assert isinstance(array_player.resources.get("дерево", 0), int)
+    for dict_income, array_income in zip(dict_game.incomes, array_game.incomes):
+        assert list(array_income) == list(dict_income)
+        for player_id, income in dict_income.items():
+            assert isclose(array_income[player_id]["монеты"], income["монеты"])
+            array_resources = array_income[player_id]["ресурсы"]
+            assert set(array_resources) == {r for r, amount in income["ресурсы"].items() if amount}
+            assert all(isclose(array_resources[r], income["ресурсы"][r]) for r in array_resources)
+    
+    # Турнирная таблица совпадает, первые строки - те же, что в полной таблице
+    dict_board, array_board = dict_game.get_leaderboard(), array_game.get_leaderboard()
+    assert [row["player_id"] for row in array_board] == [row["player_id"] for row in dict_board]
+    for dict_row, array_row in zip(dict_board, array_board):
+        assert all(isclose(array_row[key], dict_row[key], abs_tol=0.011) for key in dict_row if key not in ("player_id", "name"))
+    assert array_game.get_leaderboard(limit=3) == array_board[:3]
+    assert dict_game.get_leaderboard(limit=3) == dict_board[:3]
+    
+    # При равной стоимости сохраняется порядок игроков, в том числе на границе limit
+    tie_game = Game(num_players=5, array_state=True)
+    for i in range(5):
+        tie_game.add_player(f"t{i}", f"Игрок {i}")
+    tie_game.get_player("t3").money += 1
+    full = [row["player_id"] for row in tie_game.get_leaderboard()]
+    assert full == ["t3", "t0", "t1", "t2", "t4"]
+    assert [row["player_id"] for row in tie_game.get_leaderboard(limit=2)] == full[:2]
+    assert tie_game.get_leaderboard(limit=0) == []
+    
+    # Представление ресурсов ведет себя как словарь
+    player = array_game.get_player("p0")
+    player.resources.clear()
+    player.add_resource("золото", 2)
+    assert player.remove_resource("золото", 2)
+    assert "золото" not in player.resources and len(player.resources) == 0
+    print("✓ Массивы и объекты Player дают одинаковое состояние")
+
+def test_cost_table():
+    """Стоимость объектов пересчитывается только при смене версии цен"""
+    assert BASE_BUILDING_COSTS["Золотой рудник"] == 1500
+    assert BASE_BUILDING_COSTS["Лесоповал"] == 440
+    
+    game = Game(num_players=2)
+    game.add_player("p1", "Игрок 1")
+    table = game.get_cost_table()
+    costs = table.costs
+    assert game.calculate_building_cost("Лесоповал") == 440
+    assert game.get_cost_table().costs is costs
+    
+    # Новые цены - новая версия и пересчет
+    game.current_prices = {**game.current_prices, "железо": 50}
+    assert game.calculate_building_cost("Лесоповал") == 5 * 50 + 3 * 80
+    assert game.get_cost_table().costs is not costs
+    assert game.calculate_building_cost("Неизвестный объект") == 0
+    print(f"✓ Таблица стоимости, версия цен: {game.price_version}")
+
+def test_player_ranking():
+    """Страницы и места из рейтинга совпадают с полной турнирной таблицей"""
+    for array_state in (False, True):
+        random.seed(5)
+        game = Game(num_players=12, array_state=array_state)
+        for i in range(12):
+            game.add_player(f"p{i}", f"Игрок {i}")
+        
+        for step in range(60):
+            player_id = f"p{random.randrange(12)}"
+            action = random.random()
+            if action < 0.5:
+                game.buy_resource(player_id, random.choice(["дерево", "камень", "железо", "рабы"]), random.randint(1, 3))
+            elif action < 0.8:
+                game.start_building(player_id, "Лесоповал")
+            elif action < 0.9:
+                sellable = [b.id for b in game.get_player(player_id).buildings
+                            if b.status in (BuildingStatus.COMPLETED, BuildingStatus.ACTIVE)]
+                if sellable:
+                    game.put_building_for_sale(player_id, sellable[0])
+            else:
+                game.process_round()
+            
+            board = game.get_leaderboard()
+            assert game.get_leaderboard_page(3) == board[:3]
+            assert game.get_leaderboard_page(4, offset=5) == board[5:9]
+            row = board[step % 12]
+            assert game.get_player_rank(row["player_id"]) == step % 12 + 1
+        
+        # Действие игрока обновляет рейтинг на месте, без перестроения
+        game.get_ranking()
+        game.buy_resource("p0", "золото", 1)
+        assert game.ranking.valid
+        assert game.get_leaderboard_page(12) == game.get_leaderboard()
+        # Ключи рейтинга - целые сотые монеты (без сравнения float)
+        assert all(type(key[0]) is int for key in game.ranking.keys.values())
+        assert -game.ranking.keys["p0"][0] == game.calculate_player_value(game.get_player("p0"))["total_value_cents"]
+    assert game.get_player_rank("нет такого") is None
+    print("✓ Рейтинг совпадает с турнирной таблицей")
+
+def test_player_value_cache():
+    """Капитализация пересчитывается только у изменившихся игроков"""
+    for array_state in (False, True):
+        game = Game(num_players=3, array_state=array_state)
+        for i in range(3):
+            game.add_player(f"p{i}", f"Игрок {i}")
+        p0, p1 = game.get_player("p0"), game.get_player("p1")
+        game.get_leaderboard()
+        cached = {player.id: game.calculate_player_value(player) for player in game.players}
+        
+        # Действие одного игрока - пересчитывается только он
+        game.buy_resource("p0", "железо", 5)
+        game.get_leaderboard()
+        assert game.calculate_player_value(p0) is not cached["p0"]
+        assert game.calculate_player_value(p1) is cached["p1"]
+        assert game.calculate_player_value(p0)["resources_value"] == 5 * game.current_prices["железо"]
+        
+        # Объект меняет стоимость объектов игрока
+        p1.add_resource("железо", 5)
+        p1.add_resource("рабы", 3)
+        game.start_building("p1", "Лесоповал")
+        assert game.calculate_player_value(p1)["buildings_value"] == game.calculate_building_cost("Лесоповал")
+        
+        # Новые цены - устарели все
+        before = game.calculate_player_value(game.get_player("p2"))
+        game.current_prices = {**game.current_prices, "железо": 60}
+        assert game.calculate_player_value(game.get_player("p2")) is not before
+        assert game.calculate_player_value(p0)["resources_value"] == 5 * 60
+        
+        # Доход раунда учитывается в капитализации
+        for _ in range(3):
+            game.process_round()
+        value = dict(game.calculate_player_value(p1))
+        p1.value_stamp = -1
+        assert game.calculate_player_value(p1) == value
+        assert value["resources_value"] > 0
+    print("✓ Кэш капитализации сбрасывается только у изменившихся игроков")
+
+def test_fixed_point_money():
+    """Деньги и цены - целые сотые монеты: суммы точные, повтор игры совпадает до копейки"""
+    game = Game(num_players=2)
+    game.add_player("p1", "Игрок 1")
+    player = game.get_player("p1")
+    game.current_prices = {**game.current_prices, "дерево": 0.1}
+    assert game.prices_cents["дерево"] == 10
+    try:
+        game.prices_cents["дерево"] = 20
+    except TypeError:
+        pass
+    else:
+        assert False, "prices_cents должен быть только для чтения"
+    
+    # 0.1 * 3 в float - не 0.3, в сотых - точно
+    for _ in range(3):
+        game.buy_resource("p1", "дерево", 1)
+    assert player.money_cents == 100000 - 30
+    assert player.money == 999.7
+    assert game.sell_resource("p1", "дерево", 3)["income"] == 0.3
+    assert player.money == 1000
+    
+    # Дробное или логическое количество отклоняется до списания денег (оба режима хранения)
+    for array_state in (False, True):
+        other = Game(num_players=2, array_state=array_state)
+        other.add_player("p1", "Игрок 1")
+        trader = other.get_player("p1")
+        trader.add_resource("дерево", 2)
+        before = (trader.money_cents, trader.resources.copy())
+        for amount in (1.5, True, "1"):
+            assert other.buy_resource("p1", "дерево", amount)["message"] == "Количество должно быть целым числом"
+            assert other.sell_resource("p1", "дерево", amount)["message"] == "Количество должно быть целым числом"
+        assert (trader.money_cents, trader.resources.copy()) == before
+        assert isinstance(trader.money_cents, int)
+    
+    # Цена продажи объекта фиксируется в сотых
+    for resource, amount in BUILDING_COSTS["Лесоповал"].items():
+        player.add_resource(resource, amount)
+    building_id = game.start_building("p1", "Лесоповал")["building_id"]
+    game.process_round()
+    game.process_round()
+    result = game.put_building_for_sale("p1", building_id)
+    building = game.get_building(building_id)
+    assert isinstance(building.sale_price_cents, int)
+    assert result["sale_price"] == building.sale_price == game.calculate_building_cost("Лесоповал")
+    
+    # Повтор игры с тем же зерном - те же цены и деньги
+    def replay():
+        random.seed(5)
+        replay_game = Game(num_players=3)
+        for i in range(3):
+            replay_game.add_player(f"p{i}", f"Игрок {i}")
+        for _ in range(8):
+            for i in range(3):
+                replay_game.buy_resource(f"p{i}", random.choice(sorted(replay_game.current_prices)), 1)
+            replay_game.process_round()
+        return replay_game.prices_cents, [p.money_cents for p in replay_game.players]
+    
+    first, second = replay(), replay()
+    assert first == second
+    assert all(isinstance(price, int) for price in first[0].values())
+    print("✓ Деньги и цены в сотых монеты, повтор игры совпадает")
+
+def test_activity_bitsets():
+    """Спрос и предложение раунда - битовые маски порядковых номеров игроков"""
+    game = Game(num_players=20)
+    for i in range(20):
+        game.add_player(f"p{i}", f"Игрок {i}")
+    for i in (0, 3, 9, 17):
+        game.buy_resource(f"p{i}", "дерево", 2)
+    game.buy_resource("p3", "дерево", 1)  # Повторная покупка не увеличивает счетчик
+    game.sell_resource("p9", "дерево", 1)
+    
+    bought = game.current_round_players_bought["дерево"]
+    assert 3 in bought and 4 not in bought and 100 not in bought
+    assert list(bought) == [0, 3, 9, 17]
+    assert game.phase_purchases() == {"players_bought": {"дерево": 4}, "players_sold": {"дерево": 1}}
+    
+    game.process_round()
+    assert game.current_round_players_bought == {}
+    assert game.previous_round_players_bought == {"дерево": 4}
+    assert game.get_round_activity(1, "bought", "дерево") == ["p0", "p3", "p9", "p17"]
+    assert game.get_round_activity(1, "sold", "дерево") == ["p9"]
+    assert game.get_round_activity(1, "bought", "камень") == []
+    assert game.get_round_activity(2, "bought", "дерево") == []
+    
+    history = game.activity_history[0]
+    assert list(history["bought"]["дерево"] & history["sold"]["дерево"]) == [9]
+    
+    # Маски разной длины: объединение по длинной, пересечение по короткой
+    short, wide = PlayerBitset(), PlayerBitset()
+    short.add(2)
+    wide.add(2)
+    wide.add(40)
+    assert list(short | wide) == [2, 40] and len(short | wide) == 2
+    assert list(short & wide) == [2] and len((short & wide).bits) == 1
+    assert 40 not in short and len(PlayerBitset()) == 0
+    print("✓ Спрос и предложение в битовых масках, маски раундов в истории")
+
+def test_apply_actions():
+    """Пакет действий выполняется целиком или не выполняется совсем"""
+    game = Game(num_players=2)
+    game.add_player("p1", "Игрок 1")
+    player = game.get_player("p1")
+    
+    # Покупки и стройка из только что купленных ресурсов
+    result = game.apply_actions("p1", [
+        {"type": "buy", "resource": "железо", "amount": 5},
+        {"type": "buy", "resource": "рабы", "amount": 3},
+        {"type": "build", "building_name": "Лесоповал"},
+    ])
+    assert result["success"] and result["failed_index"] is None
+    assert [r["success"] for r in result["results"]] == [True, True, True]
+    assert player.money == 1000 - 5 * 40 - 3 * 80
+    assert player.resources == {} and len(player.buildings) == 1
+    
+    # Ошибка в последнем действии - не выполняется ни одно
+    version = player.version
+    before = (player.money_cents, player.resources.copy(), len(player.buildings))
+    result = game.apply_actions("p1", [
+        {"type": "buy", "resource": "золото", "amount": 2},
+        {"type": "sell", "resource": "золото", "amount": 1},
+        {"type": "build", "building_name": "Кузнечная"},
+    ])
+    assert not result["success"] and result["failed_index"] == 2
+    assert result["message"] == "Действие 3: Недостаточно ресурсов"
+    assert (player.money_cents, player.resources.copy(), len(player.buildings)) == before
+    assert player.version == version
+    assert "золото" not in game.current_round_players_bought
+    
+    # Деньги учитываются с предыдущими покупками пакета
+    result = game.apply_actions("p1", [{"type": "buy", "resource": "золото", "amount": 5}] * 2)
+    assert result["failed_index"] == 1 and result["message"].startswith("Действие 2: Недостаточно денег")
+    
+    # Один объект нельзя выставить на продажу дважды, стройку - нельзя совсем
+    building_id = player.buildings[0].id
+    result = game.apply_actions("p1", [{"type": "sell_building", "building_id": building_id}])
+    assert result["message"] == "Действие 1: Нельзя продать объект, который еще строится"
+    game.process_round()
+    game.process_round()
+    sale = {"type": "sell_building", "building_id": player.buildings[0].alias}
+    assert game.apply_actions("p1", [sale, sale])["failed_index"] == 1
+    assert game.apply_actions("p1", [sale])["results"][0]["success"]
+    
+    for bad in ([{"type": "взлом"}], [{"type": "buy", "resource": "дерево", "amount": "5"}], ["buy"]):
+        assert game.apply_actions("p1", bad)["failed_index"] == 0
+    assert game.apply_actions("нет такого", [])["message"] == "Игрок не найден"
+    
+    # Списки и словари вместо названий (из JSON) - ошибка действия, а не исключение
+    for bad, message in (({"type": "buy", "resource": ["дерево"]}, "Неизвестный ресурс"),
+                         ({"type": "sell", "resource": {"дерево": 1}}, "Неизвестный ресурс"),
+                         ({"type": "build", "building_name": ["Лесоповал"]}, "Неизвестный объект")):
+        assert game.apply_actions("p1", [bad])["message"] == f"Действие 1: {message}"
+    print("✓ Пакет действий: все или ничего")
+
+def test_buy_and_build():
+    """Постройка с докупкой недостающих ресурсов одной операцией"""
+    game = Game(num_players=2)
+    game.add_player("p1", "Игрок 1")
+    game.add_player("p2", "Игрок 2")
+    player = game.get_player("p1")
+    player.add_resource("железо", 2)
+    
+    plan = game.plan_building(player, "Лесоповал")
+    assert plan == {"shortfall": {"железо": 3, "рабы": 3}, "cost_cents": (3 * 40 + 3 * 80) * 100, "can_afford": True}
+    
+    result = game.buy_and_build("p1", "Лесоповал")
+    assert result["success"] and result["cost"] == 360
+    assert result["message"].endswith("(докуплено ресурсов на 360.00 монет)")
+    assert player.money == 1000 - 360 and player.resources == {}
+    assert game.get_building(result["building_id"]).name == "Лесоповал"
+    # Докупка учитывается в спросе раунда
+    assert game.phase_purchases()["players_bought"] == {"железо": 1, "рабы": 1}
+    
+    # Ресурсов хватает - ничего не докупается
+    for resource, amount in BUILDING_COSTS["Лесоповал"].items():
+        player.add_resource(resource, amount)
+    result = game.buy_and_build("p1", "Лесоповал")
+    assert result["success"] and result["shortfall"] == {} and player.money == 640
+    
+    # Денег не хватает - не покупается ничего
+    before = (player.money_cents, player.resources.copy())
+    result = game.buy_and_build("p1", "Золотой рудник")
+    assert not result["success"] and result["message"].startswith("Недостаточно денег")
+    assert (player.money_cents, player.resources.copy()) == before
+    assert game.buy_and_build("p1", "Замок")["message"] == "Неизвестный объект"
+    assert game.buy_and_build("p1", {"name": "Лесоповал"})["message"] == "Неизвестный объект"
+    print("✓ Докупка недостающих ресурсов и постройка")
+
+def test_market_vectorized():
+    """Расчет одной игры по словарям совпадает с векторным ядром, ядро принимает пакет игр"""
+    import numpy as np
+    random.seed(3)
+    cases = []
+    for num_players in (5, 10, 30, 1000):
+        market = market_dynamics.MarketDynamics(num_players)
+        bought = {r: random.randint(0, num_players) for r in RESOURCE_NAMES}
+        sold = {r: random.randint(0, num_players) for r in RESOURCE_NAMES}
+        events = {"зерно": 1.8, "скот": 0.6}
+        prices = {r: random.randint(500, 20000) for r in RESOURCE_NAMES}
+        counts = {name: random.randint(0, num_players) for name in BUILDING_COSTS}
+        building_events = {"Ферма": 0.5, "Трактир": 1.5}
+        cases.append((market, prices, bought, sold, events, counts, building_events))
+    
+    # Одна игра - расчет по словарям, сверяем с векторным ядром
+    vectorized = []
+    for market, prices, bought, sold, events, counts, building_events in cases:
+        dict_prices = market.calculate_resource_prices_cents(prices, bought, sold, events)
+        dict_incomes = market.calculate_building_incomes(counts, {}, building_events)
+        vector_prices = market_dynamics.step_prices(
+            market_dynamics.resource_vector(prices), market_dynamics.resource_vector(bought),
+            market_dynamics.resource_vector(sold), market_dynamics.resource_vector(events, 1.0),
+            market.num_players
+        ).tolist()
+        assert [dict_prices[r] for r in RESOURCE_NAMES] == vector_prices
+        coins, amounts = market.calculate_building_income_arrays(counts, building_events)
+        coins, amounts = coins.tolist(), amounts.tolist()
+        for index, name in enumerate(BUILDING_NAMES):
+            assert isclose(dict_incomes[name]["монеты"], coins[index] / CENTS, abs_tol=0.01)
+            for resource, amount in dict_incomes[name]["ресурсы"].items():
+                assert isclose(amount, amounts[index][RESOURCE_INDEX[resource]], abs_tol=0.01)
+        vectorized.append((dict_prices, dict_incomes))
+    
+    # Пакет игр: один вызов на все игры (у каждой свое число игроков)
+    num_players = np.array([[market.num_players] for market, *_ in cases])
+    batch = market_dynamics.step_prices(
+        np.array([market_dynamics.resource_vector(case[1]) for case in cases]),
+        np.array([market_dynamics.resource_vector(case[2]) for case in cases]),
+        np.array([market_dynamics.resource_vector(case[3]) for case in cases]),
+        np.array([market_dynamics.resource_vector(case[4], 1.0) for case in cases]),
+        num_players
+    )
+    assert batch.shape == (len(cases), len(RESOURCE_NAMES)) and batch.dtype == np.int64
+    for row, (prices, _) in zip(batch.tolist(), vectorized):
+        assert row == [prices[r] for r in RESOURCE_NAMES]
+    coins, amounts = market_dynamics.building_incomes(
+        np.array([market_dynamics.building_vector(case[5]) for case in cases]), 1.0, num_players
+    )
+    assert coins.shape == (len(cases), len(BUILDING_COSTS)) and amounts.shape[2] == len(RESOURCE_NAMES)
+    print("✓ Векторное ядро рынка совпадает с расчетом по словарям, пакет игр")
+
+def test_saturation_table():
+    """Модификаторы насыщения берутся из таблицы 0..num_players, пересчитываемой при смене параметров"""
+    import numpy as np
+    market = market_dynamics.MarketDynamics(num_players=30)
+    table = market.get_saturation_table()
+    assert len(table) == 31 and market.get_saturation_table() is table
+    for count in range(31):
+        assert isclose(table[count], market.evaluate_saturation_modifier(count))
+    
+    # Количество больше числа игроков - по формуле, в векторе тоже
+    counts = np.array([0, 5, 30, 45])
+    modifiers = market.lookup_saturation(counts)
+    assert all(isclose(m, market.evaluate_saturation_modifier(int(c))) for m, c in zip(modifiers, counts))
+    assert isclose(market.calculate_saturation_modifier(45), market.evaluate_saturation_modifier(45))
+    
+    # Смена числа игроков или кривой - новая таблица
+    market.num_players = 40
+    assert len(market.get_saturation_table()) == 41
+    default = market.config
+    market.config = MarketConfig.from_dict({"saturation_curve": "linear"})
+    linear = market.get_saturation_table()
+    assert isclose(linear[4], market.evaluate_saturation_modifier(4))
+    assert isclose(linear[4], 1.0 - 0.5 * 0.5)
+    market.config = default
+    assert market.get_saturation_table() is not linear
+    print("✓ Таблица насыщения")
+
+def test_market_config():
+    """Параметры рынка проверяются при создании, у каждой игры свои, замена - на границе раунда"""
+    config = MarketConfig.from_dict({"max_price_change_percent": 20, "min_price_modifier": 0.5})
+    assert isclose(config.min_change, 0.8) and isclose(config.max_change, 1.2)
+    assert isclose(config.saturation_scale, 0.5)
+    assert config.min_price_cents["дерево"] == 15 * 100 * 0.5
+    assert MarketConfig.from_dict() == market_dynamics.DEFAULT_MARKET_CONFIG
+    
+    # Производные константы тоже неизменяемые
+    for target, key in ((config.min_price_cents, "дерево"), (config.max_price_vector, 0)):
+        try:
+            target[key] = 0
+        except (TypeError, ValueError):
+            pass
+        else:
+            assert False, "производные константы должны быть только для чтения"
+    
+    for values in ({"saturation_curve": "cubic"}, {"max_price_change_percent": 100},
+                   {"min_price_modifier": 4.0}, {"saturation_max_penalty": "0.5"}, {"unknown": 1},
+                   {"max_price_modifier": float("inf")}, {"max_income_modifier": float("nan")}):
+        try:
+            MarketConfig.from_dict(values)
+        except ValueError as e:
+            print(f"  {values}: {e}")
+        else:
+            assert False, values
+    
+    # Две игры с разными параметрами: цены меняются в своих границах
+    games = [Game(num_players=2), Game(num_players=2, market_config=config)]
+    for game in games:
+        game.add_player("p1", "Игрок 1")
+        game.add_player("p2", "Игрок 2")
+    assert games[0].market_config is market_dynamics.DEFAULT_MARKET_CONFIG
+    prices = [
+        game.market.calculate_resource_prices_cents(game.prices_cents, {"дерево": 2}, {}, {"дерево": 2.0})["дерево"]
+        for game in games
+    ]
+    print(f"  Цена дерева при полном спросе: {prices}")
+    assert prices == [2250, 1800]
+    
+    # Новые параметры ждут обработки раунда
+    game = games[0]
+    game.set_market_config(config)
+    assert game.market_config is not config and game.pending_market_config is config
+    game.process_round()
+    assert game.market_config is config and game.pending_market_config is None
+    print("✓ Параметры рынка")
+
+def test_saturation_curves():
+    """Скалярная и векторная версии каждой кривой совпадают, новые кривые подключаются регистрацией"""
+    import numpy as np
+    import saturation_curves
+    counts = np.arange(0, 61)
+    for name in saturation_curves.SATURATION_CURVES:
+        market = market_dynamics.MarketDynamics(30, MarketConfig.from_dict({"saturation_curve": name}))
+        vector = market_dynamics.saturation_modifiers(counts, 30, market.config)
+        scalar = [market.evaluate_saturation_modifier(int(count)) for count in counts]
+        print(f"  {name}: {[round(float(m), 3) for m in vector[[3, 6, 12, 30]]]}")
+        assert all(isclose(v, s) for v, s in zip(vector, scalar)), name
+        assert vector[0] == 1.0 and vector.min() >= market.config.min_income_modifier
+    
+    # Логистическая: мягче линейной до базового насыщения
+    logistic = MarketConfig.from_dict({"saturation_curve": "logistic"})
+    linear = MarketConfig.from_dict({"saturation_curve": "linear"})
+    assert market_dynamics.saturation_modifiers(3, 30, logistic) > market_dynamics.saturation_modifiers(3, 30, linear)
+    
+    # Своя кривая (без векторной версии): шаг на базовом насыщении
+    saturation_curves.register_saturation_curve("step", lambda ratio, scale: scale if ratio >= 1.0 else 0.0)
+    try:
+        market = market_dynamics.MarketDynamics(30, MarketConfig.from_dict({"saturation_curve": "step"}))
+        assert market.calculate_saturation_modifier(5) == 1.0 and market.calculate_saturation_modifier(6) == 0.5
+        assert list(market.lookup_saturation(np.array([5, 6, 45]))) == [1.0, 0.5, 0.5]
+    finally:
+        del saturation_curves.SATURATION_CURVES["step"]
+    print("✓ Кривые насыщения")
+
+def test_event_pair_matrices():
+    """Модификаторы пар событий собраны заранее: строка матрицы совпадает с объединением событий"""
+    import numpy as np
+    import game_events
+    from cost_table import BUILDING_NAMES
+    event_system = game_events.EventSystem()
+    for k in range(len(game_events.EVENT_PAIRS)):
+        positive, negative = game_events.event_pair_events(k)
+        assert game_events.event_pair_index(positive, negative) == k
+        resource_mods, building_mods = game_events.merge_event_modifiers(positive, negative)
+        assert event_system.combine_event_modifiers(positive, negative) == (resource_mods, building_mods)
+        row = game_events.EVENT_RESOURCE_MODIFIERS[k]
+        assert all(row[i] == resource_mods.get(name, 1.0) for i, name in enumerate(RESOURCE_NAMES))
+        row = game_events.EVENT_BUILDING_MODIFIERS[k]
+        assert all(row[i] == building_mods.get(name, 1.0) for i, name in enumerate(BUILDING_NAMES))
+    
+    # Последовательность пар сценария - выборка строк
+    sequence = np.array([3, 0, 3, 28])
+    rows = game_events.EVENT_RESOURCE_MODIFIERS[sequence]
+    assert rows.shape == (4, len(RESOURCE_NAMES)) and (rows[0] == rows[2]).all()
+    
+    # Сценарий по матрицам совпадает с расчетом по словарям
+    import scenario_analysis
+    pairs = [game_events.event_pair_events(k) for k in sequence]
+    # Пара не из EVENT_PAIRS объединяется по словарям
+    unknown = (game_events.POSITIVE_EVENTS[0], game_events.NEGATIVE_EVENTS[5])
+    assert (unknown[0]["name"], unknown[1]["name"]) not in game_events.EVENT_PAIR_INDEX
+    assert event_system.combine_event_modifiers(*unknown) == game_events.merge_event_modifiers(*unknown)
+    pairs.append(unknown)
+    result = scenario_analysis.simulate_game_scenario(pairs, 5)
+    numpy_module, scenario_analysis.np = scenario_analysis.np, None
+    try:
+        expected = scenario_analysis.simulate_game_scenario(pairs, 5)
+    finally:
+        scenario_analysis.np = numpy_module
+    for resource, change in expected["price_changes"].items():
+        assert isclose(result["price_changes"][resource]["end"], change["end"])
+    for name, data in expected["building_results"].items():
+        assert isclose(result["building_results"][name]["total_income_value"], data["total_income_value"])
+    print("✓ Матрицы модификаторов пар событий")
+
 if __name__ == "__main__":
     test_full_game()
-
+    test_state_version()
+    test_building_registry()
+    test_building_aggregates()
+    test_leaderboard_growth()
+    test_transition_schedule()
+    test_array_state()
+    test_cost_table()
+    test_player_ranking()
+    test_player_value_cache()
+    test_fixed_point_money()
+    test_activity_bitsets()
+    test_apply_actions()
+    test_buy_and_build()
+    test_market_vectorized()
+    test_saturation_table()
+    test_market_config()
+    test_saturation_curves()
+    test_event_pair_matrices()
@@ -0,0 +1,411 @@
+"""
+Тест API веб-сервера и WebSocket рассылки
+"""
+import asyncio
+import os
+import json
+from urllib.parse import quote
+from fastapi.testclient import TestClient
+import web_server
+from web_server import app, set_game, ResponseCache
+from game_engine import Game
+
+
+def create_game(num_players: int = 2) -> Game:
+    """Небольшая игра с двумя игроками"""
+    game = Game(num_players=num_players)
+    game.add_player("p1", "Игрок 1")
+    game.add_player("p2", "Игрок 2")
+    game.buy_resource("p1", "железо", 5)
+    game.buy_resource("p1", "рабы", 3)
+    game.start_building("p1", "Лесоповал")
+    return game
+
+
+def receive_message(ws) -> dict:
+    """Следующее сообщение ленты (heartbeat пропускаются)"""
+    message = json.loads(ws.receive_bytes().decode("utf-8"))
+    while message.get("type") == "heartbeat":
+        message = json.loads(ws.receive_bytes().decode("utf-8"))
+    return message
+
+
+def test_websocket_shared_broadcast():
+    """Все клиенты получают одни и те же байты от общего цикла рассылки"""
+    print("=== ТЕСТ WEBSOCKET РАССЫЛКИ ===\n")
+    game = create_game()
+    set_game(game)
+    web_server.BROADCAST_INTERVAL = 0.01
+    web_server.HEARTBEAT_INTERVAL = 0.05
+
+    with TestClient(app) as client, \
+            client.websocket_connect("/ws") as ws1, \
+            client.websocket_connect("/ws") as ws2:
+        first = json.loads(ws1.receive_bytes().decode("utf-8"))
+        second = json.loads(ws2.receive_bytes().decode("utf-8"))
+        assert first["type"] == second["type"] == "snapshot"
+        assert first["seq"] == second["seq"]
+        state = first["state"]
+        print(f"Раунд: {state['current_round']}, игроков: {state['num_players']}")
+        assert state["num_players"] == 2
+
+        # Пока состояние не меняется, приходит только heartbeat
+        tick = json.loads(ws1.receive_bytes().decode("utf-8"))
+        assert tick == {"type": "heartbeat"}
+
+        # После действия игрока рассылается delta со следующим номером
+        game.buy_resource("p2", "дерево", 1)
+        update = receive_message(ws2)
+        print(f"Delta: {update}")
+        assert update["type"] == "delta"
+        assert update["seq"] == first["seq"] + 1
+        assert update["state_version"] == game.state_version
+        assert [row["player_id"] for row in update["leaderboard"]["changed"]] == ["p2"]
+        assert "prices" not in update
+        assert receive_message(ws1) == update
+
+    print("\n✓ Тест завершен успешно!")
+
+
+def test_websocket_resume():
+    """Переподключившийся клиент получает только пропущенные delta"""
+    print("=== ТЕСТ ПЕРЕПОДКЛЮЧЕНИЯ ===\n")
+    game = create_game()
+    set_game(game)
+    web_server.BROADCAST_INTERVAL = 0.01
+
+    with TestClient(app) as client:
+        with client.websocket_connect("/ws") as ws:
+            snapshot = receive_message(ws)
+        epoch, seq = snapshot["epoch"], snapshot["seq"]
+
+        # Пока клиента нет, происходят два изменения
+        game.buy_resource("p2", "дерево", 1)
+        with client.websocket_connect("/ws") as ws:
+            receive_message(ws)
+        game.buy_resource("p2", "камень", 1)
+
+        with client.websocket_connect(f"/ws?epoch={epoch}&since={seq}") as ws:
+            missed = [receive_message(ws), receive_message(ws)]
+        print(f"Пропущенные сообщения: {[m['seq'] for m in missed]}")
+        assert [m["type"] for m in missed] == ["delta", "delta"]
+        assert [m["seq"] for m in missed] == [seq + 1, seq + 2]
+
+        # Слишком старый номер - полное состояние
+        web_server.feed_deltas.popleft()
+        with client.websocket_connect(f"/ws?epoch={epoch}&since={seq}") as ws:
+            assert receive_message(ws)["type"] == "snapshot"
+
+        # Чужая эпоха (например, после перезапуска сервера) - полное состояние
+        with client.websocket_connect(f"/ws?epoch=other&since={seq}") as ws:
+            assert receive_message(ws)["type"] == "snapshot"
+
+    print("\n✓ Тест завершен успешно!")
+
+
+class RacingWebSocket:
+    """Сокет, во время отправки которого общий цикл успевает разослать delta"""
+
+    def __init__(self, game: Game):
+        self.game = game
+        self.query_params = {}
+        self.received = []
+
+    async def accept(self):
+        pass
+
+    async def send_bytes(self, payload: bytes):
+        self.received.append(json.loads(payload.decode("utf-8")))
+        if len(self.received) == 1:
+            self.game.buy_resource("p2", "дерево", 1)
+            await web_server.broadcast_update()
+
+    async def receive_text(self):
+        raise web_server.WebSocketDisconnect()
+
+
+def test_websocket_no_gap_on_connect():
+    """Delta, разосланная пока клиенту отправляется snapshot, досылается ему"""
+    print("=== ТЕСТ ПОДКЛЮЧЕНИЯ ВО ВРЕМЯ РАССЫЛКИ ===\n")
+    game = create_game()
+    set_game(game)
+    ws = RacingWebSocket(game)
+    asyncio.run(web_server.websocket_endpoint(ws))
+    print(f"Получено: {[(m['type'], m['seq']) for m in ws.received]}")
+    assert [m["type"] for m in ws.received] == ["snapshot", "delta"]
+    assert ws.received[1]["seq"] == ws.received[0]["seq"] + 1
+    print("\n✓ Тест завершен успешно!")
+
+
+class StuckWebSocket:
+    """Сокет, отправка в который никогда не завершается"""
+
+    def __init__(self):
+        self.closed_with = None
+
+    async def send_bytes(self, payload: bytes):
+        await asyncio.Event().wait()
+
+    async def close(self, code: int = 1000):
+        self.closed_with = code
+
+
+class CountingWebSocket:
+    def __init__(self):
+        self.received = 0
+
+    async def send_bytes(self, payload: bytes):
+        self.received += 1
+
+
+def test_slow_client_isolated():
+    """Зависший клиент отключается, не задерживая рассылку остальным"""
+    print("=== ТЕСТ МЕДЛЕННОГО КЛИЕНТА ===\n")
+
+    async def scenario():
+        stuck, fast = StuckWebSocket(), CountingWebSocket()
+        writers = []
+        for socket in (stuck, fast):
+            queue = asyncio.Queue(maxsize=web_server.CLIENT_QUEUE_SIZE)
+            web_server.active_connections[socket] = queue
+            writers.append(asyncio.create_task(web_server.client_writer(socket, queue)))
+        try:
+            for _ in range(web_server.CLIENT_QUEUE_SIZE + 2):
+                web_server.send_payload(b"{}")
+                await asyncio.sleep(0)
+            await asyncio.sleep(0)
+            return stuck, fast, list(web_server.active_connections)
+        finally:
+            for writer in writers:
+                writer.cancel()
+            web_server.active_connections.clear()
+
+    stuck, fast, connected = asyncio.run(scenario())
+    print(f"Быстрый клиент получил: {fast.received}, код закрытия зависшего: {stuck.closed_with}")
+    assert connected == [fast] and stuck.closed_with == 1013
+    assert fast.received == web_server.CLIENT_QUEUE_SIZE + 2
+    print("\n✓ Тест завершен успешно!")
+
+
+def test_response_cache():
+    """Ответы кэшируются по версии состояния и строятся один раз на версию"""
+    print("=== ТЕСТ КЭША ОТВЕТОВ ===\n")
+    game = create_game()
+    set_game(game)
+    client = TestClient(app)
+
+    first = client.get("/api/leaderboard")
+    assert first.headers["content-type"] == "application/json"
+    assert [row["player_id"] for row in first.json()["leaderboard"]] == ["p1", "p2"]
+    state = client.get("/api/game_state").json()
+    assert state["leaderboard"] == first.json()
+    assert len(client.get("/api/prices").json()["prices"]) == 9
+    assert client.get("/api/buildings").json()["buildings"][0]["name"] == "Лесоповал"
+
+    # Без изменений ответ берется из кэша без пересчета
+    cached = web_server.response_cache.entries["leaderboard"]
+    client.get("/api/leaderboard")
+    assert web_server.response_cache.entries["leaderboard"] is cached
+
+    # Изменение состояния делает запись устаревшей
+    game.buy_resource("p2", "золото", 2)
+    second = client.get("/api/leaderboard").json()
+    assert second["leaderboard"][1]["resources_value"] == 200
+    print("✓ Кэш обновляется только при изменении версии")
+
+    # Одновременные запросы одной версии - одно вычисление
+    cache = ResponseCache()
+    builds = []
+
+    async def builder():
+        builds.append(1)
+        await asyncio.sleep(0.01)
+        return {"value": len(builds)}
+
+    async def storm():
+        return await asyncio.gather(*(cache.get("storm", builder) for _ in range(50)))
+
+    results = asyncio.run(storm())
+    print(f"Запросов: {len(results)}, вычислений: {len(builds)}")
+    assert len(builds) == 1
+    assert all(payload == results[0][1] for _, payload in results)
+
+    print("\n✓ Тест завершен успешно!")
+
+
+def test_etag():
+    """GET-эндпоинты отвечают 304, пока версия состояния не изменилась"""
+    print("=== ТЕСТ ETAG ===\n")
+    game = create_game(num_players=3)
+    set_game(game)
+    client = TestClient(app)
+    auth = {"X-Telegram-Init-Data": "user=" + quote('{"id": 7, "first_name": "Тест"}')}
+    game.add_player("tg_7", "Тест")
+
+    urls = [
+        "/api/leaderboard", "/api/prices", "/api/buildings", "/api/game_state",
+        "/api/resource/дерево", "/api/building/Лесоповал",
+        "/api/miniapp/prices", "/api/miniapp/round-info",
+        "/api/miniapp/player/state", "/api/miniapp/buildings"
+    ]
+    etags = {}
+    for url in urls:
+        response = client.get(url, headers=auth)
+        assert response.status_code == 200, url
+        etags[url] = response.headers["etag"]
+        again = client.get(url, headers={**auth, "If-None-Match": etags[url]})
+        assert again.status_code == 304, url
+        assert again.content == b""
+
+    # Действие другого игрока не меняет цены и состояние этого игрока
+    game.buy_resource("p2", "дерево", 1)
+    for url in ["/api/miniapp/prices", "/api/miniapp/player/state", "/api/miniapp/buildings"]:
+        assert client.get(url, headers={**auth, "If-None-Match": etags[url]}).status_code == 304, url
+    assert client.get("/api/leaderboard", headers={"If-None-Match": etags["/api/leaderboard"]}).status_code == 200
+
+    # Действие самого игрока меняет его состояние
+    game.buy_resource("tg_7", "дерево", 1)
+    url = "/api/miniapp/player/state"
+    assert client.get(url, headers={**auth, "If-None-Match": etags[url]}).status_code == 200
+
+    # Новый раунд меняет цены
+    game.process_round()
+    url = "/api/miniapp/prices"
+    assert client.get(url, headers={"If-None-Match": etags[url]}).status_code == 200
+
+    print("\n✓ Тест завершен успешно!")
+
+
+def test_leaderboard_page_and_rank():
+    """Страница турнирной таблицы и место игрока в мини-приложении"""
+    print("=== ТЕСТ СТРАНИЦЫ ТАБЛИЦЫ И МЕСТА ИГРОКА ===\n")
+    game = create_game(num_players=3)
+    set_game(game)
+    client = TestClient(app)
+    auth = {"X-Telegram-Init-Data": "user=" + quote('{"id": 7, "first_name": "Тест"}')}
+    game.add_player("tg_7", "Тест")
+    game.buy_resource("tg_7", "золото", 5)
+    
+    full = client.get("/api/leaderboard").json()["leaderboard"]
+    page = client.get("/api/leaderboard?top=2&offset=1").json()
+    print(f"Страница: {[row['player_id'] for row in page['leaderboard']]}")
+    assert page["leaderboard"] == full[1:3]
+    assert page["total_players"] == 3 and page["offset"] == 1
+    assert client.get("/api/leaderboard?top=0").status_code == 400
+    
+    rank = client.get("/api/miniapp/player/rank", headers=auth).json()
+    print(f"Место: {rank}")
+    assert rank["rank"] == [row["player_id"] for row in full].index("tg_7") + 1
+    assert rank["total_players"] == 3
+    
+    assert client.get("/api/leaderboard?top=1").json()["leaderboard"] == full[:1]
+    
+    print("\n✓ Тест завершен успешно!")
+
+
+def test_batch_actions():
+    """Несколько действий игрока одним запросом"""
+    print("=== ТЕСТ ПАКЕТА ДЕЙСТВИЙ ===\n")
+    game = create_game(num_players=4)
+    set_game(game)
+    client = TestClient(app)
+    auth = {"X-Telegram-Init-Data": "user=" + quote('{"id": 8, "first_name": "Тест"}')}
+    game.add_player("tg_8", "Тест")
+    
+    actions = [
+        {"type": "buy", "resource": "железо", "amount": 5},
+        {"type": "buy", "resource": "рабы", "amount": 3},
+        {"type": "build", "building_name": "Лесоповал"},
+    ]
+    result = client.post("/api/miniapp/player/batch", json={"actions": actions}, headers=auth).json()
+    print(f"Результат: {result['message']}, деньги: {result['player']['money']}")
+    assert result["success"]
+    assert [r["cost"] for r in result["results"][:2]] == [200, 240]
+    assert result["player"]["money"] == 560
+    assert [b["name"] for b in result["player"]["buildings"]] == ["Лесоповал"]
+    
+    actions[2] = {"type": "build", "building_name": "Золотой рудник"}
+    failed = client.post("/api/miniapp/player/batch", json={"actions": actions}, headers=auth).json()
+    assert not failed["success"] and failed["failed_index"] == 2
+    assert failed["player"]["money"] == 560
+    
+    assert client.post("/api/miniapp/player/batch", json={"actions": {}}, headers=auth).status_code == 400
+    
+    # Выручка от продажи в пакете доступна следующим покупкам
+    seller_auth = {"X-Telegram-Init-Data": "user=" + quote('{"id": 9, "first_name": "Продавец"}')}
+    game.add_player("tg_9", "Продавец")
+    game.get_player("tg_9").add_resource("золото", 5)
+    sell_and_spend = [
+        {"type": "sell", "resource": "золото", "amount": 5},
+        {"type": "buy", "resource": "дерево", "amount": 1000 // 15 + 10},
+    ]
+    result = client.post("/api/miniapp/player/batch", json={"actions": sell_and_spend}, headers=seller_auth).json()
+    print(f"Продажа и покупка: {result['message']}")
+    assert result["success"] and result["player"]["resources"].get("дерево") == 1000 // 15 + 10
+    unhashable = client.post("/api/miniapp/player/batch", json={"actions": [{"type": "buy", "resource": ["железо"]}]},
+                             headers=auth)
+    assert unhashable.status_code == 200 and unhashable.json()["message"] == "Действие 1: Неизвестный ресурс"
+    unhashable = client.post("/api/miniapp/player/buy-and-build", json={"building_name": ["Лесоповал"]}, headers=auth)
+    assert unhashable.status_code == 200 and not unhashable.json()["success"]
+    
+    # Постройка в одно касание: недостающие ресурсы докупаются
+    buildings = {b["name"]: b for b in client.get("/api/miniapp/buildings", headers=auth).json()["buildings"]}
+    assert buildings["Лесоповал"]["shortfall_cost"] == 440 and buildings["Лесоповал"]["can_buy_and_build"]
+    assert not buildings["Золотой рудник"]["can_buy_and_build"]
+    game.get_player("tg_8").add_resource("железо", 5)
+    result = client.post("/api/miniapp/player/buy-and-build", json={"building_name": "Лесоповал"}, headers=auth).json()
+    assert result["success"] and result["cost"] == 240 and result["shortfall"] == {"рабы": 3}
+    assert client.post("/api/miniapp/player/batch", json={"actions": []}).status_code == 401
+    
+    print("\n✓ Тест завершен успешно!")
+
+
+
+def test_admin_market_config():
+    """Замена параметров рынка через админский эндпоинт"""
+    print("=== ТЕСТ ПАРАМЕТРОВ РЫНКА ===\n")
+    game = create_game()
+    set_game(game)
+    client = TestClient(app)
+    os.environ["ADMIN_TOKEN"] = "secret"
+    try:
+        url = "/api/admin/market-config"
+        assert client.get(url).status_code == 403
+        assert client.get(url, headers={"X-Admin-Token": "wrong"}).status_code == 403
+        
+        admin = {"X-Admin-Token": "secret"}
+        state = client.get(url, headers=admin).json()
+        assert state["config"]["max_price_change_percent"] == 50 and state["pending"] is None
+        
+        bad = client.post(url, json={"saturation_curve": "cubic"}, headers=admin)
+        print(f"Ошибка: {bad.json()['detail']}")
+        assert bad.status_code == 400
+        for curve in ([], {}):
+            assert client.post(url, json={"saturation_curve": curve}, headers=admin).status_code == 400
+        infinite = client.post(url, content='{"max_price_modifier": Infinity}',
+                               headers={**admin, "Content-Type": "application/json"})
+        assert infinite.status_code == 400
+        
+        state = client.post(url, json={"max_price_change_percent": 20}, headers=admin).json()
+        assert state["pending"]["max_price_change_percent"] == 20
+        assert state["config"]["max_price_change_percent"] == 50
+        game.process_round()
+        state = client.get(url, headers=admin).json()
+        assert state["config"]["max_price_change_percent"] == 20 and state["pending"] is None
+        assert game.market_config.max_change == 1.2
+    finally:
+        del os.environ["ADMIN_TOKEN"]
+    
+    print("\n✓ Тест завершен успешно!")
+
+
+if __name__ == "__main__":
+    test_websocket_shared_broadcast()
+    test_websocket_resume()
+    test_websocket_no_gap_on_connect()
+    test_slow_client_isolated()
+    test_response_cache()
+    test_etag()
+    test_leaderboard_page_and_rank()
+    test_batch_actions()
+    test_admin_market_config()
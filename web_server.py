@@ -3,27 +3,56 @@
 FastAPI + WebSocket для обновлений в реальном времени
 """
 from fastapi import FastAPI, WebSocket, WebSocketDisconnect, Request, HTTPException, Header
-from fastapi.responses import HTMLResponse
+from fastapi.responses import HTMLResponse, Response
 from fastapi.staticfiles import StaticFiles
-from typing import Dict, List, Optional
+from typing import Awaitable, Callable, Dict, List, Optional
+import os
 import json
 import asyncio
+import secrets
+from collections import deque
 import hmac
 import hashlib
 import base64
 from urllib.parse import unquote, parse_qs
-from game_engine import Game, BuildingStatus
+from game_engine import Game, Player, BuildingStatus
+from market_config import MarketConfig
+from money import to_coins
 from game_config import RESOURCE_PRICES, BUILDING_COSTS, BUILDING_INCOME
 
 app = FastAPI(title="Королевская биржа - Веб-интерфейс")
 
 # Глобальное состояние игры (будет инициализировано)
 game_instance: Game = None
-previous_leaderboard: List[Dict] = []
 initial_prices: Dict[str, float] = RESOURCE_PRICES.copy()
 
-# WebSocket подключения
-active_connections: List[WebSocket] = []
+# Токен текущей игры для ETag (меняется при смене игры и перезапуске сервера)
+game_token: str = secrets.token_hex(4)
+
+# WebSocket подключения: {сокет: очередь исходящих сообщений}
+# Рассылка только кладет готовые байты в очереди, отправкой занимается
+# постоянная задача-писатель каждого сокета
+active_connections: Dict[WebSocket, asyncio.Queue] = {}
+CLIENT_QUEUE_SIZE = 64  # Сколько сообщений может отстать клиент, прежде чем его отключат
+broadcaster_task: Optional[asyncio.Task] = None
+last_broadcast_key: Optional[tuple] = None  # (игра, версия состояния) последней рассылки
+BROADCAST_INTERVAL = 1.0  # Период проверки изменений (секунды)
+HEARTBEAT_INTERVAL = 15.0  # Период heartbeat, если состояние не меняется (секунды)
+HEARTBEAT_PAYLOAD = b'{"type": "heartbeat"}'
+
+# Лента обновлений: snapshot + последовательно пронумерованные delta
+DELTA_BUFFER_SIZE = 256  # Сколько последних delta хранить для переподключений
+
+# Максимальный размер страницы турнирной таблицы (/api/leaderboard?top=K)
+MAX_LEADERBOARD_PAGE = 1000
+
+# Максимальное количество действий в одном пакете (/api/miniapp/player/batch)
+MAX_BATCH_ACTIONS = 20
+feed_epoch: Optional[str] = None  # Меняется при смене игры
+feed_seq = 0
+feed_state: Optional[Dict] = None  # Последнее разосланное полное состояние
+feed_snapshot: Optional[tuple] = None  # ((эпоха, seq), сериализованный snapshot)
+feed_deltas: deque = deque(maxlen=DELTA_BUFFER_SIZE)  # [(seq, сериализованная delta)]
 
 @app.on_event("startup")
 async def startup():
@@ -32,66 +61,192 @@ async def startup():
     # Игра будет создана отдельно или передана сюда
     pass
 
+def serialize_message(message: Dict) -> bytes:
+    """Сериализовать сообщение один раз для рассылки всем клиентам"""
+    return json.dumps(message, ensure_ascii=False).encode("utf-8")
+
+def current_state_key() -> Optional[tuple]:
+    """Ключ текущего состояния: меняется при смене игры или ее версии"""
+    if not game_instance:
+        return None
+    return (id(game_instance), game_instance.state_version)
+
+
+class ResponseCache:
+    """
+    Кэш ответов API, привязанный к версии состояния игры
+    
+    Для каждого ответа хранится версия, данные и готовые JSON-байты.
+    Запись устаревает только при изменении версии игры. Одновременные
+    запросы одной и той же версии ждут одного общего вычисления
+    """
+    
+    def __init__(self):
+        self.entries: Dict[str, tuple] = {}  # {имя: (ключ, данные, байты)}
+        self.pending: Dict[str, tuple] = {}  # {имя: (ключ, future)}
+    
+    async def get(self, name: str, builder: Callable[[], Awaitable[Dict]]) -> tuple:
+        """
+        Получить (данные, JSON-байты) ответа для текущей версии игры
+        
+        Args:
+            name: Имя ответа
+            builder: Корутина, строящая данные ответа
+        """
+        key = current_state_key()
+        if key is None:
+            # Без игры кэшировать нечего
+            data = await builder()
+            return data, serialize_message(data)
+        
+        entry = self.entries.get(name)
+        if entry is not None and entry[0] == key:
+            return entry[1], entry[2]
+        
+        pending = self.pending.get(name)
+        if pending is not None and pending[0] == key:
+            return await asyncio.shield(pending[1])
+        
+        future = asyncio.get_running_loop().create_future()
+        self.pending[name] = (key, future)
+        try:
+            data = await builder()
+            result = (data, serialize_message(data))
+            self.entries[name] = (key,) + result
+            future.set_result(result)
+            return result
+        except Exception as e:
+            future.set_exception(e)
+            future.exception()  # Ошибку получит вызывающий, не логируем повторно
+            raise
+        finally:
+            if self.pending.get(name, (None, None))[1] is future:
+                del self.pending[name]
+    
+    async def get_data(self, name: str, builder: Callable[[], Awaitable[Dict]]) -> Dict:
+        """Получить только данные ответа (не изменять!)"""
+        data, _ = await self.get(name, builder)
+        return data
+    
+    def clear(self):
+        """Сбросить кэш"""
+        self.entries.clear()
+
+
+response_cache = ResponseCache()
+
+# ========== ETAG ==========
+
+def make_etag(*parts) -> str:
+    """Сильный ETag из токена игры и частей версии"""
+    return '"' + "-".join(str(part) for part in (game_token,) + parts) + '"'
+
+def game_etag() -> Optional[str]:
+    """ETag по версии состояния игры (меняется при любом изменении)"""
+    if not game_instance:
+        return None
+    return make_etag("v", game_instance.state_version)
+
+def round_etag() -> Optional[str]:
+    """ETag по номеру раунда (для данных, которые меняются только между раундами)"""
+    if not game_instance:
+        return None
+    return make_etag("r", game_instance.current_round)
+
+def player_etag(player: Player) -> str:
+    """ETag по версии игрока и номеру раунда (доходы и статусы объектов меняются в раунде)"""
+    return make_etag(player.id, game_instance.current_round, player.version)
+
+def file_etag(path: str) -> str:
+    """ETag статического файла по времени изменения и размеру"""
+    stat = os.stat(path)
+    return f'"{stat.st_mtime_ns:x}-{stat.st_size:x}"'
+
+def etag_matches(request: Request, etag: Optional[str]) -> bool:
+    """Проверить заголовок If-None-Match"""
+    if etag is None:
+        return False
+    header = request.headers.get("if-none-match")
+    if not header:
+        return False
+    candidates = [candidate.strip() for candidate in header.split(",")]
+    return "*" in candidates or etag in candidates or f"W/{etag}" in candidates
+
+def set_etag(response: Response, etag: Optional[str]):
+    """Добавить ETag к ответу (клиент должен перепроверять его каждый раз)"""
+    if etag is not None:
+        response.headers["ETag"] = etag
+        response.headers["Cache-Control"] = "no-cache"
+
+def not_modified_response(etag: str) -> Response:
+    """Ответ 304 без тела"""
+    return Response(status_code=304, headers={"ETag": etag, "Cache-Control": "no-cache"})
+
+async def cached_json_response(
+    name: str,
+    builder: Callable[[], Awaitable[Dict]],
+    request: Request,
+    etag: Optional[str]
+) -> Response:
+    """
+    Ответ API из кэша версии состояния (JSON сериализуется один раз на версию)
+    Если у клиента уже есть эта версия - 304 без вычислений
+    """
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+    _, payload = await response_cache.get(name, builder)
+    response = Response(content=payload, media_type="application/json")
+    set_etag(response, etag)
+    return response
+
 def set_game(game: Game):
     """Установить игровой экземпляр"""
-    global game_instance
+    global game_instance, last_broadcast_key, game_token
     game_instance = game
+    # Новая игра: кэш, ETag и лента обновлений начинаются заново
+    response_cache.clear()
+    last_broadcast_key = None
+    game_token = secrets.token_hex(4)
+
+def template_response(request: Request, path: str) -> Response:
+    """HTML-страница с ETag по файлу"""
+    etag = file_etag(path)
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+    with open(path, "r", encoding="utf-8") as f:
+        response = HTMLResponse(f.read())
+    set_etag(response, etag)
+    return response
 
 @app.get("/", response_class=HTMLResponse)
-async def get_main_page():
+async def get_main_page(request: Request):
     """Главная страница"""
-    with open("templates/index.html", "r", encoding="utf-8") as f:
-        return f.read()
+    return template_response(request, "templates/index.html")
 
 @app.get("/miniapp", response_class=HTMLResponse)
-async def get_miniapp_page():
+async def get_miniapp_page(request: Request):
     """Страница Telegram Mini App"""
-    with open("templates/miniapp.html", "r", encoding="utf-8") as f:
-        return f.read()
+    return template_response(request, "templates/miniapp.html")
 
-@app.get("/api/leaderboard")
-async def get_leaderboard():
-    """Получить турнирную таблицу с приростом"""
+async def build_leaderboard() -> Dict:
+    """Построить турнирную таблицу с приростом"""
     if not game_instance:
         return {"error": "Игра не инициализирована"}
     
-    current_leaderboard = game_instance.get_leaderboard()
-    global previous_leaderboard
-    
-    # Добавляем прирост от предыдущего раунда
-    result = []
-    for player in current_leaderboard:
-        player_data = player.copy()
-        
-        # Ищем предыдущее значение
-        prev_player = next(
-            (p for p in previous_leaderboard if p["player_id"] == player["player_id"]),
-            None
-        )
-        
-        if prev_player:
-            prev_value = prev_player["total_value"]
-            if prev_value > 0:
-                growth = ((player["total_value"] - prev_value) / prev_value) * 100
-            else:
-                growth = 0
-        else:
-            growth = 0
-        
-        player_data["growth_percent"] = round(growth, 2)
-        # Округляем все значения до целых
-        player_data["money"] = int(round(player_data["money"]))
-        player_data["resources_value"] = int(round(player_data["resources_value"]))
-        player_data["buildings_value"] = int(round(player_data["buildings_value"]))
-        player_data["total_value"] = int(round(player_data["total_value"]))
-        result.append(player_data)
-    
-    previous_leaderboard = current_leaderboard.copy()
-    return {"leaderboard": result}
+    # Прирост считается движком по снимку капитализации предыдущего раунда,
+    # поэтому запрос ничего не изменяет
+    return {"leaderboard": [round_leaderboard_row(row) for row in game_instance.get_leaderboard()]}
 
-@app.get("/api/prices")
-async def get_prices():
-    """Получить текущие цены с изменениями"""
+def round_leaderboard_row(player_data: Dict) -> Dict:
+    """Округлить денежные значения строки турнирной таблицы до целых"""
+    player_data["money"] = int(round(player_data["money"]))
+    player_data["resources_value"] = int(round(player_data["resources_value"]))
+    player_data["buildings_value"] = int(round(player_data["buildings_value"]))
+    player_data["total_value"] = int(round(player_data["total_value"]))
+    return player_data
+
+async def build_prices() -> Dict:
+    """Построить таблицу текущих цен с изменениями"""
     if not game_instance:
         return {"error": "Игра не инициализирована"}
     
@@ -138,30 +293,20 @@ async def get_prices():
     
     return {"prices": result}
 
-@app.get("/api/buildings")
-async def get_buildings():
-    """Получить статистику по построенным объектам"""
+async def build_buildings() -> Dict:
+    """Построить статистику по построенным объектам"""
     if not game_instance:
         return {"error": "Игра не инициализирована"}
     
-    building_counts = {}
-    players_with_building = {}  # Сколько игроков имеют хотя бы один такой объект
-    
-    for player in game_instance.players:
-        player_buildings = set()  # Уникальные объекты игрока
-        for building in player.buildings:
-            if building.status.value != "for_sale":
-                building_counts[building.name] = building_counts.get(building.name, 0) + 1
-                player_buildings.add(building.name)
-        
-        # Подсчитываем игроков с каждым объектом
-        for building_name in player_buildings:
-            players_with_building[building_name] = players_with_building.get(building_name, 0) + 1
+    # Количества берем из агрегатов реестра объектов (без обхода игроков)
+    registry = game_instance.building_registry
+    building_counts = registry.owned_counts()
     
     result = []
     num_players = len(game_instance.players)
     for building_name, count in sorted(building_counts.items()):
-        players_count = players_with_building.get(building_name, 0)
+        # Сколько игроков имеют хотя бы один такой объект
+        players_count = len(registry.type_owners(building_name))
         players_percentage = round((players_count / num_players) * 100) if num_players > 0 else 0
         
         result.append({
@@ -173,11 +318,16 @@ async def get_buildings():
     return {"buildings": result}
 
 @app.get("/api/resource/{resource_name}")
-async def get_resource_details(resource_name: str):
+async def get_resource_details(resource_name: str, request: Request, response: Response):
     """Получить детальную информацию о ресурсе, включая историю цен и спрос/предложение"""
     if not game_instance:
         return {"error": "Игра не инициализирована"}
     
+    etag = game_etag()
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+    
     # Декодируем имя ресурса из URL (для кириллицы)
     resource_name = unquote(resource_name)
     
@@ -263,27 +413,27 @@ async def get_resource_details(resource_name: str):
     }
 
 @app.get("/api/building/{building_name}")
-async def get_building_details(building_name: str):
+async def get_building_details(building_name: str, request: Request, response: Response):
     """Получить детальную информацию об объекте, включая список владельцев"""
     if not game_instance:
         return {"error": "Игра не инициализирована"}
     
-    # Подсчитываем общее количество объектов
-    total_count = 0
+    etag = game_etag()
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+    
+    # Количество объектов и владельцев берем из агрегатов реестра
+    registry = game_instance.building_registry
+    type_owners = registry.type_owners(building_name)
+    total_count = registry.owned_counts().get(building_name, 0)
     owners = {}  # {player_id: {name: str, count: int}}
     
-    for player in game_instance.players:
-        player_building_count = 0
-        for building in player.buildings:
-            if building.name == building_name and building.status.value != "for_sale":
-                total_count += 1
-                player_building_count += 1
-        
-        if player_building_count > 0:
-            owners[player.id] = {
-                "name": player.name,
-                "count": player_building_count
-            }
+    for player_id, player_building_count in type_owners.items():
+        owners[player_id] = {
+            "name": game_instance.get_player(player_id).name,
+            "count": player_building_count
+        }
     
     # Подсчитываем процент игроков
     num_players = len(game_instance.players)
@@ -300,17 +450,17 @@ async def get_building_details(building_name: str):
         "owners": owners_list
     }
 
-@app.get("/api/game_state")
-async def get_game_state():
-    """Получить полное состояние игры"""
+async def build_game_state() -> Dict:
+    """Построить полное состояние игры из закэшированных частей"""
     if not game_instance:
         return {"error": "Игра не инициализирована"}
     
-    leaderboard_data = await get_leaderboard()
-    prices_data = await get_prices()
-    buildings_data = await get_buildings()
+    leaderboard_data = await response_cache.get_data("leaderboard", build_leaderboard)
+    prices_data = await response_cache.get_data("prices", build_prices)
+    buildings_data = await response_cache.get_data("buildings", build_buildings)
     
     return {
+        "state_version": game_instance.state_version,
         "current_round": game_instance.current_round,
         "num_players": len(game_instance.players),
         "leaderboard": leaderboard_data,
@@ -318,38 +468,266 @@ async def get_game_state():
         "buildings": buildings_data
     }
 
+@app.get("/api/leaderboard")
+async def get_leaderboard(request: Request, response: Response, top: Optional[int] = None, offset: int = 0):
+    """
+    Получить турнирную таблицу с приростом
+    С параметром top - только места offset + 1 ... offset + top (из рейтинга, без полной сортировки)
+    """
+    if top is None:
+        return await cached_json_response("leaderboard", build_leaderboard, request, game_etag())
+    
+    if not game_instance:
+        return {"error": "Игра не инициализирована"}
+    if top < 1 or top > MAX_LEADERBOARD_PAGE or offset < 0:
+        raise HTTPException(status_code=400, detail=f"top должен быть от 1 до {MAX_LEADERBOARD_PAGE}, offset - не меньше 0")
+    
+    etag = game_etag()
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+    
+    rows = game_instance.get_leaderboard_page(top, offset)
+    return {
+        "leaderboard": [round_leaderboard_row(row) for row in rows],
+        "offset": offset,
+        "total_players": len(game_instance.players)
+    }
+
+@app.get("/api/prices")
+async def get_prices(request: Request):
+    """Получить текущие цены с изменениями"""
+    return await cached_json_response("prices", build_prices, request, round_etag())
+
+@app.get("/api/buildings")
+async def get_buildings(request: Request):
+    """Получить статистику по построенным объектам"""
+    return await cached_json_response("buildings", build_buildings, request, game_etag())
+
+@app.get("/api/game_state")
+async def get_game_state(request: Request):
+    """Получить полное состояние игры"""
+    return await cached_json_response("game_state", build_game_state, request, game_etag())
+
+def diff_rows(old_rows: List[Dict], new_rows: List[Dict], key: str) -> Optional[Dict]:
+    """
+    Разница между двумя списками строк таблицы
+    
+    Returns:
+        {"changed": [строки], "removed": [ключи], "order": [ключи]} (только непустые поля)
+        или None, если ничего не изменилось
+    """
+    old_by_key = {row[key]: row for row in old_rows}
+    new_keys = [row[key] for row in new_rows]
+    new_keys_set = set(new_keys)
+    
+    patch = {}
+    changed = [row for row in new_rows if old_by_key.get(row[key]) != row]
+    if changed:
+        patch["changed"] = changed
+    removed = [row_key for row_key in old_by_key if row_key not in new_keys_set]
+    if removed:
+        patch["removed"] = removed
+    # Порядок передаем, только если он изменился
+    if new_keys != [row[key] for row in old_rows]:
+        patch["order"] = new_keys
+    
+    return patch or None
+
+def diff_game_state(old_state: Dict, new_state: Dict) -> Dict:
+    """Разница между двумя полными состояниями игры (для delta-сообщений)"""
+    delta = {
+        "state_version": new_state["state_version"],
+        "current_round": new_state["current_round"],
+        "num_players": new_state["num_players"]
+    }
+    
+    tables = [
+        ("leaderboard", "player_id"),
+        ("prices", "resource"),
+        ("buildings", "name")
+    ]
+    for table, key in tables:
+        patch = diff_rows(old_state[table][table], new_state[table][table], key)
+        if patch:
+            delta[table] = patch
+    
+    return delta
+
+async def advance_feed() -> Optional[bytes]:
+    """
+    Перевести ленту обновлений на текущую версию игры
+    
+    При смене игры лента начинается заново (новая эпоха и snapshot),
+    иначе формируется delta-сообщение со следующим номером и сохраняется
+    в кольцевом буфере для переподключающихся клиентов
+    
+    Returns:
+        Сообщение для рассылки или None, если версия не изменилась
+    """
+    global feed_epoch, feed_seq, feed_state, last_broadcast_key
+    
+    key = current_state_key()
+    if feed_state is not None and key == last_broadcast_key:
+        return None
+    
+    previous_key = last_broadcast_key
+    last_broadcast_key = key
+    state = await response_cache.get_data("game_state", build_game_state)
+    
+    if (feed_state is None or key is None or previous_key is None
+            or key[0] != previous_key[0]):
+        # Новая игра - начинаем ленту с полного состояния
+        feed_epoch = secrets.token_hex(4)
+        feed_seq = 1
+        feed_state = state
+        feed_deltas.clear()
+        return snapshot_payload()
+    
+    feed_seq += 1
+    delta = diff_game_state(feed_state, state)
+    feed_state = state
+    payload = serialize_message({"type": "delta", "epoch": feed_epoch, "seq": feed_seq, **delta})
+    feed_deltas.append((feed_seq, payload))
+    return payload
+
+def snapshot_payload() -> bytes:
+    """Полное состояние для текущего номера ленты (сериализуется один раз)"""
+    global feed_snapshot
+    if feed_snapshot is None or feed_snapshot[0] != (feed_epoch, feed_seq):
+        payload = serialize_message({
+            "type": "snapshot",
+            "epoch": feed_epoch,
+            "seq": feed_seq,
+            "state": feed_state
+        })
+        feed_snapshot = ((feed_epoch, feed_seq), payload)
+    return feed_snapshot[1]
+
+def messages_since(epoch: Optional[str], since: Optional[int]) -> List[bytes]:
+    """
+    Сообщения, которые нужно отправить клиенту, видевшему ленту до номера since
+    Если пропущенные delta уже вытеснены из буфера - полное состояние
+    """
+    if epoch == feed_epoch and since is not None:
+        if since == feed_seq:
+            return []
+        if feed_deltas and feed_deltas[0][0] <= since + 1 and since < feed_seq:
+            return [payload for seq, payload in feed_deltas if seq > since]
+    return [snapshot_payload()]
+
+def send_payload(payload: bytes):
+    """
+    Поставить готовые байты в очередь каждого сокета (без ожидания отправки)
+    Клиент, очередь которого переполнена, отключается: медленный сокет не задерживает
+    остальных, а переподключившись, он получит пропущенное из буфера ленты
+    """
+    slow = []
+    for connection, queue in active_connections.items():
+        try:
+            queue.put_nowait(payload)
+        except asyncio.QueueFull:
+            slow.append(connection)
+    for connection in slow:
+        drop_connection(connection)
+
+def drop_connection(connection: WebSocket):
+    """Отключить отставшего клиента (код 1013 - повторить позже)"""
+    if active_connections.pop(connection, None) is not None:
+        asyncio.ensure_future(close_quietly(connection, 1013))
+
+async def close_quietly(connection: WebSocket, code: int):
+    try:
+        await connection.close(code=code)
+    except Exception:
+        pass
+
+async def client_writer(connection: WebSocket, queue: asyncio.Queue):
+    """Отправлять сообщения из очереди сокета по порядку, пока сокет жив"""
+    try:
+        while True:
+            await connection.send_bytes(await queue.get())
+    except Exception:
+        active_connections.pop(connection, None)
+
+async def broadcast_loop():
+    """
+    Единственный фоновый цикл рассылки для всех WebSocket клиентов
+    Обновление отправляется только при изменении версии игры: delta
+    строится и сериализуется один раз, затем одни и те же байты уходят
+    каждому сокету. Без изменений клиенты получают только редкий heartbeat
+    """
+    global broadcaster_task
+    loop = asyncio.get_running_loop()
+    last_sent = loop.time()
+    try:
+        while active_connections:
+            if current_state_key() != last_broadcast_key:
+                await broadcast_update()
+                last_sent = loop.time()
+            elif loop.time() - last_sent >= HEARTBEAT_INTERVAL:
+                send_payload(HEARTBEAT_PAYLOAD)
+                last_sent = loop.time()
+            await asyncio.sleep(BROADCAST_INTERVAL)
+    finally:
+        broadcaster_task = None
+
+def ensure_broadcaster():
+    """Запустить цикл рассылки, если он еще не запущен"""
+    global broadcaster_task
+    if broadcaster_task is None or broadcaster_task.done():
+        broadcaster_task = asyncio.create_task(broadcast_loop())
+
 @app.websocket("/ws")
 async def websocket_endpoint(websocket: WebSocket):
-    """WebSocket для обновлений в реальном времени"""
+    """
+    WebSocket для обновлений в реальном времени
+    
+    Клиент, переподключаясь, передает ?epoch=...&since=<последний seq>
+    и получает только пропущенные delta (или snapshot, если отстал слишком сильно)
+    """
     await websocket.accept()
-    active_connections.append(websocket)
+    
+    epoch = websocket.query_params.get("epoch")
+    try:
+        since = int(websocket.query_params.get("since"))
+    except (TypeError, ValueError):
+        since = None
+    
+    # Доводим ленту до текущей версии, чтобы остальные клиенты не пропустили delta
+    await broadcast_update()
+    
+    # Пока отправляются пропущенные сообщения, общий цикл может разослать новые delta
+    # (этому сокету еще нет) - досылаем их из буфера, пока клиент не догонит ленту.
+    # Между последней проверкой и регистрацией нет await, поэтому delta не теряются
+    messages = messages_since(epoch, since)
+    while messages:
+        epoch, since = feed_epoch, feed_seq
+        for payload in messages:
+            await websocket.send_bytes(payload)
+        messages = messages_since(epoch, since)
+    
+    queue = asyncio.Queue(maxsize=CLIENT_QUEUE_SIZE)
+    active_connections[websocket] = queue
+    writer = asyncio.create_task(client_writer(websocket, queue))
+    ensure_broadcaster()
     
     try:
         while True:
-            # Отправляем обновление каждую секунду
-            state = await get_game_state()
-            await websocket.send_json(state)
-            await asyncio.sleep(1)
-    except WebSocketDisconnect:
-        active_connections.remove(websocket)
+            # Рассылкой занимаются общий цикл и писатель сокета, здесь только ждем отключения
+            await websocket.receive_text()
+    except (WebSocketDisconnect, RuntimeError):
+        # RuntimeError - сокет уже закрыт сервером (отставший клиент)
+        pass
+    finally:
+        active_connections.pop(websocket, None)
+        writer.cancel()
 
 async def broadcast_update():
-    """Отправить обновление всем подключенным клиентам"""
-    if not active_connections:
-        return
-    
-    state = await get_game_state()
-    
-    disconnected = []
-    for connection in active_connections:
-        try:
-            await connection.send_json(state)
-        except:
-            disconnected.append(connection)
-    
-    for conn in disconnected:
-        if conn in active_connections:
-            active_connections.remove(conn)
+    """Отправить обновление всем подключенным клиентам (если состояние изменилось)"""
+    payload = await advance_feed()
+    if payload is not None:
+        send_payload(payload)
 
 # ========== TELEGRAM MINI APP API ==========
 
@@ -382,7 +760,7 @@ def get_player_id_from_telegram(init_data: str) -> Optional[str]:
     return f"tg_{user.get('id')}"
 
 @app.get("/api/miniapp/player/state")
-async def get_player_state(request: Request, x_telegram_init_data: Optional[str] = Header(None)):
+async def get_player_state(request: Request, response: Response, x_telegram_init_data: Optional[str] = Header(None)):
     """Получить состояние игрока"""
     if not game_instance:
         raise HTTPException(status_code=500, detail="Игра не инициализирована")
@@ -406,11 +784,20 @@ async def get_player_state(request: Request, x_telegram_init_data: Optional[str]
             "buildings": []
         }
     
-    # Формируем ответ
+    etag = player_etag(player)
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+    
+    return build_player_state(player)
+
+def build_player_state(player: Player) -> Dict:
+    """Состояние игрока для Mini App"""
     buildings_data = []
     for building in player.buildings:
         buildings_data.append({
             "id": building.id,
+            "alias": building.alias,
             "name": building.name,
             "status": building.status.value
         })
@@ -457,6 +844,7 @@ async def save_player_auth(request: Request, x_telegram_init_data: Optional[str]
     # Обновляем никнейм и фото
     player.nickname = nickname
     player.photo_url = photo_url
+    game_instance.bump_version(player)
     
     return {
         "success": True,
@@ -466,11 +854,17 @@ async def save_player_auth(request: Request, x_telegram_init_data: Optional[str]
     }
 
 @app.get("/api/miniapp/prices")
-async def get_miniapp_prices():
+async def get_miniapp_prices(request: Request, response: Response):
     """Получить текущие цены (упрощенная версия для Mini App)"""
     if not game_instance:
         raise HTTPException(status_code=500, detail="Игра не инициализирована")
     
+    # Цены меняются только при обработке раунда
+    etag = round_etag()
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+    
     result = []
     for resource, price in sorted(game_instance.current_prices.items()):
         result.append({
@@ -481,19 +875,54 @@ async def get_miniapp_prices():
     
     return {"prices": result}
 
+@app.get("/api/miniapp/player/rank")
+async def get_player_rank(request: Request, response: Response, x_telegram_init_data: Optional[str] = Header(None)):
+    """Получить место игрока в турнирной таблице"""
+    if not game_instance:
+        raise HTTPException(status_code=500, detail="Игра не инициализирована")
+    
+    if not x_telegram_init_data:
+        raise HTTPException(status_code=401, detail="Не авторизован")
+    
+    player_id = get_player_id_from_telegram(x_telegram_init_data)
+    if not player_id:
+        raise HTTPException(status_code=401, detail="Неверная авторизация")
+    
+    player = game_instance.get_player(player_id)
+    if not player:
+        raise HTTPException(status_code=404, detail="Игрок не найден")
+    
+    # Место зависит и от действий других игроков
+    etag = game_etag()
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+    
+    return {
+        "player_id": player_id,
+        "rank": game_instance.get_player_rank(player_id),
+        "total_players": len(game_instance.players),
+        "total_value": int(round(game_instance.calculate_player_value(player)["total_value"]))
+    }
+
 @app.get("/api/miniapp/round-info")
-async def get_round_info():
+async def get_round_info(request: Request, response: Response):
     """Получить информацию о текущем раунде"""
     if not game_instance:
         raise HTTPException(status_code=500, detail="Игра не инициализирована")
     
+    etag = make_etag("r", game_instance.current_round, "n", len(game_instance.players))
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+    
     return {
         "current_round": game_instance.current_round,
         "num_players": len(game_instance.players)
     }
 
 @app.get("/api/miniapp/buildings")
-async def get_available_buildings(request: Request, x_telegram_init_data: Optional[str] = Header(None)):
+async def get_available_buildings(request: Request, response: Response, x_telegram_init_data: Optional[str] = Header(None)):
     """Получить список доступных объектов для строительства"""
     if not game_instance:
         raise HTTPException(status_code=500, detail="Игра не инициализирована")
@@ -509,10 +938,18 @@ async def get_available_buildings(request: Request, x_telegram_init_data: Option
     if not player:
         raise HTTPException(status_code=404, detail="Игрок не найден")
     
+    # Доступность зависит от ресурсов игрока, стоимость - от цен раунда
+    etag = player_etag(player)
+    if etag_matches(request, etag):
+        return not_modified_response(etag)
+    set_etag(response, etag)
+    
+    cost_table = game_instance.get_cost_table()
     result = []
     for building_name, costs in BUILDING_COSTS.items():
         can_build = player.has_resources(costs)
-        cost = game_instance.calculate_building_cost(building_name)
+        cost = cost_table.cost(building_name)
+        plan = game_instance.plan_building(player, building_name)
         
         # Формируем описание стоимости
         cost_details = []
@@ -523,7 +960,10 @@ async def get_available_buildings(request: Request, x_telegram_init_data: Option
             "name": building_name,
             "cost": int(round(cost)),
             "cost_details": ", ".join(cost_details),
-            "can_build": can_build
+            "can_build": can_build,
+            # Стоимость недостающих ресурсов для постройки в одно касание
+            "shortfall_cost": int(round(to_coins(plan["cost_cents"]))),
+            "can_buy_and_build": plan["can_afford"]
         })
     
     return {"buildings": result}
@@ -591,6 +1031,28 @@ async def build_miniapp(request: Request, x_telegram_init_data: Optional[str] =
     result = game_instance.start_building(player_id, building_name)
     return result
 
+@app.post("/api/miniapp/player/buy-and-build")
+async def buy_and_build_miniapp(request: Request, x_telegram_init_data: Optional[str] = Header(None)):
+    """Докупить недостающие ресурсы и построить объект"""
+    if not game_instance:
+        raise HTTPException(status_code=500, detail="Игра не инициализирована")
+    
+    if not x_telegram_init_data:
+        raise HTTPException(status_code=401, detail="Не авторизован")
+    
+    player_id = get_player_id_from_telegram(x_telegram_init_data)
+    if not player_id:
+        raise HTTPException(status_code=401, detail="Неверная авторизация")
+    
+    data = await request.json()
+    building_name = data.get("building_name")
+    
+    result = game_instance.buy_and_build(player_id, building_name)
+    result.pop("results", None)
+    result.setdefault("cost", 0)
+    
+    return result
+
 @app.post("/api/miniapp/player/sell-building")
 async def sell_building_miniapp(request: Request, x_telegram_init_data: Optional[str] = Header(None)):
     """Продать объект"""
@@ -610,6 +1072,88 @@ async def sell_building_miniapp(request: Request, x_telegram_init_data: Optional
     result = game_instance.put_building_for_sale(player_id, building_id)
     return result
 
+@app.post("/api/miniapp/player/batch")
+async def batch_miniapp(request: Request, x_telegram_init_data: Optional[str] = Header(None)):
+    """
+    Выполнить несколько действий за один запрос (все или ничего)
+    Тело: {"actions": [{"type": "buy" | "sell" | "build" | "sell_building", ...}, ...]}
+    Ответ: результаты действий и новое состояние игрока
+    """
+    if not game_instance:
+        raise HTTPException(status_code=500, detail="Игра не инициализирована")
+    
+    if not x_telegram_init_data:
+        raise HTTPException(status_code=401, detail="Не авторизован")
+    
+    player_id = get_player_id_from_telegram(x_telegram_init_data)
+    if not player_id:
+        raise HTTPException(status_code=401, detail="Неверная авторизация")
+    
+    player = game_instance.get_player(player_id)
+    if not player:
+        raise HTTPException(status_code=404, detail="Игрок не найден")
+    
+    data = await request.json()
+    actions = data.get("actions") if isinstance(data, dict) else None
+    if not isinstance(actions, list) or len(actions) > MAX_BATCH_ACTIONS:
+        raise HTTPException(status_code=400, detail=f"actions должен быть списком не более чем из {MAX_BATCH_ACTIONS} действий")
+    
+    result = game_instance.apply_actions(player_id, actions)
+    for action_result in result["results"]:
+        for key in ("cost", "income"):
+            if key in action_result:
+                action_result[key] = int(round(action_result[key]))
+    result["player"] = build_player_state(player)
+    
+    return result
+
+# ========== АДМИНИСТРИРОВАНИЕ ==========
+
+def check_admin_token(token: Optional[str]):
+    """Проверка токена администратора (переменная окружения ADMIN_TOKEN)"""
+    admin_token = os.environ.get("ADMIN_TOKEN")
+    if not admin_token or not token or not hmac.compare_digest(token, admin_token):
+        raise HTTPException(status_code=403, detail="Доступ запрещен")
+
+def market_config_state() -> Dict:
+    """Действующие и ожидающие параметры рынка"""
+    pending = game_instance.pending_market_config
+    return {
+        "config": game_instance.market_config.to_dict(),
+        "pending": pending.to_dict() if pending is not None else None,
+        "current_round": game_instance.current_round,
+    }
+
+@app.get("/api/admin/market-config")
+async def get_market_config(x_admin_token: Optional[str] = Header(None)):
+    """Параметры рынка текущей игры"""
+    check_admin_token(x_admin_token)
+    if not game_instance:
+        raise HTTPException(status_code=500, detail="Игра не инициализирована")
+    return market_config_state()
+
+@app.post("/api/admin/market-config")
+async def update_market_config(request: Request, x_admin_token: Optional[str] = Header(None)):
+    """
+    Заменить параметры рынка без перезапуска сервера
+    Тело: {параметр: значение, ...} - недостающие параметры остаются прежними.
+    Новые параметры действуют начиная с обработки текущего раунда
+    """
+    check_admin_token(x_admin_token)
+    if not game_instance:
+        raise HTTPException(status_code=500, detail="Игра не инициализирована")
+    
+    data = await request.json()
+    if not isinstance(data, dict):
+        raise HTTPException(status_code=400, detail="Ожидается объект с параметрами рынка")
+    try:
+        config = MarketConfig.from_dict(data, base=game_instance.pending_market_config or game_instance.market_config)
+    except ValueError as e:
+        raise HTTPException(status_code=400, detail=str(e))
+    
+    game_instance.set_market_config(config)
+    return market_config_state()
+
 # Подключаем статические файлы
 app.mount("/static", StaticFiles(directory="static"), name="static")
 